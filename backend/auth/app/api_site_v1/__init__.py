@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
 from .auth.views import router as auth_router
+from .admin.views import router as admin_router
 
 router = APIRouter()
 
 
 router.include_router(router=auth_router, prefix='/auth')
+router.include_router(router=admin_router, prefix='/admin')
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Annotated, Optional
+from fastapi import Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.catalog import role_catalog
+from core.config import settings
+from core.models import db_fastapi_connect
+from core.models.role.role import RoleEnum
+from ..depends import UNKNOWN_ROLE_EXCEPTION
+from ..schemas import UserSearchFilters
+
+
+async def user_search_filters(
+    q: Annotated[Optional[str], Query(min_length=3, max_length=settings.email_max_len)] = None,
+    prefix: bool = False,
+    role: Optional[RoleEnum] = None,
+    email_confirm: Optional[bool] = None,
+    active_after: Optional[datetime] = None,
+    active_before: Optional[datetime] = None,
+    session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency),
+) -> UserSearchFilters:
+    """
+    Фильтры поиска пользователей. Подстрока q - не короче 3 символов:
+    индекс pg_trgm ищет по триграммам, более короткий образец читает весь индекс.
+    Роль, строки которой нет в БД (не применён манифест), - 422.
+    """
+    role_id = None
+    if role is not None:
+        role_id = await role_catalog.find(session, role)
+        if role_id is None:
+            raise UNKNOWN_ROLE_EXCEPTION
+    return UserSearchFilters(
+        q=q, prefix=prefix,
+        role_id=role_id,
+        email_confirm=email_confirm, active_after=active_after, active_before=active_before,
+    )
@@ -0,0 +1,47 @@
+from typing import Annotated, Literal, Optional
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.models import db_fastapi_connect
+from core.config import settings
+from core.permissions import Permission
+from core.responses import RawJSONResponse, dump_json
+from ..auth.dependencies import require_permissions
+from ..depends import AdminService
+from ..schemas import UserSearchFilters
+from .dependencies import user_search_filters
+
+# Все эндпоинты - только для ролей с правом USERS_MANAGE (как get_current_admin)
+router = APIRouter(tags=['Site Admin'], dependencies=[Depends(require_permissions(Permission.USERS_MANAGE))])
+
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+
+@router.get('/users', status_code=status.HTTP_200_OK)
+async def search_users(
+    filters: Annotated[UserSearchFilters, Depends(user_search_filters)],
+    limit: Annotated[int, Query(ge=1, le=settings.admin_page_max)] = settings.admin_page_size,
+    cursor: Optional[int] = None,
+    session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
+):
+    # Страница пользователей от новых к старым; next_cursor - для следующей страницы
+    page = await AdminService.search_users(session=session, filters=filters, limit=limit, cursor=cursor)
+    return RawJSONResponse(dump_json(page), headers={'Cache-Control': 'no-store'})
+
+
+@router.get('/users/export', status_code=status.HTTP_200_OK)
+async def export_users(
+    filters: Annotated[UserSearchFilters, Depends(user_search_filters)],
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    session_factory: async_sessionmaker = Depends(db_fastapi_connect.session_factory_dependency),
+):
+    # Потоковая выгрузка всех найденных пользователей со своей сессией
+    return StreamingResponse(
+        AdminService.export_users(session_factory=session_factory, filters=filters, format=format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': f'attachment; filename="users.{format}"',
+            'Cache-Control': 'no-store',
+        },
+    )
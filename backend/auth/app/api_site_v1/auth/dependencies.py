@@ -1,9 +1,15 @@
-from typing import Annotated, Optional, Tuple
-from fastapi import Path, Depends, Request, HTTPException, status
+from typing import Annotated, Callable, List, Optional, Tuple
+from fastapi import Path, Depends, Request, HTTPException, Form, status
 from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import EmailStr
+from annotated_types import MaxLen
+import base64, binascii, math
 
 from core.models import db_fastapi_connect
+from core.config import settings
+from core.permissions import Permission
+from core.rate_limit import RateLimitBackend, login_limiter, register_limiter, throttle_keys
 from ..depends import AuthService
 
 
@@ -15,6 +21,67 @@ def get_client_info(request: Request) -> Tuple[str, str]:
     user_agent = request.headers.get('User-Agent', '')
     return client_ip, user_agent
 
+def basic_credentials(request: Request) -> Tuple[Optional[str], Optional[str]]:
+    """
+    client_id и client_secret из заголовка Authorization: Basic.
+    """
+    scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'basic':
+        return None, None
+    try:
+        client_id, _, client_secret = base64.b64decode(value, validate=True).decode('utf-8').partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        return None, None
+    return client_id, client_secret
+
+async def _throttle(limiter: RateLimitBackend, request: Request, email: str) -> List[str]:
+    """
+    Расходует попытку по ключам ip и email. При превышении лимита выбрасывает 429
+    до любой работы с БД и bcrypt. Возвращает ключи для учёта результата попытки.
+    """
+    if not settings.rate_limit.enabled:
+        return []
+    client_ip, _ = get_client_info(request)
+    keys = throttle_keys(client_ip, email)
+    retry_after = await limiter.acquire(keys)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail='Too many attempts, try again later',
+            headers={'Retry-After': str(math.ceil(retry_after))},
+        )
+    return keys
+
+async def throttle_login(
+    request: Request,
+    email: Annotated[EmailStr, MaxLen(settings.email_max_len), Form()],
+) -> List[str]:
+    return await _throttle(login_limiter, request, email)
+
+async def throttle_register(
+    request: Request,
+    email: Annotated[EmailStr, MaxLen(settings.email_max_len), Form()],
+) -> List[str]:
+    return await _throttle(register_limiter, request, email)
+
+def require_permissions(*permissions: Permission) -> Callable:
+    """
+    Зависимость, проверяющая права по claim prm токена (побитовое И), без БД.
+    Возвращает payload токена.
+
+        @router.get('/users', dependencies=[Depends(require_permissions(Permission.USERS_READ))])
+    """
+    required = Permission(0)
+    for permission in permissions:
+        required |= permission
+
+    async def dependency(
+        authorization: Annotated[HTTPAuthorizationCredentials, Depends(AuthService.security)],
+    ) -> dict:
+        return await AuthService.check_permissions(authorization.credentials, required)
+
+    return dependency
+
 async def confirm_email_by_slug(
     request: Request,
     authorization: Annotated[HTTPAuthorizationCredentials, Depends(AuthService.security)],
@@ -0,0 +1,106 @@
+import time
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+
+from core.cache import CacheStats, LRUCache
+from core.cache.lru import MISSING
+from core.catalog import role_catalog
+from core.config import settings
+from core.revocation import token_revocations
+from core.security import site_auth_manager
+from ..depends import AuthService
+
+# (exp, sub, iat, заголовки ответа)
+Identity = Tuple[int, str, int, List[Tuple[bytes, bytes]]]
+
+UNAUTHORIZED = {
+    'type': 'http.response.start',
+    'status': 401,
+    'headers': [(b'www-authenticate', b'Bearer'), (b'content-length', b'0')],
+}
+EMPTY_BODY = {'type': 'http.response.body', 'body': b''}
+
+
+class TokenVerifier:
+    """
+    Эндпоинт подзапроса nginx auth_request: 204 с заголовками X-User-Email,
+    X-User-Role, X-User-Permissions или 401, без тела. Пока справочник отзыва
+    не загружен и загрузить его не удаётся - 503: отозванный JWT не пропускается.
+
+    Чистое ASGI-приложение: без зависимостей и валидации FastAPI, без БД.
+    Проверенные JWT access-токены кешируются на ttl секунд (не дольше их срока
+    действия), отзыв (core/revocation.py) проверяется на каждый запрос.
+    Непрозрачные токены проверяются по хранилищу (core/opaque.py).
+    Успешные ответы не пишутся в журнал доступа (core/logger.py).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.stats = CacheStats()
+        self.cache = LRUCache(max_entries, ttl_seconds, self.stats)
+
+    @staticmethod
+    def _token(scope) -> Optional[str]:
+        for name, value in scope['headers']:
+            if name == b'authorization':
+                scheme, _, token = value.decode('latin-1').partition(' ')
+                return token.strip() if scheme.lower() == 'bearer' and token else None
+        return None
+
+    @staticmethod
+    def _headers(claims: dict) -> List[Tuple[bytes, bytes]]:
+        role = role_catalog.get(claims.get('rol'))
+        return [
+            (b'x-user-email', claims['sub'].encode('utf-8')),
+            (b'x-user-role', role.name.value.encode('latin-1') if role is not None else b''),
+            (b'x-user-permissions', str(int(AuthService.token_permissions(claims))).encode('latin-1')),
+        ]
+
+    @classmethod
+    def _verify(cls, token: str) -> Optional[Identity]:
+        verified = site_auth_manager.verify(token)
+        if verified is None or verified.get('iss') != AuthService.JWTKeys.ACCESS:
+            return None
+        claims = verified['claims']
+        subject, issued_at, expires = claims.get('sub'), claims.get('iat'), claims.get('exp')
+        if subject is None or issued_at is None or expires is None:
+            return None
+        return expires, subject, issued_at, cls._headers(claims)
+
+    async def identity(self, token: str) -> Optional[List[Tuple[bytes, bytes]]]:
+        """Заголовки личности или None; справочник отзыва не загружен - HTTPException 503."""
+        if AuthService.is_opaque(token):
+            # Поиск в хранилище и есть проверка: не кешируется, чтобы отзыв действовал сразу
+            claims = await AuthService.access_claims(token)
+            return None if claims is None else self._headers(claims)
+        await AuthService.revocations_ready()
+        identity = self.cache.get(token)
+        if identity is MISSING:
+            self.stats.misses += 1
+            identity = self._verify(token)
+            if identity is None:
+                return None
+            self.cache.set(token, identity)
+        else:
+            self.stats.hits += 1
+        expires, subject, issued_at, headers = identity
+        if expires <= time.time() or token_revocations.is_revoked(subject, issued_at):
+            self.cache.delete(token)
+            return None
+        return headers
+
+    async def __call__(self, scope, receive, send) -> None:
+        token = self._token(scope)
+        try:
+            headers = await self.identity(token) if token else None
+        except HTTPException as e:
+            await send({'type': 'http.response.start', 'status': e.status_code, 'headers': [(b'content-length', b'0')]})
+            await send(EMPTY_BODY)
+            return
+        if headers is None:
+            await send(UNAUTHORIZED)
+        else:
+            await send({'type': 'http.response.start', 'status': 204, 'headers': headers})
+        await send(EMPTY_BODY)
+
+
+token_verifier = TokenVerifier(settings.verify.cache_max_entries, settings.verify.cache_ttl_seconds)
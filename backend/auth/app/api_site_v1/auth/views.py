@@ -1,5 +1,5 @@
 from typing import List, Optional, Annotated
-from fastapi import APIRouter, Depends, status, Response, Cookie, Form, Request
+from fastapi import APIRouter, Depends, status, Response, Cookie, Form, Query, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.models import db_fastapi_connect
 from core.config import settings
+from core.responses import RawJSONResponse, dump_json
 
 from ..depends import (
     AuthService,
@@ -18,11 +19,24 @@ from ..depends import (
     PASSWORD_EXCEPTION,
     CHANGE_PASSWORD_EXCEPTION,
     EMAIL_OR_PASSWORD_EXCEPTION,
-    EMAIL_CONFLICT_EXCEPTION
+    EMAIL_CONFLICT_EXCEPTION,
+    CLIENT_CREDENTIALS_EXCEPTION,
+    GRANT_TYPE_EXCEPTION,
+    INIT_DATA_EXCEPTION,
+    WEBAPP_LOGIN_EXCEPTION,
 )
 from core.security import SiteAuthManager
-from .dependencies import confirm_email_by_slug, get_client_info
-from ..schemas import ReferralData
+from core.rate_limit import login_limiter, register_limiter
+from core.email_filter import email_filter
+from core.telegram import init_data_verifier
+from core.opaque import REFRESH
+from core.permissions import Permission
+from .verify import token_verifier
+from .dependencies import (
+    basic_credentials, confirm_email_by_slug, get_client_info,
+    require_permissions, throttle_login, throttle_register,
+)
+from ..schemas import IntrospectRequest, ReferralData, UserLoginRegistered
 from pydantic import EmailStr
 from annotated_types import MaxLen
 
@@ -34,13 +48,14 @@ from annotated_types import MaxLen
 
 
 router = APIRouter(tags=['Site Auth'])
-api_auth = SiteAuthManager()
+
+# Подзапрос nginx auth_request: чистый ASGI, без зависимостей FastAPI (см. verify.py)
+router.add_route('/verify', token_verifier, include_in_schema=False)
 
 
 @router.get('/cookies-session')
 async def cookies_session(
     request: Request,
-    response: Response,
     session_id: Optional[str] = Cookie(None, include_in_schema=False),
     # Загрузка Cookies session_id через swagger не работает, только через curl
     session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
@@ -51,14 +66,12 @@ async def cookies_session(
             session=session, client_ip=client_ip, user_agent=user_agent)
         if not new_session_id:
             raise COOKIES_SESSION_CREATION_EXCEPTION
-        response.set_cookie(key='session_id', value=new_session_id, httponly=True, path='/')
         session_data = await AuthService.get_cookie_session(session=session, session_id=new_session_id)
         if not session_data:
             raise COOKIES_SESSION_CREATION_EXCEPTION
-        return JSONResponse(
-            status_code=200,
-            content=AuthService.generate_cookies(session_data, 'Session Created', new_session_id)
-        )
+        response = RawJSONResponse(AuthService.generate_cookies(session_data, 'Session Created', new_session_id))
+        response.set_cookie(key='session_id', value=new_session_id, httponly=True, path='/')
+        return response
     # Если cookie передан, проверяем, существует ли сессия
     cookies_session = await AuthService.get_cookie_session(session=session, session_id=session_id)
     if not cookies_session:
@@ -69,11 +82,9 @@ async def cookies_session(
         raise COOKIES_SESSION_UPDATED_EXCEPTION
     new_session_id = updated['new_session_id']
     session_data = updated['session']
+    response = RawJSONResponse(AuthService.generate_cookies(session_data, 'Session Updated', new_session_id))
     response.set_cookie(key='session_id', value=new_session_id, httponly=True, path='/')
-    return JSONResponse(
-        status_code=200,
-        content=AuthService.generate_cookies(session_data, 'Session Updated', new_session_id)
-    )
+    return response
 
 
 @router.get('/me', status_code=status.HTTP_200_OK)
@@ -87,16 +98,32 @@ async def authenticate_user(
         session=session, access_token=authorization.credentials,
         client_ip=client_ip, user_agent=user_agent)
     if user:
-        response_data = AuthService.generate_ping_info(user)
-        return JSONResponse(content=response_data)
+        # Клиент кеширует ответ, но перепроверяет его по ETag
+        headers = {'ETag': user.etag, 'Cache-Control': 'private, no-cache'}
+        if request.headers.get('if-none-match') == user.etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return RawJSONResponse(user.body, headers=headers)
     raise ACCESS_TOKEN_EXCEPTION
 
 
+@router.get('/visits', status_code=status.HTTP_200_OK)
+async def visits(
+    payload: Annotated[dict, Depends(require_permissions(Permission.PROFILE_READ))],
+    limit: Annotated[int, Query(ge=1, le=settings.visits_page_max)] = settings.visits_page_size,
+    cursor: Annotated[Optional[str], MaxLen(128), Query()] = None,
+    session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
+):
+    # Устройства и посещения текущего пользователя, страницами от последнего входа
+    page = await AuthService.profile_visits(session=session, subject=payload['sub'], limit=limit, cursor=cursor)
+    return RawJSONResponse(dump_json(page), headers={'Cache-Control': 'private, no-store'})
+
+
 @router.post('/register', status_code=status.HTTP_201_CREATED)
 async def registration(
     request: Request,
     email: Annotated[EmailStr, MaxLen(settings.email_max_len), Form()],
     password: Annotated[str, MaxLen(settings.password_max_len), Form()],
+    throttle: Annotated[List[str], Depends(throttle_register)],
     session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
 ):  
     client_ip, user_agent = get_client_info(request)
@@ -106,8 +133,9 @@ async def registration(
         client_ip=client_ip, user_agent=user_agent, cookie_session=cookie_session
     )
     if user:
-        response_data = AuthService.generate_tokens(user)
-        return JSONResponse(content=response_data)
+        return RawJSONResponse(await AuthService.issue_tokens(user, request.headers.get('X-Client-Id')))
+    # Конфликты email учитываются по ip, чтобы замедлить перебор адресов
+    await register_limiter.failure(throttle[:1])
     raise EMAIL_CONFLICT_EXCEPTION
 
 
@@ -116,18 +144,26 @@ async def login(
     request: Request,
     email: Annotated[EmailStr, MaxLen(settings.email_max_len), Form()],
     password: Annotated[str, MaxLen(settings.password_max_len), Form()],
+    throttle: Annotated[List[str], Depends(throttle_login)],
     session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
 ):
     client_ip, user_agent = get_client_info(request)
     cookie_session = request.headers.get('Cookie-Session')
-    user = await AuthService.get_user(session=session, email=email)
-    if user and SiteAuthManager.validate_password(password, user.password):
+    user = None
+    if email_filter.might_exist(email):
+        user = await AuthService.get_user(session=session, email=email)
+    if user is None:
+        # Пользователя нет: время ответа выравниваем фиктивной проверкой bcrypt
+        SiteAuthManager.dummy_validate_password(password)
+    elif SiteAuthManager.validate_password(password, user.password):
         await AuthService.user_login(
             session=session, email=email,
             client_ip=client_ip, user_agent=user_agent, cookie_session=cookie_session
         )
-        response_data = AuthService.generate_tokens(user)
-        return JSONResponse(content=response_data)
+        # Успешный вход сбрасывает неудачи email, но не ip
+        await login_limiter.success(throttle[1:])
+        return RawJSONResponse(await AuthService.issue_tokens(user, request.headers.get('X-Client-Id')))
+    await login_limiter.failure(throttle)
     raise EMAIL_OR_PASSWORD_EXCEPTION
 
 
@@ -140,13 +176,68 @@ async def refresh(
     client_ip, user_agent = get_client_info(request)
     user = await AuthService.get_current_user(
         session=session, access_token=authorization.credentials,
-        client_ip=client_ip, user_agent=user_agent)
+        client_ip=client_ip, user_agent=user_agent, kind=REFRESH)
     if user:
-        response_data = AuthService.generate_tokens(user)
-        return JSONResponse(content=response_data)
+        tokens = await AuthService.issue_tokens(user, request.headers.get('X-Client-Id'))
+        # Непрозрачный токен одноразовый: после обмена отзывается
+        await AuthService.revoke_token(authorization.credentials)
+        return RawJSONResponse(tokens)
     raise REFRESH_TOKEN_EXCEPTION
 
 
+@router.post('/telegram', status_code=status.HTTP_200_OK)
+async def telegram_login(
+    request: Request,
+    init_data: Annotated[str, MaxLen(settings.telegram.init_data_max_len), Form()],
+    session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
+):
+    # Подпись initData проверяется в памяти, до обращения к БД
+    telegram_user = init_data_verifier.verify(init_data)
+    if telegram_user is None:
+        raise INIT_DATA_EXCEPTION
+    client_ip, user_agent = get_client_info(request)
+    user = await AuthService.webapp_login(
+        session=session, telegram_user=telegram_user,
+        client_ip=client_ip, user_agent=user_agent
+    )
+    if user is None:
+        raise WEBAPP_LOGIN_EXCEPTION
+    return RawJSONResponse(await AuthService.issue_tokens(user, request.headers.get('X-Client-Id')))
+
+
+@router.post('/token', status_code=status.HTTP_200_OK)
+async def service_token(
+    request: Request,
+    grant_type: Annotated[str, Form()],
+    client_id: Annotated[Optional[str], MaxLen(64), Form()] = None,
+    client_secret: Annotated[Optional[str], MaxLen(128), Form()] = None,
+    session: AsyncSession = Depends(db_fastapi_connect.scoped_session_dependency)
+):
+    # Client credentials для внутренних сервисов: в форме или в заголовке Basic
+    if grant_type != 'client_credentials':
+        raise GRANT_TYPE_EXCEPTION
+    if client_id is None or client_secret is None:
+        client_id, client_secret = basic_credentials(request)
+    token = None
+    if client_id and client_secret:
+        token = await AuthService.service_token(session=session, client_id=client_id, client_secret=client_secret)
+    if token is None:
+        raise CLIENT_CREDENTIALS_EXCEPTION
+    return RawJSONResponse(dump_json(token), headers={'Cache-Control': 'no-store'})
+
+
+@router.post('/revoke', status_code=status.HTTP_200_OK)
+async def revoke(token: Annotated[str, MaxLen(4096), Form()]):
+    # Непрозрачный токен отзывается сразу; JWT отзываются только все разом (смена пароля)
+    return JSONResponse({'revoked': await AuthService.revoke_token(token)})
+
+
+@router.post('/introspect', status_code=status.HTTP_200_OK)
+async def introspect(body: IntrospectRequest):
+    # Пачка токенов от шлюза: проверка подписи и отзыва в памяти, без БД
+    return RawJSONResponse(dump_json(await AuthService.introspect(body.tokens)))
+
+
 @router.post('/change_password', status_code=status.HTTP_200_OK)
 async def change_password(
     request: Request,
@@ -159,7 +250,8 @@ async def change_password(
     user = await AuthService.get_current_user(
         session=session, access_token=authorization.credentials,
         client_ip=client_ip, user_agent=user_agent)
-    if user and SiteAuthManager.validate_password(current_password, user.password):
+    # У пользователя WebApp пароля нет
+    if isinstance(user, UserLoginRegistered) and SiteAuthManager.validate_password(current_password, user.password):
         user_change_password = await AuthService.user_change_password(
             session=session, email=user.email, new_password=new_password)
         if user_change_password:
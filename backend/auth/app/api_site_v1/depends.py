@@ -1,16 +1,32 @@
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import HTTPException, status
-from fastapi.encoders import jsonable_encoder 
 from fastapi.security import HTTPBearer
-from core.security import SiteAuthManager
-from sqlalchemy.ext.asyncio import AsyncSession
+from core.security import SiteAuthManager, site_auth_manager
+from core.email_filter import email_filter
+from core.rate_limit import normalize_email
+from core.catalog import role_catalog
+from core.permissions import Permission, NO_PERMISSIONS
+from core.maintenance import guest_profile_pruner
+from core.responses import dump_json
+from core.me_cache import me_cache, MeEntry
+from core.revocation import token_revocations
+from core.opaque import ACCESS, REFRESH, OpaqueSession, opaque_store
+from core.service_tokens import service_tokens
+from core.telegram import SUBJECT_PREFIX, TelegramUser, init_data_verifier
+from core.config import settings
+from core.startup import lifecycle
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select, update
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, update, exists, func, literal, true, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload, contains_eager
 from core.models import (
-    Role, WebSiteUser,
+    db_fastapi_connect,
+    Role, WebSiteUser, WebAppUser,
     Profile,
+    ProfileVisit,
     UserAssociation,
+    ServiceClient,
 )
 from core.models.role.role import RoleEnum
 from core.models.base import date_now
@@ -19,17 +35,24 @@ from .schemas import (
     UserRegistered,
     UserChangePassword,
     AuthInfo,
+    ServiceTokenInfo,
+    VisitInfo,
+    VisitsPage,
+    UserSearchFilters,
+    AdminUserInfo,
+    AdminUsersPage,
+    IntrospectResponse,
+    TokenIntrospection,
     PingAuthInfo,
     CookiesData,
     CookiesUpdate,
     CookiesResponse
 )
-import uuid
+from datetime import datetime, timedelta
+import base64, binascii, csv, hmac, io, time, uuid
 
-import logging.config
-from core.logger import logger_config
+import logging
 
-logging.config.dictConfig(logger_config)
 logger = logging.getLogger('site_auth_repository_logger')
 
 
@@ -40,6 +63,9 @@ CRED_EXCEPTION = HTTPException(
 ROLE_EXCEPTION = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN, detail='This feature is only available to admins'
 )
+PERMISSION_EXCEPTION = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN, detail='Not enough permissions'
+)
 EXPIRED_EXCEPTION = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN, detail='Signature has expired'
 )
@@ -70,19 +96,49 @@ COOKIES_SESSION_CREATION_EXCEPTION = HTTPException(
 COOKIES_SESSION_UPDATED_EXCEPTION = HTTPException(
     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Session updated error'
 )
+CLIENT_CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid client credentials',
+    headers={'WWW-Authenticate': 'Basic'}
+)
+INIT_DATA_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid Telegram init data'
+)
+CURSOR_EXCEPTION = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor'
+)
+GRANT_TYPE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail='Unsupported grant type'
+)
 CHANGE_PASSWORD_EXCEPTION = HTTPException(
     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='An unexpected error occurred'
 )
+SERVICE_ROLE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Service role is not configured'
+)
+WEBAPP_LOGIN_EXCEPTION = HTTPException(
+    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Telegram login error'
+)
+UNKNOWN_ROLE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='Role is not configured'
+)
+REVOCATIONS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Token revocations are not loaded'
+)
 
+INACTIVE_TOKEN = TokenIntrospection(active=False)
 
 
 class AuthService:
     class JWTKeys:
         ACCESS = 'accessToken'
         REFRESH = 'refreshToken'
+
+    # Вид токена (как у непрозрачных) - iss в заголовке JWT
+    TOKEN_ISSUERS = {ACCESS: JWTKeys.ACCESS, REFRESH: JWTKeys.REFRESH}
+    KIND_EXCEPTIONS = {ACCESS: ACCESS_TOKEN_EXCEPTION, REFRESH: REFRESH_TOKEN_EXCEPTION}
     
     security: HTTPBearer = HTTPBearer()
-    api_auth: SiteAuthManager = SiteAuthManager()
+    api_auth: SiteAuthManager = site_auth_manager
 
 
     @classmethod
@@ -103,10 +159,7 @@ class AuthService:
         }
         try:
             async with session.begin_nested():
-                result = await session.execute(
-                    select(Role.id).where(Role.name == RoleEnum.GUEST)
-                )
-                role_id = result.scalar_one()
+                role_id = await role_catalog.role_id(session, RoleEnum.GUEST)
                 key = cls.generate_key_32()
                 profile = Profile(
                     key=key,
@@ -179,13 +232,16 @@ class AuthService:
             return None
     
     @classmethod
-    def generate_cookies(cls, session_data: dict, message: str, new_session_id: str) -> CookiesResponse:
+    def generate_cookies(cls, session_data: dict, message: str, new_session_id: str) -> bytes:
+        """
+        JSON ответа с данными cookie-сессии.
+        """
         cookies_response = CookiesResponse(
             user=CookiesData(**session_data),
             message=message,
             new_session_id=new_session_id
         )
-        return jsonable_encoder(cookies_response)
+        return dump_json(cookies_response)
     
     @classmethod
     async def _update_profile(
@@ -214,18 +270,18 @@ class AuthService:
         client_ip: str,
         user_agent: str
     ) -> Optional[bool]:
+        # Явные join вместо вложенных EXISTS (has): поиск по уникальным
+        # website_users.email и profiles.key, связь - по индексам users_associations
         stmt = (
             select(WebSiteUser)
+            .join(WebSiteUser.website_user_association)
+            .join(UserAssociation.profile)
             .options(
-                joinedload(WebSiteUser.website_user_association)
-                .joinedload(UserAssociation.profile)
+                contains_eager(WebSiteUser.website_user_association)
+                .contains_eager(UserAssociation.profile)
             )
             .where(WebSiteUser.email == email)
-            .where(
-                WebSiteUser.website_user_association.has(
-                    UserAssociation.profile.has(Profile.key == key)
-                )
-            )
+            .where(Profile.key == key)
         )
         result = await session.execute(stmt)
         website_user = result.scalar_one_or_none()
@@ -234,13 +290,17 @@ class AuthService:
                 try:
                     # Используем вложенную транзакцию
                     async with session.begin_nested():
-                        await session.execute(update(WebSiteUser).where(
+                        data_version = await session.scalar(update(WebSiteUser).where(
                             WebSiteUser.id == website_user.id).values(
                                 activity_date=date_now(),
-                                email_confirm=True))
+                                email_confirm=True,
+                                data_version=WebSiteUser.data_version + 1)
+                            .returning(WebSiteUser.data_version))
+                        await me_cache.notify(session, website_user.email)
                         profile = await session.get(Profile, website_user.website_user_association.profile_id)
                         await cls._update_profile(profile, client_ip, user_agent)
                     await session.commit()
+                    await me_cache.invalidate(website_user.email, data_version)
                     return True
                 except IntegrityError as e:
                     await session.rollback()
@@ -267,13 +327,14 @@ class AuthService:
         """
         Обработка регистрации пользователя на сайте.
         """
+        # Если email возможно занят, проверяем это до хеширования пароля
+        if email_filter.might_exist(email) and await cls.email_exists(session, email):
+            logger.debug('Email уже зарегистрирован: %s', email)
+            return None
         try:
             # Используем вложенную транзакцию
             async with session.begin_nested():
-                result_role = await session.execute(
-                    select(Role.id).where(Role.name == RoleEnum.USER)
-                )
-                role_id = result_role.scalar_one()
+                role_id = await role_catalog.role_id(session, RoleEnum.USER)
                 if cookie_session and await cls.get_cookie_session(session, cookie_session):
                     result_profile = await session.execute(
                         select(Profile)
@@ -324,11 +385,17 @@ class AuthService:
                         user_website_id=user_website.id,
                     )
                     session.add(association)
+                await email_filter.notify(session, user_website.email)
             await session.commit()
+            await email_filter.publish(user_website.email)
             return UserRegistered(email=user_website.email, role_id=role_id)
         except IntegrityError as e:
             await session.rollback()
-            logger.error('Интеграционная ошибка: %s', e)
+            # Одновременная регистрация того же адреса (в любом регистре) - ответ 409
+            if 'idx_unique_website_users_email_lower' in str(e.orig):
+                logger.debug('Email уже зарегистрирован: %s', email)
+            else:
+                logger.error('Интеграционная ошибка: %s', e)
             return None
         except Exception as e:
             await session.rollback()
@@ -345,10 +412,18 @@ class AuthService:
         try:
             # Используем вложенную транзакцию
             async with session.begin_nested():
-                await session.execute(update(WebSiteUser).where(
+                data_version = await session.scalar(update(WebSiteUser).where(
                     WebSiteUser.email == email).values(
-                        password=SiteAuthManager.hash_password(new_password)))
+                        password=SiteAuthManager.hash_password(new_password),
+                        data_version=WebSiteUser.data_version + 1)
+                    .returning(WebSiteUser.data_version))
+                await me_cache.notify(session, email)
+                # Токены, выпущенные со старым паролем, отзываются
+                valid_after = await token_revocations.revoke(session, email)
             await session.commit()
+            await me_cache.invalidate(email, data_version)
+            await token_revocations.publish(email, valid_after)
+            await opaque_store.revoke_subject(email)
             return UserChangePassword(email=email)
         except IntegrityError as e:
             await session.rollback()
@@ -359,6 +434,16 @@ class AuthService:
             logger.error('Исключение, ошибка: %s', e)
             return None
 
+    @classmethod
+    async def email_exists(cls, session: AsyncSession, email: str) -> bool:
+        """
+        Занят ли email без учёта регистра (индекс idx_unique_website_users_email_lower).
+        """
+        result = await session.execute(
+            select(exists().where(func.lower(WebSiteUser.email) == normalize_email(email)))
+        )
+        return result.scalar()
+
     @classmethod
     async def get_user(
         cls,
@@ -418,15 +503,21 @@ class AuthService:
                         temporary_profile_result = await session.execute(sql_temporary_profile)
                         temporary_profile = temporary_profile_result.scalars().one()
                         if not temporary_profile.user_association.user_website_id:
-                            await session.delete(temporary_profile)
+                            # Гостевой профиль удалит фоновая очистка, не каскад в транзакции входа
+                            await guest_profile_pruner.defer(session, temporary_profile.id)
                         else:
                             logger.debug('Найден нестандартный профиль UserAssociation - id:%s', temporary_profile.user_association.id)
-                await session.execute(update(WebSiteUser).where(
+                # activity_date входит в ответ /me: изменение увеличивает data_version
+                data_version = await session.scalar(update(WebSiteUser).where(
                     WebSiteUser.id == user_website.id).values(
-                        activity_date=date_now()))
+                        activity_date=date_now(),
+                        data_version=WebSiteUser.data_version + 1)
+                    .returning(WebSiteUser.data_version))
+                await me_cache.notify(session, user_website.email)
                 profile = await session.get(Profile, user_website.website_user_association.profile_id)
                 await cls._update_profile(profile, client_ip, user_agent)
             await session.commit()
+            await me_cache.invalidate(user_website.email, data_version)
             return UserLoginRegistered(
                 email=user_website.email,
                 role_id=user_website.website_user_association.role_id,
@@ -447,13 +538,23 @@ class AuthService:
         email: str,
         client_ip: str,
         user_agent: str
-    ) -> Optional[PingAuthInfo]:
+    ) -> Optional[Tuple[PingAuthInfo, int]]:
         """
-        Загрузка данных зарегистрированного пользователя.
+        Загрузка данных зарегистрированного пользователя и их версии (data_version).
+        Обновление activity_date увеличивает data_version и сбрасывает кеш /me.
         """
         try:
             # Используем вложенную транзакцию
             async with session.begin_nested():
+                # Сначала запись: блокировка строки, данные ниже не старше версии
+                data_version = await session.scalar(update(WebSiteUser).where(
+                    WebSiteUser.email == email).values(
+                        activity_date=date_now(),
+                        data_version=WebSiteUser.data_version + 1)
+                    .returning(WebSiteUser.data_version))
+                if data_version is None:
+                    return None
+                await me_cache.notify(session, email)
                 query = (
                     select(WebSiteUser)
                     .options(joinedload(WebSiteUser.website_user_association)
@@ -466,16 +567,12 @@ class AuthService:
                     .where(WebSiteUser.email == email)
                     )
                 sql_result = await session.execute(query)
-                user_website = sql_result.scalars().one_or_none()
-                if user_website is None:
-                    return None
-                await session.execute(update(WebSiteUser).where(
-                    WebSiteUser.id == user_website.id).values(
-                        activity_date=date_now()))
+                user_website = sql_result.scalars().one()
                 profile = await session.get(Profile, user_website.website_user_association.profile_id)
 
                 await cls._update_profile(profile, client_ip, user_agent)
             await session.commit()
+            await me_cache.invalidate(email, data_version)
             return PingAuthInfo(
                 id=user_website.website_user_association.profile.id,
                 email=user_website.email,
@@ -483,7 +580,7 @@ class AuthService:
                 role=user_website.website_user_association.role.name,
                 g_roles=user_website.website_user_association.role.group.name,
                 avatar=user_website.website_user_association.profile.avatar,
-                activity_date=user_website.activity_date)
+                activity_date=user_website.activity_date), data_version
         except IntegrityError as e:
             await session.rollback()
             logger.error('Интеграционная ошибка: %s', e)
@@ -494,17 +591,26 @@ class AuthService:
             return None
         
     @classmethod
-    def generate_tokens(cls, user: UserRegistered) -> AuthInfo:
+    def _token_payload(cls, user: UserRegistered) -> dict:
+        payload = {
+            'rol': user.role_id,
+            'sub': user.email
+        }
+        # Права роли, скомпилированные при загрузке справочника: проверка без БД
+        permissions = role_catalog.permissions(user.role_id)
+        if permissions is not None:
+            payload['prm'] = int(permissions)
+        return payload
+
+    @classmethod
+    def generate_tokens(cls, user: UserRegistered) -> bytes:
         """
         Создает access и refresh токены для пользователя и возвращает
-        закодированный JSON-словарь с данными авторизации.
+        JSON с данными авторизации.
         """
         access_token = cls.api_auth.create_access_token(
             head={'iss': cls.JWTKeys.ACCESS},
-            payload={
-                'rol': user.role_id,
-                'sub': user.email
-            }
+            payload=cls._token_payload(user)
         )
         refresh_token = cls.api_auth.create_refresh_token(
             head={'iss': cls.JWTKeys.REFRESH},
@@ -518,23 +624,441 @@ class AuthService:
             refresh_token=refresh_token,
             token_type='Bearer'
         )
-        return jsonable_encoder(auth_info)
-    
+        return dump_json(auth_info)
+
     @classmethod
-    def generate_ping_info(cls, user: PingAuthInfo) -> PingAuthInfo:
+    async def generate_opaque_tokens(cls, user: UserRegistered) -> bytes:
         """
-        Подготовка данных зарегистрированного пользователя для отправки.
+        Непрозрачные access и refresh токены: случайные строки, claims хранятся
+        в opaque_store. Ответ того же формата, что и generate_tokens.
         """
-        ping_data_info = PingAuthInfo(
-            id=user.id,
-            email=user.email,
-            email_confirm=user.email_confirm,
-            role=user.role,
-            g_roles=user.g_roles,
-            avatar=user.avatar,
-            activity_date=user.activity_date,
+        payload = cls._token_payload(user)
+        issued_at = int(time.time())
+        tokens = {}
+        for kind, expire_minutes in (
+            (ACCESS, cls.api_auth.access_token_expire_minutes),
+            (REFRESH, cls.api_auth.refresh_token_expire_minutes),
+        ):
+            tokens[kind] = await opaque_store.issue(OpaqueSession(
+                sub=payload['sub'], rol=payload['rol'], prm=payload.get('prm'),
+                iat=issued_at, exp=issued_at + expire_minutes * 60, kind=kind,
+            ))
+        auth_info = AuthInfo(
+            access_token=tokens[ACCESS],
+            refresh_token=tokens[REFRESH],
+            token_type='Bearer'
         )
-        return jsonable_encoder(ping_data_info)
+        return dump_json(auth_info)
+
+    @classmethod
+    async def issue_tokens(cls, user: UserRegistered, client_id: Optional[str]) -> bytes:
+        """
+        Токены для клиента: непрозрачные для клиентов из AUTH_OPAQUE_CLIENTS, иначе JWT.
+        """
+        if client_id is not None and client_id in settings.auth_jwt.opaque_clients:
+            return await cls.generate_opaque_tokens(user)
+        return cls.generate_tokens(user)
+
+    @classmethod
+    async def service_token(
+        cls,
+        session: AsyncSession,
+        client_id: str,
+        client_secret: str,
+    ) -> Optional[ServiceTokenInfo]:
+        """
+        Токен сервиса по client credentials. Пока выданный токен не близок
+        к истечению, повторный запрос получает его из service_tokens без БД
+        и подписи. None - клиент не найден, отключён или секрет неверен.
+        """
+        secret_hash = service_tokens.hash_secret(client_secret)
+        cached = service_tokens.get(client_id, secret_hash)
+        if cached is None:
+            client = await session.scalar(
+                select(ServiceClient).where(ServiceClient.client_id == client_id, ServiceClient.active)
+            )
+            if client is None or not hmac.compare_digest(client.secret_hash, secret_hash):
+                return None
+            try:
+                role_id = await role_catalog.role_id(session, RoleEnum.SERVICE)
+            except KeyError:
+                logger.error('Роль SERVICE отсутствует в БД: нужна миграция 012 или манифест ролей')
+                raise SERVICE_ROLE_EXCEPTION
+            payload = cls._token_payload(UserRegistered(email=f'service:{client_id}', role_id=role_id))
+            expire = timedelta(minutes=settings.auth_jwt.service_token_expire_minutes)
+            access_token = cls.api_auth.create_access_token(
+                head={'iss': cls.JWTKeys.ACCESS},
+                payload=dict(payload, cid=client_id),
+                expire_timedelta=expire,
+            )
+            cached = service_tokens.put(client_id, secret_hash, access_token, time.time() + expire.total_seconds())
+        return ServiceTokenInfo(
+            access_token=cached.access_token,
+            token_type='Bearer',
+            expires_in=int(cached.expires_at - time.time()),
+        )
+
+    @classmethod
+    async def webapp_login(
+        cls,
+        session: AsyncSession,
+        telegram_user: TelegramUser,
+        client_ip: str,
+        user_agent: str,
+    ) -> Optional[UserRegistered]:
+        """
+        Вход пользователя Telegram WebApp: пользователь, профиль, связь и посещение
+        создаются или обновляются одним запросом (INSERT ... ON CONFLICT в CTE).
+        Роль существующей связи сохраняется, новая связь получает роль USER.
+        Профиль существующей связи обновляется, а не создаётся заново по ключу.
+        """
+        try:
+            now = date_now()
+            role_id = await role_catalog.role_id(session, RoleEnum.USER)
+            profile_id = await session.scalar(
+                select(UserAssociation.profile_id)
+                .join(WebAppUser, WebAppUser.id == UserAssociation.user_webapp_id)
+                .where(WebAppUser.telegram_id == telegram_user.id)
+            )
+            webapp_user = insert(WebAppUser).values(
+                telegram_id=telegram_user.id,
+                username=telegram_user.username,
+                first_name=telegram_user.first_name,
+                last_name=telegram_user.last_name,
+                language_code=telegram_user.language_code,
+                register_date=now,
+                activity_date=now,
+            )
+            webapp_user = webapp_user.on_conflict_do_update(
+                index_elements=[WebAppUser.telegram_id],
+                set_={
+                    'username': webapp_user.excluded.username,
+                    'first_name': webapp_user.excluded.first_name,
+                    'last_name': webapp_user.excluded.last_name,
+                    'language_code': webapp_user.excluded.language_code,
+                    'activity_date': webapp_user.excluded.activity_date,
+                },
+            ).returning(WebAppUser.id).cte('webapp_user')
+            if profile_id is not None:
+                # Связь уже есть: её профиль, даже если он создан не по ключу telegram_id
+                profile = (
+                    update(Profile).where(Profile.id == profile_id)
+                    .values(ip=client_ip, user_agent=user_agent, visit_date=now)
+                    .returning(Profile.id).cte('profile')
+                )
+            else:
+                # Ключ профиля постоянный для telegram_id: конфликт по Profile.key
+                profile = insert(Profile).values(
+                    key=init_data_verifier.profile_key(telegram_user.id),
+                    cookie_data=[], locations=[], history=[],
+                    ip=client_ip, user_agent=user_agent,
+                    created_date=now, visit_date=now,
+                )
+                profile = profile.on_conflict_do_update(
+                    index_elements=[Profile.key],
+                    set_={
+                        'ip': profile.excluded.ip,
+                        'user_agent': profile.excluded.user_agent,
+                        'visit_date': profile.excluded.visit_date,
+                    },
+                ).returning(Profile.id).cte('profile')
+            association = insert(UserAssociation).from_select(
+                ['role_id', 'profile_id', 'user_webapp_id'],
+                select(literal(role_id), profile.c.id, webapp_user.c.id)
+                .select_from(profile.join(webapp_user, true())),
+            )
+            # Обновление без изменений: RETURNING отдаёт роль и существующей связи
+            association = association.on_conflict_do_update(
+                index_elements=[UserAssociation.user_webapp_id],
+                index_where=UserAssociation.user_webapp_id.isnot(None),
+                set_={'user_webapp_id': association.excluded.user_webapp_id},
+            ).returning(UserAssociation.role_id)
+            visit = insert(ProfileVisit).from_select(
+                ['profile_id', 'ip', 'user_agent', 'first_visit', 'last_visit'],
+                select(profile.c.id, literal(client_ip[:45]), literal(user_agent[:255]), literal(now), literal(now)),
+            )
+            visit = visit.on_conflict_do_update(
+                constraint='idx_unique_profile_visits',
+                set_={'last_visit': visit.excluded.last_visit},
+            ).cte('visit')
+            role_id = await session.scalar(association.add_cte(visit))
+            if role_id is None:
+                # Профиль связи удалён между запросами: вход повторяет клиент
+                await session.rollback()
+                return None
+            await session.commit()
+            return UserRegistered(email=f'{SUBJECT_PREFIX}{telegram_user.id}', role_id=role_id)
+        except Exception as e:
+            await session.rollback()
+            logger.error('Исключение, ошибка: %s', e)
+            return None
+
+    @classmethod
+    async def _webapp_association(
+        cls,
+        session: AsyncSession,
+        subject: str,
+    ) -> Optional[UserAssociation]:
+        """
+        Связь пользователя WebApp по субъекту токена telegram:<id>
+        с ролью, группой роли, профилем и пользователем WebApp.
+        """
+        try:
+            telegram_id = int(subject.removeprefix(SUBJECT_PREFIX))
+        except ValueError:
+            return None
+        query = (
+            select(UserAssociation)
+            .join(WebAppUser, WebAppUser.id == UserAssociation.user_webapp_id)
+            .options(contains_eager(UserAssociation.webapp_user))
+            .options(joinedload(UserAssociation.role).joinedload(Role.group))
+            .options(joinedload(UserAssociation.profile))
+            .where(WebAppUser.telegram_id == telegram_id)
+        )
+        return (await session.scalars(query)).one_or_none()
+
+    @classmethod
+    async def webapp_user_login(
+        cls,
+        session: AsyncSession,
+        subject: str,
+        client_ip: str,
+        user_agent: str,
+    ) -> Optional[UserRegistered]:
+        """
+        Пользователь WebApp по субъекту токена: отметка активности и посещения профиля.
+        """
+        try:
+            async with session.begin_nested():
+                association = await cls._webapp_association(session, subject)
+                if association is None:
+                    return None
+                association.webapp_user.activity_date = date_now()
+                await cls._update_profile(association.profile, client_ip, user_agent)
+            await session.commit()
+            return UserRegistered(email=subject, role_id=association.role_id)
+        except Exception as e:
+            await session.rollback()
+            logger.error('Исключение, ошибка: %s', e)
+            return None
+
+    @classmethod
+    async def webapp_user_get_data(
+        cls,
+        session: AsyncSession,
+        subject: str,
+        client_ip: str,
+        user_agent: str,
+    ) -> Optional[PingAuthInfo]:
+        """
+        Данные пользователя WebApp для /me. Email у него нет: в ответе субъект токена.
+        """
+        try:
+            async with session.begin_nested():
+                association = await cls._webapp_association(session, subject)
+                if association is None:
+                    return None
+                association.webapp_user.activity_date = date_now()
+                await cls._update_profile(association.profile, client_ip, user_agent)
+            await session.commit()
+            return PingAuthInfo(
+                id=association.profile.id,
+                email=subject,
+                email_confirm=False,
+                role=association.role.name,
+                g_roles=association.role.group.name,
+                avatar=association.profile.avatar,
+                activity_date=association.webapp_user.activity_date)
+        except Exception as e:
+            await session.rollback()
+            logger.error('Исключение, ошибка: %s', e)
+            return None
+
+    @staticmethod
+    def _visits_cursor(visit: ProfileVisit) -> str:
+        return base64.urlsafe_b64encode(f'{visit.last_visit.isoformat()}|{visit.id}'.encode()).decode()
+
+    @staticmethod
+    def _parse_visits_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            last_visit, _, visit_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+            return datetime.fromisoformat(last_visit), int(visit_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise CURSOR_EXCEPTION
+
+    @classmethod
+    async def profile_visits(
+        cls,
+        session: AsyncSession,
+        subject: str,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> VisitsPage:
+        """
+        Устройства пользователя (субъекта токена) от последнего входа.
+        Keyset-пагинация по индексу (profile_id, last_visit, id): страница -
+        чтение limit + 1 строк индекса после курсора, независимо от числа устройств.
+        """
+        if subject.startswith(SUBJECT_PREFIX):
+            profile_id = (
+                select(UserAssociation.profile_id)
+                .join(WebAppUser, WebAppUser.id == UserAssociation.user_webapp_id)
+                .where(WebAppUser.telegram_id == int(subject.removeprefix(SUBJECT_PREFIX)))
+            )
+        else:
+            profile_id = (
+                select(UserAssociation.profile_id)
+                .join(WebSiteUser, WebSiteUser.id == UserAssociation.user_website_id)
+                .where(WebSiteUser.email == subject)
+            )
+        query = (
+            select(ProfileVisit)
+            .where(ProfileVisit.profile_id == profile_id.scalar_subquery())
+            .order_by(ProfileVisit.last_visit.desc(), ProfileVisit.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            query = query.where(tuple_(ProfileVisit.last_visit, ProfileVisit.id) < cls._parse_visits_cursor(cursor))
+        visits = (await session.scalars(query)).all()
+        return VisitsPage(
+            items=[
+                VisitInfo(
+                    ip=visit.ip, user_agent=visit.user_agent,
+                    first_visit=visit.first_visit, last_visit=visit.last_visit,
+                )
+                for visit in visits[:limit]
+            ],
+            next_cursor=cls._visits_cursor(visits[limit - 1]) if len(visits) > limit else None,
+        )
+
+    @staticmethod
+    def is_opaque(token: str) -> bool:
+        # В JWT всегда три части через точку, в непрозрачном токене (base64url) точек нет
+        return '.' not in token
+
+    @classmethod
+    async def revocations_ready(cls) -> None:
+        """
+        До загрузки справочника отзыва (прогрев) отозванный JWT не отличить
+        от действующего: запрос ждёт загрузку, при её ошибке - 503.
+        """
+        try:
+            await token_revocations.ensure_loaded(db_fastapi_connect.session_factory)
+        except Exception as e:
+            logger.error('Справочник отзыва токенов не загружен: %s', e)
+            raise REVOCATIONS_EXCEPTION
+
+    @classmethod
+    async def current_claims(cls, token: str, kind: str = ACCESS) -> dict:
+        """
+        Claims действующего токена вида kind (ACCESS, REFRESH) без обращения к БД:
+        подпись, срок, iss и отзыв для JWT, запись хранилища для непрозрачного токена.
+        Токен другого вида и отозванный - 401 (ACCESS_TOKEN_EXCEPTION, REFRESH_TOKEN_EXCEPTION),
+        истёкший JWT - EXPIRED_EXCEPTION, недействительный - CRED_EXCEPTION,
+        справочник отзыва не загружен - REVOCATIONS_EXCEPTION (503).
+        Общая проверка токена всех зависимостей эндпоинтов.
+        """
+        await cls.revocations_ready()
+        if cls.is_opaque(token):
+            session = await opaque_store.get(token)
+            if session is None:
+                raise CRED_EXCEPTION
+            if session.kind != kind:
+                raise cls.KIND_EXCEPTIONS[kind]
+            return session.claims()
+        verified = cls.api_auth.verify(token)
+        if verified is None:
+            # Для истёкшего JWT decode_token возвращает заголовок без sub
+            payload = cls.api_auth.decode_token(token)
+            raise EXPIRED_EXCEPTION if payload is not None and payload.get('sub') is None else CRED_EXCEPTION
+        if verified.get('iss') != cls.TOKEN_ISSUERS[kind]:
+            raise cls.KIND_EXCEPTIONS[kind]
+        claims = verified['claims']
+        subject, issued_at = claims.get('sub'), claims.get('iat')
+        if subject is None or issued_at is None:
+            raise CRED_EXCEPTION
+        if token_revocations.is_revoked(subject, issued_at):
+            raise cls.KIND_EXCEPTIONS[kind]
+        return claims
+
+    @classmethod
+    async def access_claims(cls, token: str) -> Optional[dict]:
+        """current_claims access-токена: None - токен не действует."""
+        try:
+            return await cls.current_claims(token, ACCESS)
+        except HTTPException as e:
+            # Незагруженный справочник отзыва - 503, а не недействительный токен
+            if e is REVOCATIONS_EXCEPTION:
+                raise
+            return None
+
+    @classmethod
+    async def revoke_token(cls, token: str) -> bool:
+        """
+        Немедленный отзыв непрозрачного токена. JWT по одному не отзываются
+        (только все токены пользователя, см. core/revocation.py): False.
+        """
+        if cls.is_opaque(token):
+            return await opaque_store.revoke(token)
+        return False
+
+    @classmethod
+    def token_permissions(cls, payload: dict) -> Permission:
+        """
+        Права из claim prm. Токены, выпущенные без него, получают права
+        роли rol из справочника.
+        """
+        permissions = payload.get('prm')
+        if permissions is not None:
+            return Permission(permissions)
+        permissions = role_catalog.permissions(payload.get('rol'))
+        return NO_PERMISSIONS if permissions is None else permissions
+
+    @classmethod
+    async def check_permissions(cls, access_token: str, required: Permission) -> dict:
+        """
+        Проверка прав по access-токену без обращения к БД: все биты required
+        должны быть в правах токена. Возвращает payload токена.
+        """
+        payload = await cls.current_claims(access_token, ACCESS)
+        if cls.token_permissions(payload) & required != required:
+            raise PERMISSION_EXCEPTION
+        return payload
+
+    @classmethod
+    async def _introspect_token(cls, token: str) -> TokenIntrospection:
+        claims = await cls.access_claims(token)
+        if claims is None:
+            return INACTIVE_TOKEN
+        return TokenIntrospection(
+            active=True,
+            sub=claims['sub'],
+            rol=claims.get('rol'),
+            prm=int(cls.token_permissions(claims)),
+            iat=claims['iat'],
+            exp=claims.get('exp'),
+        )
+
+    @classmethod
+    async def introspect(cls, tokens: List[str]) -> IntrospectResponse:
+        """
+        Проверка пачки access-токенов для шлюза без обращения к БД: подпись
+        ключом связки по kid, срок действия и отзыв (справочник в памяти);
+        непрозрачные токены - по хранилищу.
+        Одинаковые токены пачки проверяются один раз, порядок ответов - как в запросе.
+        """
+        checked: Dict[str, TokenIntrospection] = {}
+        for token in tokens:
+            if token not in checked:
+                checked[token] = await cls._introspect_token(token)
+        return IntrospectResponse(results=[checked[token] for token in tokens])
+
+    @classmethod
+    def generate_ping_info(cls, user: PingAuthInfo) -> bytes:
+        """
+        JSON с данными зарегистрированного пользователя для отправки.
+        """
+        return dump_json(user)
     
     @classmethod
     async def get_current_user(
@@ -542,27 +1066,28 @@ class AuthService:
         session: AsyncSession,
         access_token: str,
         client_ip: str,
-        user_agent: str
-    ) -> Optional[UserLoginRegistered]:
+        user_agent: str,
+        kind: str = ACCESS,
+    ) -> Optional[UserRegistered]:
         """
         Извлекаем текущего аутентифицированного пользователя.
         При ошибках декодирования токена или отсутствии пользователя выбрасывается HTTPException.
-        Возвращаем UserLoginRegistered.
+        kind - вид токена: REFRESH для /refresh, иначе ACCESS.
+        Возвращаем UserLoginRegistered, для пользователя WebApp (без пароля) - UserRegistered.
         """
-        payload = cls.api_auth.decode_token(access_token)
-        if payload is None:
-            raise CRED_EXCEPTION
-        if payload.get('sub') is None:
-            raise EXPIRED_EXCEPTION
-
-        email: str = payload.get('sub')
-        if email is None:
-            raise CRED_EXCEPTION
+        payload = await cls.current_claims(access_token, kind)
+        email: str = payload['sub']
 
-        user = await cls.user_login(
-            session=session, email=email,
-            client_ip=client_ip, user_agent=user_agent
-        )
+        if email.startswith(SUBJECT_PREFIX):
+            user = await cls.webapp_user_login(
+                session=session, subject=email,
+                client_ip=client_ip, user_agent=user_agent
+            )
+        else:
+            user = await cls.user_login(
+                session=session, email=email,
+                client_ip=client_ip, user_agent=user_agent
+            )
         if user is None:
             raise DATA_EXCEPTION
         return user
@@ -574,29 +1099,45 @@ class AuthService:
         access_token: str,
         client_ip: str,
         user_agent: str
-    ) -> Optional[PingAuthInfo]:
+    ) -> MeEntry:
         """
         Извлекаем текущего аутентифицированного пользователя.
         При ошибках декодирования токена или отсутствии пользователя выбрасывается HTTPException.
-        Возвращаем PingAuthInfo.
+        Возвращаем сериализованный PingAuthInfo с ETag: из кеша /me без обращения к БД
+        или загруженный из БД.
         """
-        payload = cls.api_auth.decode_token(access_token)
-        if payload is None:
-            raise CRED_EXCEPTION
-        if payload.get('sub') is None:
-            raise EXPIRED_EXCEPTION
+        payload = await cls.current_claims(access_token, ACCESS)
+        email: str = payload['sub']
 
-        email: str = payload.get('sub')
-        if email is None:
-            raise CRED_EXCEPTION
+        if email.startswith(SUBJECT_PREFIX):
+            # У пользователя WebApp нет data_version: ответ собирается без кеша /me
+            webapp_data = await cls.webapp_user_get_data(
+                session=session, subject=email,
+                client_ip=client_ip, user_agent=user_agent
+            )
+            if webapp_data is None:
+                raise DATA_EXCEPTION
+            body = cls.generate_ping_info(webapp_data)
+            return MeEntry(0, body, me_cache.make_etag(body))
+
+        if settings.me_cache.enabled:
+            cached = await me_cache.get(email)
+            if cached is not None:
+                return cached
 
-        user = await cls.user_get_data(
+        user_data = await cls.user_get_data(
             session=session, email=email,
             client_ip=client_ip, user_agent=user_agent
         )
-        if user is None:
+        if user_data is None:
             raise DATA_EXCEPTION
-        return user
+        user, data_version = user_data
+        body = cls.generate_ping_info(user)
+        if settings.me_cache.enabled:
+            # Данные прочитаны под блокировкой строки с версией data_version:
+            # более поздние записи в кеше отсекаются по версии
+            return await me_cache.put(email, data_version, body)
+        return MeEntry(data_version, body, me_cache.make_etag(body))
     
     @classmethod
     async def get_current_admin(
@@ -608,20 +1149,12 @@ class AuthService:
     ) -> Optional[UserLoginRegistered]:
         """
         Извлекаем текущего аутентифицированного пользователя с проверкой административных прав.
-        Если роль пользователя не равна 1 (предполагается, что admin имеет role_id==1), выбрасывается ROLE_EXCEPTION.
+        Если в правах токена нет USERS_MANAGE, выбрасывается ROLE_EXCEPTION.
         """
-        payload = cls.api_auth.decode_token(access_token)
-        if payload is None:
-            raise CRED_EXCEPTION
-        if payload.get('sub') is None:
-            raise EXPIRED_EXCEPTION
-
-        email: str = payload.get('sub')
-        role_id: int = payload.get('rol')
-        if role_id != 1:
+        payload = await cls.current_claims(access_token, ACCESS)
+        email: str = payload['sub']
+        if not cls.token_permissions(payload) & Permission.USERS_MANAGE:
             raise ROLE_EXCEPTION
-        if email is None:
-            raise CRED_EXCEPTION
 
         user = await cls.user_login(
             session=session, email=email,
@@ -630,3 +1163,118 @@ class AuthService:
         if user is None:
             raise DATA_EXCEPTION
         return user
+
+
+
+class AdminService:
+    """
+    Поиск и выгрузка пользователей сайта для администраторов.
+    Подстрока email ищется по индексу pg_trgm на lower(email) (миграция 009),
+    страницы - keyset-пагинация по website_users.id от новых к старым.
+    """
+    EXPORT_FIELDS = ('id', 'email', 'email_confirm', 'role', 'register_date', 'activity_date')
+
+    @staticmethod
+    def _like_pattern(q: str, prefix: bool) -> str:
+        escaped = q.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f'{escaped}%' if prefix else f'%{escaped}%'
+
+    @classmethod
+    def users_query(cls, filters: UserSearchFilters):
+        query = (
+            select(
+                WebSiteUser.id, WebSiteUser.email, WebSiteUser.email_confirm, UserAssociation.role_id,
+                WebSiteUser.register_date, WebSiteUser.activity_date,
+            )
+            .outerjoin(UserAssociation, UserAssociation.user_website_id == WebSiteUser.id)
+            .order_by(WebSiteUser.id.desc())
+        )
+        if filters.q:
+            # Выражение совпадает с индексом ix_website_users_email_trgm
+            query = query.where(
+                func.lower(WebSiteUser.email).like(cls._like_pattern(filters.q, filters.prefix), escape='\\')
+            )
+        if filters.role_id is not None:
+            query = query.where(UserAssociation.role_id == filters.role_id)
+        if filters.email_confirm is not None:
+            query = query.where(WebSiteUser.email_confirm == filters.email_confirm)
+        if filters.active_after is not None:
+            query = query.where(WebSiteUser.activity_date >= filters.active_after)
+        if filters.active_before is not None:
+            query = query.where(WebSiteUser.activity_date < filters.active_before)
+        return query
+
+    @staticmethod
+    def _user_info(row) -> AdminUserInfo:
+        role = role_catalog.get(row.role_id)
+        return AdminUserInfo(
+            id=row.id, email=row.email, email_confirm=row.email_confirm,
+            role=role.name.value if role is not None else None,
+            register_date=row.register_date, activity_date=row.activity_date,
+        )
+
+    @classmethod
+    async def search_users(
+        cls,
+        session: AsyncSession,
+        filters: UserSearchFilters,
+        limit: int,
+        cursor: Optional[int] = None,
+    ) -> AdminUsersPage:
+        query = cls.users_query(filters).limit(limit + 1)
+        if cursor is not None:
+            query = query.where(WebSiteUser.id < cursor)
+        rows = (await session.execute(query)).all()
+        return AdminUsersPage(
+            items=[cls._user_info(row) for row in rows[:limit]],
+            next_cursor=rows[limit - 1].id if len(rows) > limit else None,
+        )
+
+    @classmethod
+    async def export_users(
+        cls,
+        session_factory: async_sessionmaker,
+        filters: UserSearchFilters,
+        format: str,
+    ) -> AsyncIterator[bytes]:
+        """
+        Выгрузка NDJSON или CSV: строки читаются серверным курсором пачками
+        по admin_export_batch, каждая пачка - один фрагмент ответа.
+        В памяти только текущая пачка.
+        """
+        async with session_factory() as session:
+            result = await session.stream(
+                cls.users_query(filters).execution_options(yield_per=settings.admin_export_batch)
+            )
+            if format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(cls.EXPORT_FIELDS)
+                async for rows in result.partitions():
+                    for row in rows:
+                        user = cls._user_info(row)
+                        writer.writerow((
+                            user.id, user.email, user.email_confirm, user.role or '',
+                            user.register_date.isoformat(),
+                            user.activity_date.isoformat() if user.activity_date else '',
+                        ))
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue().encode()
+            else:
+                async for rows in result.partitions():
+                    yield b''.join(dump_json(cls._user_info(row)) + b'\n' for row in rows)
+
+
+@lifecycle.hot_statements
+async def warm_auth_statements(session: AsyncSession) -> None:
+    """
+    Горячие запросы /login, /me и регистрации для прогрева соединений.
+    Адрес в зарезервированном домене .invalid: ни одна строка не найдена и не изменена.
+    """
+    email = 'warmup@warmup.invalid'
+    await AuthService.email_exists(session, email)
+    await AuthService.get_user(session, email)
+    await AuthService.user_get_data(session, email, client_ip='', user_agent='')
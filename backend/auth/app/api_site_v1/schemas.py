@@ -26,6 +26,55 @@ class AuthInfo(BaseModel):
     refresh_token: str
     token_type: str
 
+class ServiceTokenInfo(BaseModel):
+    access_token: str
+    token_type: str
+    expires_in: int
+
+class IntrospectRequest(BaseModel):
+    tokens: Annotated[List[Annotated[str, MaxLen(4096)]], MaxLen(settings.auth_jwt.introspect_max_tokens)]
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    rol: Optional[int] = None
+    prm: Optional[int] = None
+    iat: Optional[int] = None
+    exp: Optional[int] = None
+
+class IntrospectResponse(BaseModel):
+    results: List[TokenIntrospection]
+
+class VisitInfo(BaseModel):
+    ip: str
+    user_agent: str
+    first_visit: datetime
+    last_visit: datetime
+
+class VisitsPage(BaseModel):
+    items: List[VisitInfo]
+    next_cursor: Optional[str] = None
+
+class UserSearchFilters(BaseModel):
+    q: Optional[str] = None
+    prefix: bool = False
+    role_id: Optional[int] = None
+    email_confirm: Optional[bool] = None
+    active_after: Optional[datetime] = None
+    active_before: Optional[datetime] = None
+
+class AdminUserInfo(BaseModel):
+    id: int
+    email: str
+    email_confirm: bool
+    role: Optional[str]
+    register_date: datetime
+    activity_date: Optional[datetime]
+
+class AdminUsersPage(BaseModel):
+    items: List[AdminUserInfo]
+    next_cursor: Optional[int] = None
+
 class PingAuthInfo(BaseModel):
     id: int
     email: str
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Сериализация ответов авторизации (AuthInfo, PingAuthInfo, CookiesResponse).
+
+Сравнивает прежний путь (jsonable_encoder -> dict -> JSONResponse) с прямым
+(TypeAdapter.dump_json -> RawJSONResponse) и, если установлен orjson, с
+orjson.dumps(model_dump()). Для каждого варианта - время на ответ и пиковая
+память, выделяемая при построении одного ответа (tracemalloc). БД не нужна.
+
+    python benchmarks/bench_serialization.py --number 20000
+"""
+import argparse, sys, timeit, tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core.responses import RawJSONResponse, dump_json
+from app.api_site_v1.schemas import AuthInfo, PingAuthInfo, CookiesData, CookiesResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SAMPLES = {
+    'AuthInfo': AuthInfo(access_token='a' * 600, refresh_token='r' * 600, token_type='Bearer'),
+    'PingAuthInfo': PingAuthInfo(
+        id=42, email='user@example.com', email_confirm=True, role='user', g_roles='site',
+        avatar=None, activity_date=datetime.now(timezone.utc),
+    ),
+    'CookiesResponse': CookiesResponse(
+        user=CookiesData(user_id=None, name='guest', custom_data='{}'),
+        message='Session Updated', new_session_id='s' * 43,
+    ),
+}
+
+
+def variants(model):
+    yield 'jsonable_encoder + JSONResponse', lambda: JSONResponse(content=jsonable_encoder(model))
+    yield 'dump_json + RawJSONResponse', lambda: RawJSONResponse(dump_json(model))
+    if orjson is not None:
+        yield 'orjson + RawJSONResponse', lambda: RawJSONResponse(orjson.dumps(model.model_dump(mode='json')))
+
+
+def peak_allocation(func) -> int:
+    func()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, model in SAMPLES.items():
+        print(f'\n{name} ({len(dump_json(model))} байт)')
+        print(f'{"вариант":<34} {"мкс/ответ":>10} {"память, байт":>13}')
+        base = None
+        for label, func in variants(model):
+            seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+            base = base or seconds
+            print(f'{label:<34} {seconds * 1e6:>10.2f} {peak_allocation(func):>13} ({base / seconds:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Холодный старт сервиса.
+
+1. Время `import main` в новом интерпретаторе (медиана по --runs запускам)
+   и число потоков после импорта - при импорте не должно стартовать фоновых потоков.
+2. Профиль импорта (-X importtime): пакеты с наибольшим временем импорта.
+3. Время от запуска uvicorn до первого ответа /docs/.
+
+    python benchmarks/bench_startup.py --runs 10 --top 15
+"""
+import argparse, http.client, os, signal, statistics, subprocess, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+IMPORT_PROBE = (
+    'import time, threading; t = time.perf_counter(); import main; '
+    'print((time.perf_counter() - t) * 1000, threading.active_count())'
+)
+
+
+def measure_import(runs: int) -> tuple[list[float], int]:
+    timings, threads = [], 0
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout.split()
+        timings.append(float(out[-2]))
+        threads = int(out[-1])
+    return timings, threads
+
+
+def import_profile(top: int) -> list[tuple[int, str]]:
+    """Собственное время импорта (-X importtime), просуммированное по пакетам верхнего уровня."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    packages: dict[str, int] = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return sorted(((us, name) for name, us in packages.items()), reverse=True)[:top]
+
+
+def time_to_first_response(port: int, timeout: float = 60) -> float:
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                conn.request('GET', '/docs/')
+                if conn.getresponse().status == 200:
+                    return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f'Сервер на порту {port} не ответил за {timeout} с')
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--port', type=int, default=5098)
+    args = parser.parse_args()
+
+    timings, threads = measure_import(args.runs)
+    print(f'import main: медиана {statistics.median(timings):.0f} мс, '
+          f'мин {min(timings):.0f} мс, макс {max(timings):.0f} мс, потоков после импорта: {threads}')
+
+    print(f'\n{"мс":>8}  пакет')
+    for self_us, name in import_profile(args.top):
+        print(f'{self_us / 1000:>8.1f}  {name}')
+
+    print(f'\nДо первого ответа /docs/: {time_to_first_response(args.port):.0f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Масштабирование server.py по ядрам.
+
+Для каждого числа воркеров запускает сервер и в течение --duration секунд
+нагружает /login с несуществующим email: фильтр email отвечает "точно нет",
+и запрос сводится к фиктивной проверке bcrypt - чистая нагрузка на CPU без БД
+(БД нужна только для построения фильтра при старте). Ограничение попыток
+отключается (RATE_LIMIT_ENABLED=false).
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --duration 10
+"""
+import argparse, http.client, os, signal, subprocess, sys, threading, time
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).parent.parent
+LOGIN_PATH = '/api_site/v1/auth/login'
+
+
+def wait_ready(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/readyz')
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                return
+            time.sleep(0.2)
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Сервер на порту {port} не запустился')
+
+
+def load(port: int, duration: float, concurrency: int) -> tuple[int, int]:
+    ok = errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(n: int) -> None:
+        nonlocal ok, errors
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        body = urlencode({'email': f'bench-{n}@example.com', 'password': 'password'})
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        while time.monotonic() < stop_at:
+            try:
+                conn.request('POST', LOGIN_PATH, body=body, headers=headers)
+                status = conn.getresponse()
+                status.read()
+                with lock:
+                    if status.status == 401:
+                        ok += 1
+                    else:
+                        errors += 1
+            except OSError:
+                with lock:
+                    errors += 1
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ok, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    env = dict(os.environ, RATE_LIMIT_ENABLED='false')
+    concurrency = 4 * max(args.workers)
+    print(f'CPU: {os.cpu_count()}, клиентов: {concurrency}, длительность: {args.duration} с')
+    print(f'{"воркеры":>8} {"запросов":>9} {"ошибок":>7} {"rps":>8} {"ускорение":>10}')
+    base_rps = None
+    for workers in args.workers:
+        proc = subprocess.Popen(
+            [sys.executable, str(ROOT / 'server.py'), '--workers', str(workers), '--port', str(args.port)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(args.port)
+            ok, errors = load(args.port, args.duration, concurrency)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+        rps = ok / args.duration
+        base_rps = base_rps or rps
+        print(f'{workers:>8} {ok:>9} {errors:>7} {rps:>8.1f} {rps / base_rps:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
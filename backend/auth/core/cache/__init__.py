@@ -0,0 +1,18 @@
+__all__ = (
+    'CacheStats',
+    'LRUCache',
+    'RESPClient',
+    'RESPError',
+    'InvalidationBus',
+    'RedisBus',
+    'PostgresBus',
+    'TieredCache',
+    'CacheManager',
+    'cache_manager',
+)
+
+from .lru import CacheStats, LRUCache
+from .resp import RESPClient, RESPError
+from .bus import InvalidationBus, PostgresBus, RedisBus
+from .tiered import TieredCache
+from .manager import CacheManager, cache_manager
@@ -0,0 +1,236 @@
+import asyncio, os, uuid
+from contextlib import aclosing
+from typing import Callable, List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .resp import RESPClient
+
+import logging
+
+logger = logging.getLogger('site_auth_repository_logger')
+
+InvalidateHandler = Callable[[str, str], None]
+GapHandler = Callable[[], None]
+
+
+class InvalidationBus:
+    """
+    Шина сброса L1. Базовая реализация - для одного процесса: сбрасывать
+    в других процессах нечего, L1 всегда считается согласованным.
+
+    Сообщение - строка 'процесс<US>пространство<US>ключ'; свои сообщения
+    (по идентификатору процесса) получатели игнорируют.
+    """
+
+    SEPARATOR = '\x1f'
+    # Сообщения отправляются в транзакции записи (notify), а не после commit (publish)
+    transactional: bool = False
+    # Сообщения доходят до других процессов (у базовой шины - нет)
+    distributed: bool = False
+
+    def __init__(self) -> None:
+        self._on_invalidate: List[InvalidateHandler] = []
+        self._on_gap: List[GapHandler] = []
+        self.origin: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        """Доходят ли сообщения других процессов. Если нет, L1 не используется."""
+        return True
+
+    def listen(self, on_invalidate: InvalidateHandler, on_gap: GapHandler) -> None:
+        self._on_invalidate.append(on_invalidate)
+        self._on_gap.append(on_gap)
+
+    def _message(self, namespace: str, key: str) -> str:
+        return self.SEPARATOR.join((self.origin or '', namespace, key))
+
+    def _dispatch(self, message: str) -> None:
+        origin, namespace, key = message.split(self.SEPARATOR, 2)
+        if origin == self.origin:
+            return
+        for handler in self._on_invalidate:
+            handler(namespace, key)
+
+    def _gap(self) -> None:
+        for handler in self._on_gap:
+            handler()
+
+    async def publish(self, namespace: str, key: str) -> None:
+        pass
+
+    async def notify(self, session: AsyncSession, namespace: str, key: str) -> None:
+        """Сообщение в транзакции session; доставляется при её commit."""
+        pass
+
+    async def start(self) -> None:
+        # Идентификатор создаётся в воркере: мастер до fork у всех воркеров общий
+        self.origin = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisBus(InvalidationBus):
+    """
+    Шина на Redis pub/sub: сброс ключа в одном процессе рассылается в L1
+    всех воркеров и подов.
+
+    Пока подписка не подтверждена, healthy=False и кеши не используют L1:
+    пропущенные сообщения не могут оставить в нём устаревшие записи.
+    При потере и восстановлении подписки L1 очищается целиком.
+    Подписка без сообщений раз в keepalive_seconds проверяется PING:
+    без ответа соединение переоткрывается.
+    """
+
+    distributed = True
+
+    def __init__(self, client: RESPClient, channel: str, reconnect_seconds: float = 1.0, keepalive_seconds: float = 30.0) -> None:
+        super().__init__()
+        self.client = client
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self._subscribed = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self._subscribed
+
+    async def publish(self, namespace: str, key: str) -> None:
+        try:
+            await self.client.publish(self.channel, self._message(namespace, key).encode('utf-8'))
+        except Exception as e:
+            logger.warning('Сообщение сброса кеша не отправлено (%s:%s): %s', namespace, key, e)
+
+    async def start(self) -> None:
+        await super().start()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._subscribed = False
+
+    def _on_subscribed(self) -> None:
+        self._gap()
+        self._subscribed = True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with aclosing(self.client.subscribe(
+                    self.channel, on_subscribed=self._on_subscribed, keepalive=self.keepalive_seconds,
+                )) as messages:
+                    async for message in messages:
+                        self._dispatch(message.decode('utf-8'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Подписка на сброс кеша потеряна: %s', e)
+            if self._subscribed:
+                self._subscribed = False
+                self._gap()
+            await asyncio.sleep(self.reconnect_seconds)
+
+
+class PostgresBus(InvalidationBus):
+    """
+    Шина на LISTEN/NOTIFY PostgreSQL - для развёртываний без Redis.
+
+    Записи AuthService вызывают notify в своей транзакции (pg_notify):
+    сообщение доставляется только при commit и не теряется, если процесс
+    упадёт сразу после него. Каждый воркер держит отдельное соединение
+    (вне пула) с LISTEN и раз в keepalive_seconds проверяет его запросом.
+    Пока соединения нет, healthy=False и L1 не используется; при потере
+    и восстановлении соединения L1 очищается целиком - сообщения, отправленные
+    без слушателя, PostgreSQL не хранит.
+    """
+
+    transactional = True
+    distributed = True
+
+    def __init__(self, dsn: str, channel: str, reconnect_seconds: float = 1.0, keepalive_seconds: float = 30.0) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self._connection is not None
+
+    async def notify(self, session: AsyncSession, namespace: str, key: str) -> None:
+        await session.execute(select(func.pg_notify(self.channel, self._message(namespace, key))))
+
+    async def publish(self, namespace: str, key: str) -> None:
+        connection = self._connection
+        if connection is None:
+            logger.warning('Сообщение сброса кеша не отправлено (%s:%s): нет соединения LISTEN', namespace, key)
+            return
+        try:
+            async with self._lock:
+                await connection.execute('SELECT pg_notify($1, $2)', self.channel, self._message(namespace, key))
+        except Exception as e:
+            logger.warning('Сообщение сброса кеша не отправлено (%s:%s): %s', namespace, key, e)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        self._dispatch(payload)
+
+    async def start(self) -> None:
+        await super().start()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self, connection) -> None:
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        await connection.add_listener(self.channel, self._on_notification)
+        self._gap()
+        self._connection = connection
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), self.keepalive_seconds)
+            except asyncio.TimeoutError:
+                # Обрыв без закрытия TCP-соединения виден только по запросу
+                async with self._lock:
+                    await asyncio.wait_for(connection.fetchval('SELECT 1'), self.keepalive_seconds)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await self._listen(connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Соединение LISTEN для сброса кеша потеряно: %s', e)
+            finally:
+                if self._connection is not None:
+                    self._connection = None
+                    self._gap()
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(self.reconnect_seconds)
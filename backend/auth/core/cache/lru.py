@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Hashable, Tuple
+
+
+MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    """
+    Счётчики пространства имён кеша.
+    """
+    hits: int = 0               # Попадания в L1
+    l2_hits: int = 0            # Промах L1, попадание в L2
+    misses: int = 0             # Промах в обоих уровнях
+    evictions: int = 0          # Вытеснено из L1 по размеру
+    expirations: int = 0        # Удалено из L1 по TTL
+    invalidations: int = 0      # Сброшено явно или сообщением шины
+    l2_errors: int = 0          # Ошибки и таймауты L2
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class LRUCache:
+    """
+    L1-кеш в памяти процесса: LRU с ограничением числа записей и TTL.
+    Не потокобезопасен - используется из одного event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, stats: CacheStats) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = stats
+        self._entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            return MISSING
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
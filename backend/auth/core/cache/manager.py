@@ -0,0 +1,81 @@
+from typing import Dict, Optional, Type
+
+from core.config import settings
+from .bus import InvalidationBus, PostgresBus, RedisBus
+from .resp import RESPClient
+from .tiered import TieredCache
+
+
+class CacheManager:
+    """
+    Реестр пространств имён кеша. С CACHE_REDIS_URL у каждого пространства
+    есть общий L2 (Redis). Шина сброса L1 (bus): 'redis' - Redis pub/sub,
+    'postgres' - LISTEN/NOTIFY PostgreSQL, 'local' - только текущий процесс.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str],
+        channel: str,
+        timeout_ms: int,
+        reconnect_seconds: float,
+        bus: str = 'local',
+        keepalive_seconds: float = 30.0,
+        dsn: Optional[str] = None,
+    ) -> None:
+        self.backend: Optional[RESPClient] = RESPClient(redis_url, timeout=timeout_ms / 1000) if redis_url else None
+        self.backend_timeout = timeout_ms / 1000
+        if bus == 'redis':
+            self.bus: InvalidationBus = RedisBus(self.backend or RESPClient(redis_url), channel, reconnect_seconds, keepalive_seconds)
+        elif bus == 'postgres':
+            self.bus = PostgresBus(dsn, channel, reconnect_seconds, keepalive_seconds)
+        elif bus == 'local':
+            self.bus = InvalidationBus()
+        else:
+            raise ValueError(f'Неизвестная шина сброса кеша: {bus}')
+        self.bus.listen(self._on_invalidate, self._on_gap)
+        self._namespaces: Dict[str, TieredCache] = {}
+
+    def namespace(self, name: str, value_type: Type, max_entries: int, ttl_seconds: float) -> TieredCache:
+        cache = self._namespaces.get(name)
+        if cache is None:
+            cache = TieredCache(
+                name, value_type, max_entries, ttl_seconds,
+                bus=self.bus, backend=self.backend, backend_timeout=self.backend_timeout,
+            )
+            self._namespaces[name] = cache
+        return cache
+
+    def _on_invalidate(self, namespace: str, key: str) -> None:
+        cache = self._namespaces.get(namespace)
+        if cache is not None:
+            cache.drop_local(key)
+
+    def _on_gap(self) -> None:
+        for cache in self._namespaces.values():
+            cache.clear_local()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: dict(cache.stats.as_dict(), size=len(cache.l1))
+            for name, cache in self._namespaces.items()
+        }
+
+    async def start(self) -> None:
+        await self.bus.start()
+
+    async def stop(self) -> None:
+        await self.bus.stop()
+        if self.backend is not None:
+            await self.backend.close()
+
+
+cache_manager = CacheManager(
+    redis_url=settings.cache.redis_url,
+    channel=settings.cache.channel,
+    timeout_ms=settings.cache.timeout_ms,
+    reconnect_seconds=settings.cache.reconnect_seconds,
+    bus=settings.cache.bus,
+    keepalive_seconds=settings.cache.keepalive_seconds,
+    dsn=settings.db.dsn,
+)
@@ -0,0 +1,162 @@
+import asyncio
+from typing import Any, AsyncIterator, Callable, Optional
+from urllib.parse import urlparse
+
+
+class RESPError(Exception):
+    """Ответ сервера с ошибкой (-ERR ...)."""
+
+
+class RESPClient:
+    """
+    Минимальный клиент протокола Redis (RESP2) на asyncio: одно соединение,
+    команды выполняются по очереди. Поддерживает то, что нужно кешу:
+    GET/SET/DEL/PUBLISH и подписку на канал отдельным соединением.
+
+    Соединение открывается при первой команде (в event loop воркера),
+    после сетевой ошибки закрывается и открывается заново следующей командой.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0) -> None:
+        parsed = urlparse(url)
+        self.host: str = parsed.hostname or 'localhost'
+        self.port: int = parsed.port or 6379
+        self.password: Optional[str] = parsed.password
+        self.db: int = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def encode(*args: Any) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    @classmethod
+    async def read_reply(cls, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readuntil(b'\r\n')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            return RESPError(payload.decode('utf-8'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await reader.readexactly(length + 2))[:-2]
+        if prefix == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await cls.read_reply(reader) for _ in range(length)]
+        raise RESPError(f'Неизвестный тип ответа: {line!r}')
+
+    async def _open(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            if self.password:
+                await self._call(reader, writer, 'AUTH', self.password)
+            if self.db:
+                await self._call(reader, writer, 'SELECT', self.db)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _call(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, *args: Any) -> Any:
+        writer.write(self.encode(*args))
+        await writer.drain()
+        reply = await self.read_reply(reader)
+        if isinstance(reply, RESPError):
+            raise reply
+        return reply
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    self._reader, self._writer = await self._open()
+                return await asyncio.wait_for(self._call(self._reader, self._writer, *args), self.timeout)
+            except RESPError:
+                raise
+            except BaseException:
+                # Ответ мог остаться непрочитанным: соединение больше не годится
+                self._close()
+                raise
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute('GET', key)
+
+    async def set(self, key: str, value: bytes, ttl_ms: Optional[int] = None) -> None:
+        if ttl_ms:
+            await self.execute('SET', key, value, 'PX', ttl_ms)
+        else:
+            await self.execute('SET', key, value)
+
+    async def delete(self, key: str) -> int:
+        return await self.execute('DEL', key)
+
+    async def publish(self, channel: str, message: bytes) -> int:
+        return await self.execute('PUBLISH', channel, message)
+
+    async def subscribe(
+        self,
+        channel: str,
+        on_subscribed: Optional[Callable[[], None]] = None,
+        keepalive: Optional[float] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Сообщения канала. Отдельное соединение на время подписки;
+        при его потере итератор завершается исключением.
+        on_subscribed вызывается, когда сервер подтвердил подписку.
+        keepalive - после стольких секунд тишины отправляется PING; если и на него
+        за столько же секунд нет ответа, соединение считается потерянным (TimeoutError):
+        обрыв без закрытия TCP-соединения иначе не виден.
+        """
+        reader, writer = await self._open()
+        read: Optional[asyncio.Task] = None
+        try:
+            writer.write(self.encode('SUBSCRIBE', channel))
+            await writer.drain()
+            pinged = False
+            while True:
+                if read is None:
+                    read = asyncio.ensure_future(self.read_reply(reader))
+                done, _ = await asyncio.wait((read,), timeout=keepalive)
+                if not done:
+                    if pinged:
+                        raise asyncio.TimeoutError('Нет ответа на PING подписки')
+                    writer.write(self.encode('PING'))
+                    await writer.drain()
+                    pinged = True
+                    continue
+                reply, read, pinged = read.result(), None, False
+                if not isinstance(reply, list) or len(reply) != 3:
+                    continue
+                if reply[0] == b'message':
+                    yield reply[2]
+                elif reply[0] == b'subscribe' and on_subscribed is not None:
+                    on_subscribed()
+        finally:
+            if read is not None:
+                read.cancel()
+            writer.close()
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._close()
@@ -0,0 +1,119 @@
+import asyncio
+from typing import Any, Awaitable, Generic, Optional, Type, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.responses import type_adapter
+from .bus import InvalidationBus
+from .lru import MISSING, CacheStats, LRUCache
+from .resp import RESPClient
+
+import logging
+
+logger = logging.getLogger('site_auth_repository_logger')
+
+T = TypeVar('T')
+
+
+class TieredCache(Generic[T]):
+    """
+    Пространство имён кеша: L1 в памяти процесса и необязательный общий L2
+    (Redis). В L2 значения хранятся JSON-сериализованными через TypeAdapter
+    value_type. Ошибки и таймауты L2 считаются промахом: кеш работает
+    дальше только на L1. Сброс ключа удаляет его из L1 и L2 и рассылается
+    по шине в L1 остальных процессов.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        value_type: Type[T],
+        max_entries: int,
+        ttl_seconds: float,
+        bus: InvalidationBus,
+        backend: Optional[RESPClient] = None,
+        backend_timeout: float = 0.05,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self.l1 = LRUCache(max_entries, ttl_seconds, self.stats)
+        self.bus = bus
+        self.backend = backend
+        self.backend_timeout = backend_timeout
+        self.epoch = 0
+        self._adapter = type_adapter(value_type)
+
+    def _l2_key(self, key: str) -> str:
+        return f'cache:{self.namespace}:{key}'
+
+    async def _l2(self, operation: Awaitable[Any]) -> Any:
+        try:
+            return await asyncio.wait_for(operation, self.backend_timeout)
+        except Exception as e:
+            self.stats.l2_errors += 1
+            logger.warning('L2 кеша %s недоступен: %s', self.namespace, e)
+            return None
+
+    async def get(self, key: str) -> Optional[T]:
+        healthy = self.bus.healthy
+        if healthy:
+            value = self.l1.get(key)
+            if value is not MISSING:
+                self.stats.hits += 1
+                return value
+        if self.backend is not None:
+            raw = await self._l2(self.backend.get(self._l2_key(key)))
+            if raw is not None:
+                value = self._adapter.validate_json(raw)
+                if healthy:
+                    self.l1.set(key, value)
+                self.stats.l2_hits += 1
+                return value
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: T, epoch: Optional[int] = None) -> None:
+        if epoch is not None and epoch != self.epoch:
+            return
+        if self.bus.healthy:
+            self.l1.set(key, value)
+        if self.backend is not None:
+            await self._l2(self.backend.set(
+                self._l2_key(key), self._adapter.dump_json(value), int(self.ttl_seconds * 1000)
+            ))
+
+    async def notify(self, session: AsyncSession, key: str) -> None:
+        """
+        Сброс ключа в других процессах по commit транзакции session,
+        если шина это поддерживает (PostgresBus). После commit нужен invalidate.
+        """
+        await self.bus.notify(session, self.namespace, key)
+
+    async def invalidate(self, key: str, tombstone: Optional[T] = None) -> None:
+        """
+        Сброс ключа во всех процессах. tombstone - значение, которое записывается
+        вместо удаления (например, маркер новой версии без данных); оно пишется
+        до рассылки, чтобы получатели не перечитали из L2 старое значение.
+        Если шина транзакционная, остальные процессы уже получили сообщение notify.
+        """
+        self.stats.invalidations += 1
+        self.epoch += 1
+        if tombstone is None:
+            self.l1.delete(key)
+            if self.backend is not None:
+                await self._l2(self.backend.delete(self._l2_key(key)))
+        else:
+            await self.set(key, tombstone)
+        if not self.bus.transactional:
+            await self.bus.publish(self.namespace, key)
+
+    def drop_local(self, key: str) -> None:
+        """Сброс по сообщению шины от другого процесса: только L1."""
+        self.epoch += 1
+        if self.l1.delete(key):
+            self.stats.invalidations += 1
+
+    def clear_local(self) -> None:
+        """Очистка L1 при пропуске сообщений шины."""
+        self.epoch += 1
+        self.l1.clear()
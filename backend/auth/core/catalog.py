@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import Role, RoleGroup, role_group_role_association
+from core.models.role.role import RoleEnum
+from core.models.role.role_group import RoleGroupEnum
+from core.permissions import Permission, compile_permissions
+
+
+@dataclass(frozen=True)
+class RoleInfo:
+    id: int
+    name: RoleEnum
+    group: Optional[RoleGroupEnum]
+
+
+class RoleCatalog:
+    """
+    Справочник ролей в памяти процесса. Роли почти не меняются,
+    поэтому загружаются один раз (до fork или при старте воркера),
+    а не запрашиваются на каждую регистрацию и cookie-сессию.
+    Права каждой роли компилируются в битовое поле при заполнении.
+    """
+
+    def __init__(self) -> None:
+        self._by_name: Dict[RoleEnum, RoleInfo] = {}
+        self._by_id: Dict[int, RoleInfo] = {}
+        self._permissions: Dict[int, Permission] = {}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._by_name)
+
+    def fill(self, roles: Iterable[RoleInfo]) -> None:
+        by_name = {role.name: role for role in roles}
+        self._by_name = by_name
+        self._by_id = {role.id: role for role in by_name.values()}
+        self._permissions = {role.id: compile_permissions(role.name, role.group) for role in by_name.values()}
+
+    async def load(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(Role.id, Role.name, RoleGroup.name)
+            .outerjoin(role_group_role_association, role_group_role_association.c.role_id == Role.id)
+            .outerjoin(RoleGroup, RoleGroup.id == role_group_role_association.c.role_group_id)
+        )
+        self.fill(RoleInfo(id=row[0], name=row[1], group=row[2]) for row in result)
+
+    async def seed(self, session: AsyncSession) -> None:
+        """
+        Применение манифеста ролей и заполнение справочника его результатом
+        (без отдельного чтения). Фиксирует транзакцию session.
+        """
+        from core.role_manifest import seed_roles
+
+        roles = await seed_roles(session)
+        await session.commit()
+        self.fill(roles)
+
+    async def role_id(self, session: AsyncSession, name: RoleEnum) -> int:
+        """
+        Id роли по имени. Если справочник ещё не загружен, загружает его.
+        """
+        role = self._by_name.get(name)
+        if role is None:
+            await self.load(session)
+            role = self._by_name[name]
+        return role.id
+
+    async def find(self, session: AsyncSession, name: RoleEnum) -> Optional[int]:
+        """
+        Id роли по имени или None, если строки роли нет в БД. В отличие от role_id
+        справочник загружается только один раз: промах не перечитывает его.
+        """
+        if not self.ready:
+            await self.load(session)
+        role = self._by_name.get(name)
+        return role.id if role is not None else None
+
+    def get(self, role_id: int) -> Optional[RoleInfo]:
+        return self._by_id.get(role_id)
+
+    def permissions(self, role_id: int) -> Optional[Permission]:
+        """Права роли, None - роль неизвестна (справочник не загружен)."""
+        return self._permissions.get(role_id)
+
+
+role_catalog = RoleCatalog()
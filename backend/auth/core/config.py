@@ -2,12 +2,18 @@
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import List
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
 BASE_DIR = Path(__file__).parent.parent
 load_dotenv()
 
+# Число воркеров нужно до создания настроек: от него зависит размер пула соединений
+WEB_WORKERS = max(1, int(os.getenv('WEB_WORKERS', 1)))
+# Общий бюджет соединений к PostgreSQL на все воркеры (по умолчанию 5 + 10 на воркер, как в SQLAlchemy)
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', 15 * WEB_WORKERS))
+
 class ConfigurationDB(BaseModel):
     #########################
     #  PostgreSQL database  #
@@ -21,6 +27,9 @@ class ConfigurationDB(BaseModel):
     )
     fastapi_echo: bool = False
     aiogram_echo: bool = False
+    # Пул на воркер: треть доли бюджета постоянные соединения, остальное - overflow
+    pool_size: int = max(1, DB_CONNECTION_BUDGET // WEB_WORKERS // 3)
+    max_overflow: int = max(0, DB_CONNECTION_BUDGET // WEB_WORKERS - pool_size)
     sync_url: str = '{}://{}:{}@{}/{}'.format(
         os.getenv('DB_ENGINE_SYNC'),
         os.getenv('DB_USERNAME'),
@@ -28,6 +37,30 @@ class ConfigurationDB(BaseModel):
         os.getenv('DB_HOST'),
         os.getenv('DB_NAME')
     )
+    # Для соединений asyncpg вне SQLAlchemy (LISTEN)
+    dsn: str = 'postgresql://{}:{}@{}/{}'.format(
+        os.getenv('DB_USERNAME'),
+        os.getenv('DB_PASS'),
+        os.getenv('DB_HOST'),
+        os.getenv('DB_NAME')
+    )
+
+
+class ConfigurationServer(BaseModel):
+    #########################
+    #        Server         #
+    #########################
+    host: str = os.getenv('APP_HOST', '0.0.0.0')
+    port: int = int(os.getenv('APP_PORT', 5000))
+    workers: int = WEB_WORKERS
+    loop: str = os.getenv('WEB_LOOP', 'auto')                       # auto | uvloop | asyncio
+    http: str = os.getenv('WEB_HTTP', 'auto')                       # auto | httptools | h11
+    max_requests: int = int(os.getenv('WEB_MAX_REQUESTS', 0))       # Перезапуск воркера после N запросов (0 - без перезапуска)
+    max_requests_jitter: int = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 0))
+    graceful_timeout: int = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+    # Пауза между SIGTERM и закрытием сокета: /readyz уже 503, балансировщик успевает снять под
+    drain_delay: float = float(os.getenv('WEB_DRAIN_DELAY', 5))
+    log_config: Path = BASE_DIR / 'configs' / 'log_config.ini'
 
 
 class ConfigurationCORS(BaseModel):
@@ -48,10 +81,20 @@ class AuthorizationJWT(BaseModel):
     #########################
     private_key_path: Path = BASE_DIR / 'certs' / 'jwt-private.pem'
     public_key_path: Path = BASE_DIR / 'certs' / 'jwt-public.pem'
+    # Открытые ключи, которые ещё принимаются после ротации (через запятую): токены,
+    # подписанные прежним закрытым ключом, действуют до истечения срока
+    extra_public_key_paths: List[Path] = [Path(path) for path in os.getenv('JWT_EXTRA_PUBLIC_KEYS', '').split(',') if path]
     algorithm: str = 'RS256'
+    introspect_max_tokens: int = int(os.getenv('INTROSPECT_MAX_TOKENS', 100))     # Токенов в одном запросе /introspect
+    # Клиенты (заголовок X-Client-Id, через запятую), получающие непрозрачные токены вместо JWT
+    opaque_clients: List[str] = [client for client in os.getenv('AUTH_OPAQUE_CLIENTS', '').split(',') if client]
+    # Хранилище непрозрачных токенов: memory (один процесс) | redis (CACHE_REDIS_URL, общее)
+    opaque_store: str = os.getenv('OPAQUE_TOKEN_STORE', 'memory')
     
     access_token_expire_minutes: int = 15           # Токен доступа (15 минут)
     refresh_token_expire_minutes: int = 10080       # Токен обновления (7 дней = 7 * 24 * 60 = 10080 минут)
+    service_token_expire_minutes: int = int(os.getenv('SERVICE_TOKEN_EXPIRE_MINUTES', 15))      # Токен сервиса (client credentials)
+    service_token_refresh_seconds: int = int(os.getenv('SERVICE_TOKEN_REFRESH_SECONDS', 60))    # Раньше истечения выдаётся новый
 
 
 class ConfigurationLoki(BaseModel):
@@ -60,6 +103,120 @@ class ConfigurationLoki(BaseModel):
     #########################
     url: str = os.getenv('LOKI_URL')
 
+
+class ConfigurationWarmup(BaseModel):
+    #########################
+    #        Warmup         #
+    #########################
+    enabled: bool = os.getenv('WARMUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    connections: int = int(os.getenv('WARMUP_CONNECTIONS', 5))  # Не больше pool_size
+    timeout_seconds: float = 30
+    # Применять манифест ролей (core/role_manifest.py) при старте вместо чтения справочника
+    seed_roles: bool = os.getenv('ROLES_SEED_ON_STARTUP', 'false').lower() in ('1', 'true', 'yes')
+
+
+class ConfigurationWatchdog(BaseModel):
+    #########################
+    #  Event loop watchdog  #
+    #########################
+    # Включается только для разработки и canary-запусков: LOOP_WATCHDOG=true
+    enabled: bool = os.getenv('LOOP_WATCHDOG', 'false').lower() in ('1', 'true', 'yes')
+    threshold_ms: int = int(os.getenv('LOOP_WATCHDOG_THRESHOLD_MS', 100))      # Блокировка дольше порога считается регрессией
+    interval_ms: int = int(os.getenv('LOOP_WATCHDOG_INTERVAL_MS', 20))         # Период heartbeat-корутины
+    report_interval_seconds: int = int(os.getenv('LOOP_WATCHDOG_REPORT_SECONDS', 60))
+    stack_limit: int = 12                                                       # Глубина сохраняемого стека
+
+
+class ConfigurationMaintenance(BaseModel):
+    #########################
+    #  Guest profile prune  #
+    #########################
+    # Удаление гостевых профилей (без website/webapp пользователя), не посещавшихся дольше TTL
+    prune_enabled: bool = os.getenv('PRUNE_GUESTS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    guest_ttl_days: int = int(os.getenv('PRUNE_GUESTS_TTL_DAYS', 30))
+    interval_seconds: int = int(os.getenv('PRUNE_GUESTS_INTERVAL_SECONDS', 600))
+    batch_size: int = int(os.getenv('PRUNE_GUESTS_BATCH_SIZE', 500))
+    batch_pause: float = float(os.getenv('PRUNE_GUESTS_BATCH_PAUSE', 0.2))      # Пауза между пачками, с
+
+
+class ConfigurationRateLimit(BaseModel):
+    #########################
+    #     Rate limiting     #
+    #########################
+    enabled: bool = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Token bucket на ключ (ip:<адрес>, email:<адрес>)
+    login_capacity: int = 10                        # Попыток входа подряд
+    login_refill_per_minute: float = 10             # Восполнение попыток входа в минуту
+    register_capacity: int = 5
+    register_refill_per_minute: float = 5
+    # Неудачи: скользящее окно и экспоненциальный backoff
+    failure_threshold: int = 5                      # Неудач в окне до включения backoff
+    failure_window_seconds: float = 900             # 15 минут
+    backoff_base_seconds: float = 1
+    backoff_max_seconds: float = 900
+    # Шардирование и ограничение памяти
+    shards: int = 64
+    max_keys_per_shard: int = 4096
+    overflow_limit: int = 1000                      # Лимит окна для ключей переполненного шарда
+
+
+class ConfigurationEmailFilter(BaseModel):
+    #########################
+    #  Email Bloom filter   #
+    #########################
+    enabled: bool = os.getenv('EMAIL_FILTER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    capacity: int = 100_000                         # Минимальная ёмкость, фактическая - не меньше 2x числа пользователей
+    error_rate: float = 0.001                       # Доля ложноположительных ответов
+    stream_batch: int = 5000                        # Размер пачки при загрузке email из БД
+    # Перечитывание email из БД: импорт в обход регистрации, пропущенные сообщения шины. 0 - выключено
+    refresh_seconds: int = int(os.getenv('EMAIL_FILTER_REFRESH_SECONDS', 3600))
+    # Единственный под: фильтр работает и с локальной шиной (CACHE_BUS=local)
+    single_pod: bool = os.getenv('EMAIL_FILTER_SINGLE_POD', 'false').lower() in ('1', 'true', 'yes')
+
+
+class ConfigurationCache(BaseModel):
+    #########################
+    #   Two-tier cache      #
+    #########################
+    # Общий L2 (Redis). Без адреса кеш только в памяти процесса
+    redis_url: str | None = os.getenv('CACHE_REDIS_URL') or None
+    # Шина сброса L1 между воркерами: redis | postgres | local
+    bus: str = os.getenv('CACHE_BUS') or ('redis' if redis_url else 'local')
+    channel: str = 'cache:invalidate'
+    timeout_ms: int = int(os.getenv('CACHE_TIMEOUT_MS', 50))        # Дольше - промах L2
+    reconnect_seconds: float = 1.0
+    # Проверка соединения шины без сообщений (PING / SELECT 1), столько же ждём ответа
+    keepalive_seconds: float = float(os.getenv('CACHE_KEEPALIVE_SECONDS', 30))
+
+
+class ConfigurationMeCache(BaseModel):
+    #########################
+    #      /me cache        #
+    #########################
+    enabled: bool = os.getenv('ME_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    ttl_seconds: float = float(os.getenv('ME_CACHE_TTL_SECONDS', 30))   # Не реже - запрос в БД и обновление activity_date
+    max_entries: int = 10_000                       # LRU по email
+
+
+class ConfigurationVerify(BaseModel):
+    #########################
+    #  auth_request verify  #
+    #########################
+    # Кеш проверенных токенов /auth/verify: подпись не проверяется повторно в течение ttl
+    cache_ttl_seconds: float = float(os.getenv('VERIFY_CACHE_TTL_SECONDS', 5))
+    cache_max_entries: int = int(os.getenv('VERIFY_CACHE_MAX_ENTRIES', 10_000))
+
+
+class ConfigurationTelegram(BaseModel):
+    #########################
+    #   Telegram WebApp     #
+    #########################
+    # Токен бота: ключ проверки подписи initData. Без токена вход WebApp отключён
+    bot_token: str = os.getenv('TELEGRAM_BOT_TOKEN', '')
+    init_data_max_age_seconds: int = int(os.getenv('TELEGRAM_INIT_DATA_MAX_AGE_SECONDS', 86400))  # Старше - повторное открытие WebApp
+    init_data_max_len: int = 4096
+
+
 class Setting(BaseSettings):
     # GLOBAL
     # location_timezone: str = 'Europe/Moscow' # +3
@@ -70,8 +227,18 @@ class Setting(BaseSettings):
     
     # LOKI
     loki: ConfigurationLoki = ConfigurationLoki()
-    
+    watchdog: ConfigurationWatchdog = ConfigurationWatchdog()
+    warmup: ConfigurationWarmup = ConfigurationWarmup()
+    maintenance: ConfigurationMaintenance = ConfigurationMaintenance()
+    rate_limit: ConfigurationRateLimit = ConfigurationRateLimit()
+    email_filter: ConfigurationEmailFilter = ConfigurationEmailFilter()
+    cache: ConfigurationCache = ConfigurationCache()
+    me_cache: ConfigurationMeCache = ConfigurationMeCache()
+    verify: ConfigurationVerify = ConfigurationVerify()
+    telegram: ConfigurationTelegram = ConfigurationTelegram()
+
     db: ConfigurationDB = ConfigurationDB()
+    server: ConfigurationServer = ConfigurationServer()
     cors: ConfigurationCORS = ConfigurationCORS()
     auth_jwt: AuthorizationJWT = AuthorizationJWT()
 
@@ -80,4 +247,11 @@ class Setting(BaseSettings):
 
     referral_key_max_len: int = 128
 
+    visits_page_size: int = 20                      # Устройств на странице /visits по умолчанию
+    visits_page_max: int = 100
+
+    admin_page_size: int = 50                       # Пользователей на странице поиска администратора
+    admin_page_max: int = 500
+    admin_export_batch: int = 1000                  # Строк за одно чтение курсора при выгрузке
+
 settings = Setting()
\ No newline at end of file
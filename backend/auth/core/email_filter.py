@@ -0,0 +1,252 @@
+import asyncio, hashlib, math, mmap, multiprocessing, random
+from typing import Optional, Set
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.cache import InvalidationBus, cache_manager
+from core.config import settings
+from core.models import WebSiteUser
+from core.rate_limit import normalize_email
+
+import logging
+
+logger = logging.getLogger('site_auth_repository_logger')
+
+
+class BloomFilter:
+    """
+    Фильтр Блума на bytearray. k позиций вычисляются двойным хешированием
+    одного 128-битного blake2b: h1 + i * h2.
+
+    При shared=True биты лежат в анонимном разделяемом mmap: фильтр, построенный
+    до fork, общий для всех воркеров, и добавление в одном воркере сразу видно
+    в остальных. Запись под межпроцессной блокировкой, чтение без неё.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, shared: bool = False) -> None:
+        capacity = max(capacity, 1)
+        self.size: int = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes: int = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity: int = capacity
+        self.count: int = 0
+        self.shared: bool = shared
+        nbytes = (self.size + 7) // 8
+        self.bits = mmap.mmap(-1, nbytes) if shared else bytearray(nbytes)
+        self._lock = multiprocessing.Lock() if shared else None
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def _set(self, item: str) -> bool:
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        return added
+
+    def add(self, item: str) -> None:
+        """Повторное добавление (перестроение, сообщения шины) не увеличивает count."""
+        if self._lock is None:
+            added = self._set(item)
+        else:
+            with self._lock:
+                added = self._set(item)
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class EmailFilter:
+    """
+    Вероятностный фильтр зарегистрированных email.
+
+    False от might_exist означает, что пользователя точно нет, и можно не ходить в БД.
+    True - только "возможно есть". Пока фильтр не готов, всегда возвращается True.
+    Email хранятся нормализованными (нижний регистр), поэтому фильтр отвечает
+    "возможно есть" на любое написание адреса.
+
+    Регистрации в других процессах и подах приходят сообщением шины сброса
+    кеша (core/cache) в пространстве 'email'. Добавления во время построения
+    копятся и переносятся в новый фильтр. Адреса, записанные в БД в обход
+    регистрации (импорт users_copy), и пропущенные сообщения шины догружаются
+    периодическим перечитыванием раз в refresh_seconds и при пропуске сообщений.
+
+    Фильтр не готов, пока шина не доставляет сообщения, и с локальной шиной:
+    регистрации в других подах до него не доходят, и /login отвечал бы 401
+    до перечитывания. Локальная шина допустима только для единственного пода
+    (single_pod) и при этом - с фильтром, общим для воркеров (построен до fork),
+    или с одним воркером. Импорт users_copy просит процессы перечитать фильтр
+    сообщением с ключом RELOAD.
+    """
+
+    NAMESPACE = 'email'
+    # Ключ сообщения "перечитать фильтр": нормализованный email пустым не бывает
+    RELOAD = ''
+
+    def __init__(
+        self,
+        bus: InvalidationBus,
+        capacity: int,
+        error_rate: float,
+        stream_batch: int,
+        refresh_seconds: float = 0,
+        workers: int = 1,
+        single_pod: bool = False,
+    ) -> None:
+        self.bus = bus
+        self.min_capacity = capacity
+        self.error_rate = error_rate
+        self.stream_batch = stream_batch
+        self.refresh_seconds = refresh_seconds
+        self.workers = workers
+        self.single_pod = single_pod
+        self._bloom: BloomFilter | None = None
+        # Добавления во время построения, None - построение не идёт
+        self._pending: Optional[Set[str]] = None
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload: Optional[asyncio.Task] = None
+        bus.listen(self._on_message, self._on_gap)
+
+    @property
+    def built(self) -> bool:
+        return self._bloom is not None
+
+    @property
+    def ready(self) -> bool:
+        bloom = self._bloom
+        if bloom is None or not self.bus.healthy:
+            return False
+        if self.bus.distributed:
+            return True
+        return self.single_pod and (bloom.shared or self.workers <= 1)
+
+    async def build(self, session: AsyncSession, shared: bool = False) -> None:
+        """
+        Строит фильтр, потоково читая website_users.email пачками.
+        shared=True - для построения до fork в многопроцессном режиме.
+        Повторное построение дополняет текущий фильтр, пока он вмещает
+        всех пользователей: общий фильтр после fork иначе не заменить.
+        """
+        self._pending = set()
+        try:
+            total = (await session.execute(select(func.count(WebSiteUser.id)))).scalar_one()
+            bloom = self._bloom
+            if bloom is not None and total * 2 > bloom.capacity:
+                if bloom.shared:
+                    logger.warning('Фильтр email мал для %s адресов: нужен перезапуск сервера', total)
+                else:
+                    bloom = None
+            if bloom is None:
+                bloom = BloomFilter(max(self.min_capacity, total * 2), self.error_rate, shared=shared)
+            result = await session.stream_scalars(
+                select(WebSiteUser.email).execution_options(yield_per=self.stream_batch)
+            )
+            async for email in result:
+                bloom.add(normalize_email(email))
+            for email in self._pending:
+                bloom.add(email)
+            self._bloom = bloom
+        finally:
+            self._pending = None
+        logger.info('Фильтр email построен: %s адресов, %s байт', bloom.count, len(bloom.bits))
+
+    async def load(self, session_factory: async_sessionmaker, shared: bool = False) -> None:
+        """
+        Построение при старте приложения. Ошибка не мешает старту:
+        фильтр остаётся не готовым и пропускает все запросы в БД.
+        """
+        try:
+            async with session_factory() as session:
+                await self.build(session, shared=shared)
+        except Exception as e:
+            logger.error('Фильтр email не построен: %s', e)
+
+    def add(self, email: str) -> None:
+        email = normalize_email(email)
+        if self._pending is not None:
+            self._pending.add(email)
+        if self._bloom is None:
+            return
+        self._bloom.add(email)
+        if self._bloom.count == self._bloom.capacity:
+            logger.warning('Фильтр email заполнен (%s), доля ложноположительных растёт', self._bloom.capacity)
+
+    async def notify(self, session: AsyncSession, email: str) -> None:
+        """Сообщение о регистрации в транзакции session; после commit нужен publish."""
+        await self.bus.notify(session, self.NAMESPACE, normalize_email(email))
+
+    async def publish(self, email: str) -> None:
+        self.add(email)
+        if not self.bus.transactional:
+            await self.bus.publish(self.NAMESPACE, normalize_email(email))
+
+    def might_exist(self, email: str) -> bool:
+        if not self.ready:
+            return True
+        return normalize_email(email) in self._bloom
+
+    def reset(self) -> None:
+        self._bloom = None
+
+    @classmethod
+    def reload_message(cls) -> str:
+        """Сообщение шины от процесса вне приложения (импорт): перечитать фильтр."""
+        return InvalidationBus.SEPARATOR.join(('', cls.NAMESPACE, cls.RELOAD))
+
+    def _on_message(self, namespace: str, key: str) -> None:
+        if namespace != self.NAMESPACE:
+            return
+        if key == self.RELOAD:
+            self._on_gap()
+        else:
+            self.add(key)
+
+    def _on_gap(self) -> None:
+        # До первого построения перечитывать нечего: его выполнит прогрев
+        if self._bloom is None or self._session_factory is None or (self._reload is not None and not self._reload.done()):
+            return
+        self._reload = asyncio.get_running_loop().create_task(self.load(self._session_factory))
+
+    async def _run(self) -> None:
+        # Разброс: воркеры и поды не читают таблицу одновременно
+        await asyncio.sleep(random.uniform(0.5, 1.0) * self.refresh_seconds)
+        while True:
+            await self.load(self._session_factory)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        """Перечитывание при пропуске сообщений шины и раз в refresh_seconds."""
+        self._session_factory = session_factory
+        if self.refresh_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._session_factory = None
+        for task in (self._task, self._reload):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._reload = None
+
+
+email_filter = EmailFilter(
+    bus=cache_manager.bus,
+    capacity=settings.email_filter.capacity,
+    error_rate=settings.email_filter.error_rate,
+    stream_batch=settings.email_filter.stream_batch,
+    refresh_seconds=settings.email_filter.refresh_seconds,
+    workers=settings.server.workers,
+    single_pod=settings.email_filter.single_pod,
+)
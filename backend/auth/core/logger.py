@@ -1,5 +1,4 @@
-import logging, socket, requests, json, time
-from loki_logger_handler.loki_logger_handler import LokiLoggerHandler
+import logging.config, socket, json, time, os, queue, sys, threading
 from core.config import settings
 
 
@@ -29,8 +28,19 @@ class CustomJsonFormatter(logging.Formatter):
             
         return json.dumps(log_record, ensure_ascii=False)
 
-class CustomLokiHandler(LokiLoggerHandler):
-    def __init__(self, service=None, application=None, environment=None, included_fields=None, **kwargs):
+class CustomLokiHandler(logging.Handler):
+    """
+    Отправка логов в Loki.
+
+    При создании обработчик не открывает соединений и не запускает потоков:
+    фоновый поток отправки и HTTP-сессия создаются при первой записи в лог
+    в текущем процессе (в том числе заново в каждом воркере после fork).
+    emit только кладёт запись в очередь, поток отправляет их пачками.
+    """
+
+    def __init__(self, service=None, application=None, environment=None, included_fields=None,
+                 batch_size=100, flush_interval=1.0, **kwargs):
+        super().__init__()
         self.url = settings.loki.url
         # Создаем labels из переданных параметров
         self.labels = {
@@ -41,39 +51,92 @@ class CustomLokiHandler(LokiLoggerHandler):
         }
         # Поля, которые будут включены в лог (по умолчанию пустой список - ничего не включать)
         self.included_fields = set(included_fields or [])
-        super().__init__(self.url, labels=self.labels, **kwargs)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = None
+        self._thread = None
+        self._pid = None
 
-    def emit(self, record):
+    def _ensure_sender(self):
+        # Вызывается под self.lock (Handler.handle); после fork поток родителя не существует
+        if self._pid == os.getpid():
+            return
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._sender, args=(self._queue,), name=f'loki-{self.labels["service"]}', daemon=True
+        )
+        self._thread.start()
+        self._pid = os.getpid()
 
-        # Получаем теги из record
-        tags = getattr(record, 'tags', {})
-        if not isinstance(tags, dict):
-            tags = {}
+    def emit(self, record):
+        try:
+            # Получаем теги из record
+            tags = getattr(record, 'tags', {})
+            if not isinstance(tags, dict):
+                tags = {}
 
-        # Создаем основное сообщение с полями
-        log_entry = {
-            "message": record.getMessage(),
-            "level": record.levelname.lower(),
-            "timestamp": int(time.time() * 1000),
-            "logger": record.name,
-            "source": {
-                "file": record.filename,
-                "line": record.lineno,
-                "function": record.funcName
+            # Создаем основное сообщение с полями
+            log_entry = {
+                "message": record.getMessage(),
+                "level": record.levelname.lower(),
+                "timestamp": int(time.time() * 1000),
+                "logger": record.name,
+                "source": {
+                    "file": record.filename,
+                    "line": record.lineno,
+                    "function": record.funcName
+                }
             }
-        }
 
-        # Добавляем пользовательские теги как поля верхнего уровня
-        # for key, value in tags.items():
-        #     if isinstance(value, (str, int, float, bool, type(None))):
-        #         log_entry[key] = value
+            # Добавляем только разрешенные поля из тегов
+            for field in self.included_fields:
+                if field in tags:
+                    log_entry[field] = tags[field]
+
+            self._ensure_sender()
+            self._queue.put((
+                record.levelname.lower(),
+                [str(int(time.time() * 1e9)), json.dumps(log_entry, ensure_ascii=False)],
+            ))
+        except Exception:
+            self.handleError(record)
 
-        # Добавляем только разрешенные поля из тегов
-        for field in self.included_fields:
-            if field in tags:
-                log_entry[field] = tags[field]
+    def _sender(self, entries):
+        """Фоновый поток: собирает пачку записей и отправляет одним запросом."""
+        import requests
 
-        # Формируем финальное сообщение для Loki
+        session = requests.Session()
+        session.headers.update({
+            'Content-Type': 'application/json',
+            'X-Scope-OrgID': 'tenant1'
+        })
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                entry = entries.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while entry is not None:
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    entry = entries.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+            if batch:
+                self._send_to_loki(session, batch)
+        session.close()
+
+    def _send_to_loki(self, session, batch):
+        """Отправляет пачку записей в Loki, по одному потоку на уровень"""
+        streams = {}
+        for level, value in batch:
+            streams.setdefault(level, []).append(value)
         msg = {
             "streams": [{
                 "stream": {
@@ -81,29 +144,39 @@ class CustomLokiHandler(LokiLoggerHandler):
                     "environment": self.labels['environment'],
                     "service": self.labels['service'],
                     "host": self.labels['host'],
-                    "level": record.levelname.lower()
+                    "level": level
                 },
-                "values": [
-                    [str(int(time.time() * 1e9)), json.dumps(log_entry, ensure_ascii=False)]
-                ]
-            }]
+                "values": values
+            } for level, values in streams.items()]
         }
-        # Отправляем сообщение
-        self._send_to_loki(msg)
+        try:
+            session.post(self.url, data=json.dumps(msg), timeout=5)
+        except Exception as e:
+            print(f'Loki недоступен ({self.labels["service"]}): {e}', file=sys.stderr)
 
-    def _send_to_loki(self, msg):
-        """Отправляет сообщение в Loki"""
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Scope-OrgID': 'tenant1'
-        }
-        
-        requests.post(
-            self.url,
-            data=json.dumps(msg),
-            headers=headers,
-            timeout=5
-        )
+    def close(self):
+        # Дожидаемся отправки накопленного (logging.shutdown вызывает close при выходе)
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        super().close()
+
+
+class VerifySuccessFilter(logging.Filter):
+    """
+    Не пишет в журнал доступа uvicorn успешные подзапросы auth_request (/auth/verify):
+    их столько же, сколько запросов ко всем сервисам за nginx.
+    """
+
+    path = f'{settings.api_site_v1_prefix}/auth/verify'
+
+    def filter(self, record):
+        args = record.args
+        if isinstance(args, tuple) and len(args) == 5:
+            _, _, path, _, status_code = args
+            if status_code < 400 and str(path).split('?', 1)[0] == self.path:
+                return False
+        return True
 
 
 logger_config = {
@@ -148,6 +221,24 @@ logger_config = {
             'environment': 'development',
             'included_fields': custom_included_fields
 		},
+        'loop_watchdog': {
+			'()': 'core.logger.CustomLokiHandler',
+            'level': 'DEBUG',
+            'formatter': 'app_format',
+            'service': 'loop_watchdog',
+            'application': 'fastapi-auth',
+            'environment': 'development',
+            'included_fields': custom_included_fields
+		},
+        'maintenance': {
+			'()': 'core.logger.CustomLokiHandler',
+            'level': 'DEBUG',
+            'formatter': 'app_format',
+            'service': 'maintenance',
+            'application': 'fastapi-auth',
+            'environment': 'development',
+            'included_fields': custom_included_fields
+		},
 	},
     'loggers': {
         'site_auth_repository_logger': {
@@ -165,5 +256,31 @@ logger_config = {
 			'handlers': ['model_profile'],
 			'propagate': False
 		},
+        'loop_watchdog_logger': {
+			'level': 'INFO',
+			'handlers': ['console', 'loop_watchdog'],
+			'propagate': False
+		},
+        'maintenance_logger': {
+			'level': 'INFO',
+			'handlers': ['maintenance'],
+			'propagate': False
+		},
 	},
-}
\ No newline at end of file
+}
+
+
+_logging_configured = False
+
+
+def setup_logging() -> None:
+    """
+    Однократная настройка логгеров приложения. Вызывается на этапе запуска
+    (core/startup.py), а не при импорте модулей.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    logging.config.dictConfig(logger_config)
+    logging.getLogger('uvicorn.access').addFilter(VerifySuccessFilter())
+    _logging_configured = True
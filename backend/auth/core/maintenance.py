@@ -0,0 +1,145 @@
+import asyncio, random
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from core.config import settings
+from core.models import db_fastapi_connect, Profile, UserAssociation
+from core.models.base import date_now
+
+import logging
+
+logger = logging.getLogger('maintenance_logger')
+
+# Ключ pg_advisory_lock: очистку выполняет один воркер на все процессы и поды
+PRUNE_LOCK_KEY = 0x67756573745F7072  # b'guest_pr'
+
+
+class GuestProfilePruner:
+    """
+    Фоновое удаление гостевых профилей: связь без website- и webapp-пользователя,
+    удаление отложено (prune_pending) или последнее посещение раньше ttl.
+    Удаляет пачками по batch_size - сначала отложенные в порядке id, затем
+    устаревшие в порядке (visit_date, id) - с паузой между пачками, каждая
+    пачка - своя транзакция. Связи users_associations удаляются каскадом.
+
+    Задача запускается в каждом воркере, но проход выполняет только тот,
+    кто получил pg_try_advisory_lock; остальные пропускают его.
+    """
+
+    def __init__(self, ttl_days: int, interval_seconds: int, batch_size: int, batch_pause: float) -> None:
+        self.ttl = timedelta(days=ttl_days)
+        self.interval: float = interval_seconds
+        self.batch_size: int = batch_size
+        self.batch_pause: float = batch_pause
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @staticmethod
+    async def defer(session: AsyncSession, profile_id: int) -> None:
+        """
+        Отложенное удаление профиля (слияние гостевого профиля при входе):
+        профиль помечается prune_pending и удаляется ближайшим проходом очистки,
+        а не каскадом внутри транзакции запроса. Отметку не снимают обновления
+        cookie-сессии (они меняют visit_date). Core update не вызывает
+        before_update профиля, поэтому история посещений не меняется.
+        """
+        await session.execute(update(Profile).where(Profile.id == profile_id).values(prune_pending=True))
+
+    def _batch(self, condition, key: tuple, after: Optional[tuple]):
+        candidates = (
+            select(Profile.id)
+            .join(UserAssociation, UserAssociation.profile_id == Profile.id)
+            .where(
+                UserAssociation.user_website_id.is_(None),
+                UserAssociation.user_webapp_id.is_(None),
+                condition,
+            )
+            .order_by(*key)
+            .limit(self.batch_size)
+            # Профиль, который сейчас обновляет запрос cookie-сессии, пропускаем
+            .with_for_update(of=Profile, skip_locked=True)
+        )
+        if after is not None:
+            candidates = candidates.where(tuple_(*key) > after)
+        return (
+            delete(Profile)
+            .where(Profile.id.in_(candidates.scalar_subquery()))
+            .returning(*key)
+        )
+
+    async def prune(self, engine: Optional[AsyncEngine] = None) -> Optional[int]:
+        """
+        Один проход очистки. Возвращает число удалённых профилей
+        или None, если проход уже выполняет другой процесс.
+        """
+        engine = engine or db_fastapi_connect.engine
+        cutoff = date_now() - self.ttl
+        passes = (
+            (Profile.prune_pending.is_(True), (Profile.id,)),
+            (Profile.visit_date < cutoff, (Profile.visit_date, Profile.id)),
+        )
+        deleted = 0
+        async with engine.connect() as connection:
+            # Блокировка уровня сессии: держится между транзакциями пачек
+            locked = await connection.scalar(select(func.pg_try_advisory_lock(PRUNE_LOCK_KEY)))
+            await connection.commit()
+            if not locked:
+                return None
+            try:
+                for condition, key in passes:
+                    after = None
+                    while True:
+                        rows = (await connection.execute(self._batch(condition, key, after))).all()
+                        await connection.commit()
+                        if not rows:
+                            break
+                        deleted += len(rows)
+                        after = tuple(max(rows))
+                        await asyncio.sleep(self.batch_pause)
+            finally:
+                try:
+                    await connection.execute(select(func.pg_advisory_unlock(PRUNE_LOCK_KEY)))
+                    await connection.commit()
+                except Exception:
+                    # Соединение не вернётся в пул с блокировкой: закрытие снимает её
+                    await connection.invalidate()
+                    raise
+        if deleted:
+            logger.info('Удалено гостевых профилей: %s', deleted)
+        return deleted
+
+    async def _run(self) -> None:
+        # Разброс старта: воркеры не конкурируют за блокировку одновременно
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.error('Очистка гостевых профилей не выполнена: %s', e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+guest_profile_pruner = GuestProfilePruner(
+    ttl_days=settings.maintenance.guest_ttl_days,
+    interval_seconds=settings.maintenance.interval_seconds,
+    batch_size=settings.maintenance.batch_size,
+    batch_pause=settings.maintenance.batch_pause,
+)
@@ -0,0 +1,63 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import TieredCache, cache_manager
+from core.config import settings
+
+
+@dataclass(frozen=True)
+class MeEntry:
+    version: int
+    body: Optional[bytes]
+    etag: Optional[str]
+
+
+class MeCache:
+    """
+    Кеш сериализованного ответа /me по (email, website_users.data_version)
+    в пространстве имён 'me' общего кеша (core/cache).
+
+    Запись, изменяющая данные /me, увеличивает data_version и вызывает notify
+    в той же транзакции, а после commit - invalidate с новой версией: значение
+    заменяется "пустым" с этой версией и сбрасывается в L1 остальных воркеров.
+    Ответ читается из БД под блокировкой строки вместе с версией: прочитанный
+    до изменения (с меньшей версией) уже не попадёт в кеш.
+    Записи живут ttl секунд - это же ограничивает частоту обновления
+    activity_date при опросе /me.
+    """
+
+    def __init__(self, cache: TieredCache) -> None:
+        self.cache = cache
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+    async def get(self, email: str) -> Optional[MeEntry]:
+        entry = await self.cache.get(email)
+        if entry is None or entry.body is None:
+            return None
+        return entry
+
+    async def put(self, email: str, version: int, body: bytes) -> MeEntry:
+        entry = MeEntry(version, body, self.make_etag(body))
+        current = await self.cache.get(email)
+        if current is None or current.version <= version:
+            await self.cache.set(email, entry)
+        return entry
+
+    async def notify(self, session: AsyncSession, email: str) -> None:
+        await self.cache.notify(session, email)
+
+    async def invalidate(self, email: str, version: int) -> None:
+        await self.cache.invalidate(email, tombstone=MeEntry(version, None, None))
+
+
+me_cache = MeCache(cache_manager.namespace(
+    'me',
+    value_type=MeEntry,
+    max_entries=settings.me_cache.max_entries,
+    ttl_seconds=settings.me_cache.ttl_seconds,
+))
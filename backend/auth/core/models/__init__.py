@@ -6,7 +6,10 @@ __all__ = (
     'role_group_role_association',
     'UserAssociation',
     'WebSiteUser',
+    'WebAppUser',
     'Profile',
+    'ProfileVisit',
+    'ServiceClient',
 )
 
 from .base import Base
@@ -15,5 +18,7 @@ from .role.role_group import RoleGroup
 from .role.role import Role
 from .role.role_group_association import role_group_role_association
 from .user.user_association import UserAssociation
-from .user.user import WebSiteUser
+from .user.user import WebSiteUser, WebAppUser
 from .user.profile import Profile
+from .user.profile_visit import ProfileVisit
+from .service.service_client import ServiceClient
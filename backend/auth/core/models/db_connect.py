@@ -10,10 +10,12 @@ from core.config import settings
 
 
 class DatabaseFastapiConnect:
-    def __init__(self, url: str, echo: bool = False):
+    def __init__(self, url: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10):
         self.engine = create_async_engine(
             url=url,
             echo=echo,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
         )
         self.session_factory = async_sessionmaker(
             bind=self.engine,
@@ -29,6 +31,10 @@ class DatabaseFastapiConnect:
         )
         return session
 
+    def session_factory_dependency(self) -> async_sessionmaker:
+        # Для потоковых ответов: сессия зависимости закрывается до отправки тела
+        return self.session_factory
+
     async def scoped_session_dependency(self) -> AsyncSession: # type: ignore
         session = self.get_scoped_session()
         try:
@@ -39,5 +45,7 @@ class DatabaseFastapiConnect:
 db_fastapi_connect = DatabaseFastapiConnect(
     url=settings.db.async_url,
     echo=settings.db.fastapi_echo,
+    pool_size=settings.db.pool_size,
+    max_overflow=settings.db.max_overflow,
 )
 
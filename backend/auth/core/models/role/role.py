@@ -20,6 +20,8 @@ class RoleEnum(Enum):
     GLOBAL_ADMIN = 'global_admin'                   # Глобальный администратор с полными правами управления платформой
     CONTENT_ADMIN = 'content_admin'                 # Администратор, ответственный за управление и модерацию контента на уровне всей платформы
 
+    SERVICE = 'service'                             # Внутренний сервис (client credentials)
+
 
 class Role(Base):
     __tablename__ = 'roles'
@@ -14,6 +14,7 @@ class RoleGroupEnum(Enum):
     GUESTS = 'guests'                               # незарегистрированные пользователи
     USERS = 'users'                                 # пользователи
     ADMINISTRATORS = 'administrators'               # группа администраторов
+    SERVICES = 'services'                           # внутренние сервисы
 
 class RoleGroup(Base):
     __tablename__ = 'roles_groups'
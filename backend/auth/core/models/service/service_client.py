@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from datetime import datetime
+from ..base import Base
+
+
+class ServiceClient(Base):
+    __tablename__ = 'service_clients'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    client_id: Mapped[str] = mapped_column(String(64), unique=True)
+    # SHA-256 секрета: секрет случайный (256 бит), медленный хеш не нужен
+    secret_hash: Mapped[str] = mapped_column(String(64))
+    title: Mapped[str] = mapped_column(String(150))
+    active: Mapped[bool] = mapped_column(default=True, server_default='true')
+    created_date: Mapped[datetime] = mapped_column(DateTime().with_variant(TIMESTAMP(timezone=True), 'postgresql'))
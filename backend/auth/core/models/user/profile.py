@@ -1,17 +1,16 @@
 from typing import TYPE_CHECKING
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy import String, DateTime, event
+from sqlalchemy import String, DateTime, Index, event, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP, JSONB
 from sqlalchemy.ext.mutable import MutableList
 from datetime import datetime
 from ..base import date_now
+from .profile_visit import upsert_visit
 from ..base import Base
 
-import logging.config
-from core.logger import logger_config
+import logging
 
-logging.config.dictConfig(logger_config)
 logger = logging.getLogger('model_profile_logger')
 
 if TYPE_CHECKING:
@@ -35,6 +34,8 @@ class Profile(Base):
     ip: Mapped[str] = mapped_column(String(45))
     user_agent: Mapped[str] = mapped_column(String(255))
     history: Mapped[MutableList] = mapped_column(MutableList.as_mutable(JSONB), default=lambda: [])
+    # Удаление отложено до прохода очистки (слияние гостевого профиля при входе)
+    prune_pending: Mapped[bool] = mapped_column(server_default='false')
     
     user_association: Mapped['UserAssociation'] = relationship(
         back_populates='profile',
@@ -43,6 +44,13 @@ class Profile(Base):
         passive_deletes=True
     )
 
+    __table_args__ = (
+        # Очистка гостевых профилей от самых старых (миграция 004)
+        Index('ix_profiles_visit_date_id', 'visit_date', 'id'),
+        # Профили с отложенным удалением (миграция 011)
+        Index('ix_profiles_prune_pending', 'id', postgresql_where=text('prune_pending')),
+    )
+
     def add_history(self):
         current_visit = date_now()
         self.visit_date = current_visit
@@ -75,11 +83,21 @@ class Profile(Base):
         flag_modified(self, 'history')
         logger.debug('После обновления профиля: %s', self.history)
 
+def record_visit(connection, target: Profile) -> None:
+    # Посещение - в profile_visits, в той же транзакции (вызов без ip и User-Agent не учитывается)
+    if target.ip or target.user_agent:
+        connection.execute(upsert_visit(target.id, target.ip or '', target.user_agent or '', target.visit_date))
+
 # Обработчик события before_update: будем фиксировать состояние Profile перед обновлением.
 def before_update_listener(mapper, connection, target: Profile):
     logger.debug('Добавление в историю профиля id=%s', target.id)
     # target — это объект Profile, который обновляется
     target.add_history()
+    record_visit(connection, target)
+
+def after_insert_listener(mapper, connection, target: Profile):
+    record_visit(connection, target)
 
 # Регистрируем обработчик события before_update для класса Profile.
 event.listen(Profile, 'before_update', before_update_listener)
+event.listen(Profile, 'after_insert', after_insert_listener)
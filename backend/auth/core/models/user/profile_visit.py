@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, ForeignKey, Index, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TIMESTAMP, insert
+from sqlalchemy.orm import Mapped, mapped_column
+from ..base import Base
+
+
+class ProfileVisit(Base):
+    """
+    Посещения профиля: строка на пару ip и User-Agent (устройство) со временем
+    первого и последнего входа. Список устройств читается по индексу
+    (profile_id, last_visit, id) страницами, без загрузки Profile.history.
+    """
+    __tablename__ = 'profile_visits'
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    profile_id: Mapped[int] = mapped_column(ForeignKey('profiles.id', ondelete='CASCADE'))
+    ip: Mapped[str] = mapped_column(String(45))
+    user_agent: Mapped[str] = mapped_column(String(255))
+    first_visit: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    last_visit: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        UniqueConstraint('profile_id', 'ip', 'user_agent', name='idx_unique_profile_visits'),
+        # Keyset-пагинация списка устройств от последнего входа (миграция 008)
+        Index('ix_profile_visits_profile_last_visit', 'profile_id', last_visit.desc(), id.desc()),
+    )
+
+
+def upsert_visit(profile_id: int, ip: str, user_agent: str, visit_date: datetime):
+    """Запись посещения: новое устройство или обновление last_visit существующего."""
+    statement = insert(ProfileVisit).values(
+        profile_id=profile_id, ip=ip[:45], user_agent=user_agent[:255],
+        first_visit=visit_date, last_visit=visit_date,
+    )
+    return statement.on_conflict_do_update(
+        constraint='idx_unique_profile_visits',
+        set_={'last_visit': statement.excluded.last_visit},
+    )
@@ -1,6 +1,6 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime
+from sqlalchemy import BigInteger, String, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from datetime import datetime
 from ..base import Base
@@ -17,16 +17,44 @@ class WebSiteUser(Base):
     register_date: Mapped[datetime] = mapped_column(DateTime().with_variant(TIMESTAMP(timezone=True), 'postgresql'))
     activity_date: Mapped[datetime] = mapped_column(DateTime().with_variant(TIMESTAMP(timezone=True), 'postgresql'))
     email_confirm: Mapped[bool] = mapped_column(default=False)
+    # Увеличивается каждой записью, меняющей данные /me (подтверждение email, роль, аватар, пароль)
+    data_version: Mapped[int] = mapped_column(default=0, server_default='0')
+    # Токены, выпущенные раньше этого момента, отозваны (смена пароля, выход со всех устройств)
+    tokens_valid_after: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
     
     website_user_association: Mapped['UserAssociation'] = relationship(back_populates='website_user')
 
+# Email уникален без учёта регистра, по индексу же идёт поиск (миграция 010)
+Index('idx_unique_website_users_email_lower', func.lower(WebSiteUser.email), unique=True)
+# Поиск администратора по подстроке email, pg_trgm (миграция 009)
+Index(
+    'ix_website_users_email_trgm', func.lower(WebSiteUser.email).label('email_lower'),
+    postgresql_using='gin', postgresql_ops={'email_lower': 'gin_trgm_ops'},
+)
+# Пользователи с отзывом токенов (миграция 005)
+Index(
+    'ix_website_users_tokens_valid_after', WebSiteUser.tokens_valid_after,
+    postgresql_where=WebSiteUser.tokens_valid_after.isnot(None),
+)
+
 class WebAppUser(Base):
     __tablename__ = 'webapp_users'
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True)
-    
+    # Пользователь Telegram из подписанных initData (миграция 007)
+    telegram_id: Mapped[Optional[int]] = mapped_column(BigInteger)
+    username: Mapped[Optional[str]] = mapped_column(String(32))
+    first_name: Mapped[Optional[str]] = mapped_column(String(64))
+    last_name: Mapped[Optional[str]] = mapped_column(String(64))
+    language_code: Mapped[Optional[str]] = mapped_column(String(16))
+    register_date: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    activity_date: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+
     webapp_user_association: Mapped['UserAssociation'] = relationship(back_populates='webapp_user',  uselist=False)
 
+# Цель ON CONFLICT входа WebApp (миграция 007)
+Index('ix_webapp_users_telegram_id', WebAppUser.telegram_id, unique=True)
+
 
 # class MobileAppUser(Base):
 #     pass
\ No newline at end of file
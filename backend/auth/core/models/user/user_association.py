@@ -54,4 +54,18 @@ class UserAssociation(Base):
             unique=True, 
             postgresql_where=user_website_id.is_(None)
         ),
+        # Поиск связи по пользователю и профилю (миграция 003)
+        Index(
+            'ix_users_associations_user_website_id',
+            'user_website_id',
+            postgresql_where=user_website_id.isnot(None)
+        ),
+        # Одна связь на пользователя WebApp: цель ON CONFLICT входа WebApp (миграция 007)
+        Index(
+            'idx_unique_webapp_user_associations',
+            'user_webapp_id',
+            unique=True,
+            postgresql_where=user_webapp_id.isnot(None)
+        ),
+        Index('ix_users_associations_profile_id', 'profile_id'),
     )
\ No newline at end of file
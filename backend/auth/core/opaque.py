@@ -0,0 +1,215 @@
+import hashlib, secrets, time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from core.cache import RESPClient
+from core.config import settings
+from core.responses import type_adapter
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+
+@dataclass(frozen=True, slots=True)
+class OpaqueSession:
+    """Запись непрозрачного токена: те же claims, что и в JWT, и вид токена."""
+    sub: str
+    rol: int
+    prm: Optional[int]
+    iat: int
+    exp: int
+    kind: str
+
+    def claims(self) -> dict:
+        claims = {'sub': self.sub, 'rol': self.rol, 'iat': self.iat, 'exp': self.exp}
+        if self.prm is not None:
+            claims['prm'] = self.prm
+        return claims
+
+
+class TimingWheel:
+    """
+    Колесо таймеров: ключ попадает в ячейку своей секунды истечения
+    (по модулю числа ячеек), O(1) на добавление. advance обходит только
+    ячейки прошедших тиков и возвращает истёкшие ключи; ключи с более
+    поздним сроком (следующий оборот колеса) остаются в ячейке.
+    """
+
+    def __init__(self, slots: int, tick_seconds: float = 1.0) -> None:
+        self.slots = slots
+        self.tick_seconds = tick_seconds
+        self._buckets: List[Dict[str, float]] = [{} for _ in range(slots)]
+        self._tick = int(time.time() / tick_seconds)
+
+    def _bucket(self, expires: float) -> Dict[str, float]:
+        # Уже прошедший тик не будет обойден: такой ключ истекает на следующем
+        tick = max(int(expires / self.tick_seconds), self._tick + 1)
+        return self._buckets[tick % self.slots]
+
+    def schedule(self, key: str, expires: float) -> None:
+        self._bucket(expires)[key] = expires
+
+    def cancel(self, key: str, expires: float) -> bool:
+        return self._bucket(expires).pop(key, None) is not None
+
+    def advance(self, now: float) -> List[str]:
+        tick = int(now / self.tick_seconds)
+        expired: List[str] = []
+        # Не больше одного оборота: дальше ячейки повторяются
+        for current in range(max(self._tick + 1, tick - self.slots + 1), tick + 1):
+            bucket = self._buckets[current % self.slots]
+            due = [key for key, expires in bucket.items() if expires <= now]
+            for key in due:
+                del bucket[key]
+            expired.extend(due)
+        self._tick = max(self._tick, tick)
+        return expired
+
+
+class OpaqueTokenStore(ABC):
+    """
+    Хранилище непрозрачных токенов: случайная строка -> OpaqueSession.
+    Проверка - поиск по ключу, отзыв действует сразу.
+    """
+
+    @staticmethod
+    def new_token() -> str:
+        return secrets.token_urlsafe(24)
+
+    @abstractmethod
+    async def issue(self, session: OpaqueSession) -> str:
+        """Новый токен для записи session."""
+
+    @abstractmethod
+    async def get(self, token: str) -> Optional[OpaqueSession]:
+        """Запись действующего токена, None - токен истёк или отозван."""
+
+    @abstractmethod
+    async def revoke(self, token: str) -> bool:
+        """Отзыв одного токена."""
+
+    @abstractmethod
+    async def revoke_subject(self, subject: str) -> int:
+        """Отзыв всех токенов пользователя (смена пароля)."""
+
+
+class MemoryTokenStore(OpaqueTokenStore):
+    """
+    Хранилище в памяти процесса. Истёкшие записи удаляются колесом таймеров
+    при каждом обращении, без фоновой задачи. Токен действителен только
+    в процессе, который его выдал: для нескольких воркеров нужно общее хранилище.
+    """
+
+    def __init__(self, wheel_slots: int = 3600) -> None:
+        self._sessions: Dict[str, OpaqueSession] = {}
+        self._by_subject: Dict[str, Set[str]] = {}
+        self._wheel = TimingWheel(wheel_slots)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _forget(self, token: str) -> Optional[OpaqueSession]:
+        session = self._sessions.pop(token, None)
+        if session is not None:
+            tokens = self._by_subject.get(session.sub)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_subject[session.sub]
+        return session
+
+    def _expire(self, now: float) -> None:
+        for token in self._wheel.advance(now):
+            self._forget(token)
+
+    async def issue(self, session: OpaqueSession) -> str:
+        self._expire(time.time())
+        token = self.new_token()
+        self._sessions[token] = session
+        self._by_subject.setdefault(session.sub, set()).add(token)
+        self._wheel.schedule(token, session.exp)
+        return token
+
+    async def get(self, token: str) -> Optional[OpaqueSession]:
+        now = time.time()
+        self._expire(now)
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        # Точность колеса - тик: срок проверяется и здесь
+        if session.exp <= now:
+            await self.revoke(token)
+            return None
+        return session
+
+    async def revoke(self, token: str) -> bool:
+        session = self._forget(token)
+        if session is None:
+            return False
+        self._wheel.cancel(token, session.exp)
+        return True
+
+    async def revoke_subject(self, subject: str) -> int:
+        tokens = list(self._by_subject.get(subject, ()))
+        for token in tokens:
+            await self.revoke(token)
+        return len(tokens)
+
+
+class RedisTokenStore(OpaqueTokenStore):
+    """
+    Общее хранилище в Redis для нескольких воркеров и подов. Ключ - хеш
+    токена (сам токен в Redis не хранится), срок - PX записи. Токены
+    пользователя перечислены в множестве для отзыва всех сразу.
+    """
+
+    def __init__(self, client: RESPClient, prefix: str = 'opaque') -> None:
+        self.client = client
+        self.prefix = prefix
+        self._adapter = type_adapter(OpaqueSession)
+
+    def _key(self, token: str) -> str:
+        return f'{self.prefix}:token:{hashlib.sha256(token.encode()).hexdigest()}'
+
+    def _subject_key(self, subject: str) -> str:
+        return f'{self.prefix}:sub:{subject}'
+
+    async def issue(self, session: OpaqueSession) -> str:
+        token = self.new_token()
+        key = self._key(token)
+        ttl_ms = max(1, int((session.exp - time.time()) * 1000))
+        await self.client.set(key, self._adapter.dump_json(session), ttl_ms)
+        subject_key = self._subject_key(session.sub)
+        await self.client.execute('SADD', subject_key, key)
+        # Множество живёт не меньше самого долгого токена пользователя (refresh)
+        await self.client.execute(
+            'PEXPIRE', subject_key, max(ttl_ms, settings.auth_jwt.refresh_token_expire_minutes * 60_000)
+        )
+        return token
+
+    async def get(self, token: str) -> Optional[OpaqueSession]:
+        raw = await self.client.get(self._key(token))
+        if raw is None:
+            return None
+        return self._adapter.validate_json(raw)
+
+    async def revoke(self, token: str) -> bool:
+        return bool(await self.client.delete(self._key(token)))
+
+    async def revoke_subject(self, subject: str) -> int:
+        subject_key = self._subject_key(subject)
+        keys = await self.client.execute('SMEMBERS', subject_key) or []
+        revoked = await self.client.execute('DEL', subject_key, *keys) if keys else 0
+        return max(0, revoked - 1)
+
+
+def create_store() -> OpaqueTokenStore:
+    if settings.auth_jwt.opaque_store == 'redis':
+        if not settings.cache.redis_url:
+            raise ValueError('OPAQUE_TOKEN_STORE=redis требует CACHE_REDIS_URL')
+        return RedisTokenStore(RESPClient(settings.cache.redis_url, timeout=settings.cache.timeout_ms / 1000))
+    return MemoryTokenStore()
+
+
+opaque_store = create_store()
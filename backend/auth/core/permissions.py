@@ -0,0 +1,51 @@
+from enum import IntFlag, auto
+from functools import reduce
+from operator import or_
+from typing import Dict, Optional
+
+from core.models.role.role import RoleEnum
+from core.models.role.role_group import RoleGroupEnum
+
+
+class Permission(IntFlag):
+    """
+    Права доступа. Значение бита входит в токен (claim prm),
+    поэтому существующие права не переупорядочиваются: новые добавляются в конец.
+    """
+    PROFILE_READ = auto()       # Свой профиль и /me
+    PROFILE_WRITE = auto()      # Изменение своего профиля и пароля
+    COMPANY_MANAGE = auto()     # Управление компанией
+    CONTENT_MANAGE = auto()     # Управление контентом
+    USERS_READ = auto()         # Просмотр пользователей
+    USERS_MANAGE = auto()       # Управление пользователями
+    ROLES_MANAGE = auto()       # Управление ролями и группами
+    CHAT_MESSAGES = auto()      # Сообщения чатов Telegram
+
+
+ALL_PERMISSIONS = reduce(or_, Permission)
+NO_PERMISSIONS = Permission(0)
+
+# Права группы получают все её роли
+GROUP_PERMISSIONS: Dict[RoleGroupEnum, Permission] = {
+    RoleGroupEnum.ADMINISTRATORS: Permission.PROFILE_READ | Permission.PROFILE_WRITE | Permission.USERS_READ,
+    RoleGroupEnum.USERS: Permission.PROFILE_READ | Permission.PROFILE_WRITE,
+    RoleGroupEnum.GUESTS: NO_PERMISSIONS,
+    RoleGroupEnum.CHATS: Permission.CHAT_MESSAGES,
+    RoleGroupEnum.SERVICES: NO_PERMISSIONS,
+}
+
+# Права роли сверх прав её группы
+ROLE_PERMISSIONS: Dict[RoleEnum, Permission] = {
+    RoleEnum.GLOBAL_ADMIN: ALL_PERMISSIONS,
+    RoleEnum.CONTENT_ADMIN: Permission.CONTENT_MANAGE,
+    RoleEnum.OWNER: Permission.COMPANY_MANAGE,
+    RoleEnum.USER: NO_PERMISSIONS,
+    RoleEnum.GUEST: NO_PERMISSIONS,
+    RoleEnum.CHAT: NO_PERMISSIONS,
+    RoleEnum.SERVICE: Permission.USERS_READ,
+}
+
+
+def compile_permissions(role: RoleEnum, group: Optional[RoleGroupEnum]) -> Permission:
+    """Набор прав роли: права роли и её группы одним битовым полем."""
+    return ROLE_PERMISSIONS.get(role, NO_PERMISSIONS) | GROUP_PERMISSIONS.get(group, NO_PERMISSIONS)
@@ -0,0 +1,237 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from core.config import settings
+
+
+class SlidingWindow:
+    """
+    Счётчик скользящего окна по двум фиксированным окнам:
+    оценка = предыдущее окно * доля перекрытия + текущее окно.
+    """
+    __slots__ = ('start', 'count', 'prev')
+
+    def __init__(self, now: float) -> None:
+        self.start: float = now
+        self.count: int = 0
+        self.prev: int = 0
+
+    def _roll(self, now: float, window: float) -> None:
+        elapsed = now - self.start
+        if elapsed >= window:
+            # Если прошло больше двух окон, предыдущее окно пустое
+            self.prev = self.count if elapsed < 2 * window else 0
+            self.count = 0
+            self.start = now - (elapsed % window)
+
+    def estimate(self, now: float, window: float) -> float:
+        self._roll(now, window)
+        overlap = 1 - (now - self.start) / window
+        return self.prev * overlap + self.count
+
+    def add(self, now: float, window: float) -> float:
+        self._roll(now, window)
+        self.count += 1
+        return self.estimate(now, window)
+
+
+class Bucket:
+    """
+    Состояние ключа: токены, скользящее окно неудач и блокировка по backoff.
+    """
+    __slots__ = ('tokens', 'updated', 'failures', 'blocked_until')
+
+    def __init__(self, capacity: float, now: float) -> None:
+        self.tokens: float = capacity
+        self.updated: float = now
+        self.failures: SlidingWindow = SlidingWindow(now)
+        self.blocked_until: float = 0.0
+
+
+class Shard:
+    __slots__ = ('buckets', 'overflow')
+
+    def __init__(self, now: float) -> None:
+        self.buckets: 'OrderedDict[str, Bucket]' = OrderedDict()
+        self.overflow: SlidingWindow = SlidingWindow(now)
+
+
+class ShardedRateLimiter:
+    """
+    In-memory ограничитель на шардированных token bucket'ах.
+
+    - Каждая попытка тратит токен, токены восполняются со скоростью refill_per_second.
+    - Неудачи считаются скользящим окном; после failure_threshold неудач ключ
+      блокируется на backoff_base * 2^(n - threshold), но не больше backoff_max.
+    - Шард ограничен max_keys_per_shard ключами (LRU). Если вытеснить некого,
+      новые ключи шарда учитываются общим скользящим окном overflow_limit.
+
+    Все вызовы выполняются в потоке event loop, поэтому блокировки не нужны.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        refill_per_second: float,
+        failure_threshold: int,
+        failure_window_seconds: float,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+        shards: int,
+        max_keys_per_shard: int,
+        overflow_limit: int,
+    ) -> None:
+        self.capacity = float(capacity)
+        self.refill = refill_per_second
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window_seconds
+        self.backoff_base = backoff_base_seconds
+        self.backoff_max = backoff_max_seconds
+        self.max_keys = max_keys_per_shard
+        self.overflow_limit = overflow_limit
+        now = time.monotonic()
+        self._shards: List[Shard] = [Shard(now) for _ in range(shards)]
+
+    def _shard(self, key: str) -> Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _idle(self, bucket: Bucket, now: float) -> bool:
+        tokens = bucket.tokens + (now - bucket.updated) * self.refill
+        return (tokens >= self.capacity
+                and bucket.blocked_until <= now
+                and bucket.failures.estimate(now, self.failure_window) == 0)
+
+    def _bucket(self, key: str, now: float, create: bool = True) -> Optional[Bucket]:
+        shard = self._shard(key)
+        bucket = shard.buckets.get(key)
+        if bucket is not None:
+            shard.buckets.move_to_end(key)
+            return bucket
+        if not create:
+            return None
+        if len(shard.buckets) >= self.max_keys:
+            lru_key, lru_bucket = next(iter(shard.buckets.items()))
+            if not self._idle(lru_bucket, now):
+                return None
+            del shard.buckets[lru_key]
+        bucket = Bucket(self.capacity, now)
+        shard.buckets[key] = bucket
+        return bucket
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Расходует попытку. Возвращает 0, если попытка разрешена,
+        иначе число секунд до следующей разрешённой попытки.
+        """
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, now)
+        if bucket is None:
+            # Шард переполнен активными ключами: общий лимит скользящего окна
+            shard = self._shard(key)
+            if shard.overflow.estimate(now, self.failure_window) >= self.overflow_limit:
+                return self.failure_window / self.overflow_limit
+            shard.overflow.add(now, self.failure_window)
+            return 0.0
+        if bucket.blocked_until > now:
+            return bucket.blocked_until - now
+        bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated) * self.refill)
+        bucket.updated = now
+        if bucket.tokens < 1:
+            return (1 - bucket.tokens) / self.refill
+        bucket.tokens -= 1
+        return 0.0
+
+    def failure(self, key: str, now: Optional[float] = None) -> None:
+        """
+        Фиксирует неудачную попытку и при превышении порога включает backoff.
+        """
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, now)
+        if bucket is None:
+            return
+        failures = bucket.failures.add(now, self.failure_window)
+        excess = int(failures) - self.failure_threshold
+        if excess >= 0:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** min(excess, 32)))
+            bucket.blocked_until = max(bucket.blocked_until, now + delay)
+
+    def success(self, key: str) -> None:
+        """
+        Успешная попытка сбрасывает накопленные неудачи ключа.
+        """
+        bucket = self._bucket(key, time.monotonic(), create=False)
+        if bucket is not None:
+            bucket.failures = SlidingWindow(time.monotonic())
+            bucket.blocked_until = 0.0
+
+
+class RateLimitBackend(ABC):
+    """
+    Интерфейс хранилища лимитов. Асинхронный, чтобы общее хранилище
+    для нескольких воркеров можно было подключить без изменения вызывающего кода.
+    """
+
+    @abstractmethod
+    async def acquire(self, keys: Iterable[str]) -> float:
+        """Расход попытки по всем ключам; ожидание в секундах, 0 - попытка разрешена."""
+
+    @abstractmethod
+    async def failure(self, keys: Iterable[str]) -> None:
+        """Учёт неудачной попытки."""
+
+    @abstractmethod
+    async def success(self, keys: Iterable[str]) -> None:
+        """Сброс неудач после успешной попытки."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Лимиты в памяти процесса (по умолчанию, один воркер).
+    """
+
+    def __init__(self, limiter: ShardedRateLimiter) -> None:
+        self.limiter = limiter
+
+    async def acquire(self, keys: Iterable[str]) -> float:
+        # Токены тратятся по всем ключам, ответ - максимальное ожидание
+        return max((self.limiter.acquire(key) for key in keys), default=0.0)
+
+    async def failure(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.limiter.failure(key)
+
+    async def success(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.limiter.success(key)
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def throttle_keys(client_ip: str, email: Optional[str] = None) -> List[str]:
+    keys = [f'ip:{client_ip}']
+    if email:
+        keys.append(f'email:{normalize_email(email)}')
+    return keys
+
+
+def _create_backend(capacity: int, refill_per_minute: float) -> RateLimitBackend:
+    limits = settings.rate_limit
+    return InMemoryRateLimitBackend(ShardedRateLimiter(
+        capacity=capacity,
+        refill_per_second=refill_per_minute / 60,
+        failure_threshold=limits.failure_threshold,
+        failure_window_seconds=limits.failure_window_seconds,
+        backoff_base_seconds=limits.backoff_base_seconds,
+        backoff_max_seconds=limits.backoff_max_seconds,
+        shards=limits.shards,
+        max_keys_per_shard=limits.max_keys_per_shard,
+        overflow_limit=limits.overflow_limit,
+    ))
+
+
+login_limiter = _create_backend(settings.rate_limit.login_capacity, settings.rate_limit.login_refill_per_minute)
+register_limiter = _create_backend(settings.rate_limit.register_capacity, settings.rate_limit.register_refill_per_minute)
@@ -0,0 +1,25 @@
+from functools import lru_cache
+from typing import Any
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+class RawJSONResponse(Response):
+    """
+    Ответ с уже сериализованным JSON (bytes): без промежуточного словаря
+    jsonable_encoder и повторной сериализации в JSONResponse.
+    """
+    media_type = 'application/json'
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def dump_json(value: Any) -> bytes:
+    """
+    Сериализация модели или значения в JSON сериализатором pydantic-core.
+    Результат совпадает с jsonable_encoder + JSONResponse (компактный JSON, UTF-8).
+    """
+    return type_adapter(type(value)).dump_json(value)
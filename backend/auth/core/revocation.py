@@ -0,0 +1,116 @@
+import asyncio, time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.cache import InvalidationBus, cache_manager
+from core.config import settings
+from core.models import WebSiteUser
+from core.models.base import date_now
+
+import logging
+
+logger = logging.getLogger('site_auth_repository_logger')
+
+
+class TokenRevocations:
+    """
+    Отзыв токенов пользователя: website_users.tokens_valid_after - токены
+    с iat раньше этого момента недействительны.
+
+    В памяти процесса только пользователи, отозвавшие токены за время жизни
+    refresh-токена (более ранние токены и так истекли); проверка - поиск
+    в словаре без БД. Отзыв в других процессах применяется по сообщению
+    шины сброса кеша (core/cache) в пространстве 'revoke', при пропуске
+    сообщений справочник перечитывается из БД.
+
+    Момент отзыва берётся по часам приложения с точностью до секунды,
+    как и iat: токен, выпущенный в ту же секунду, что и отзыв, действителен.
+    """
+
+    NAMESPACE = 'revoke'
+
+    def __init__(self, bus: InvalidationBus, horizon_minutes: int) -> None:
+        self.bus = bus
+        self.horizon = timedelta(minutes=horizon_minutes)
+        self._valid_after: Dict[str, int] = {}
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._reload: Optional[asyncio.Task] = None
+        self._loading = asyncio.Lock()
+        self.ready = False
+        bus.listen(self._on_message, self._on_gap)
+
+    def is_revoked(self, subject: str, issued_at: int) -> bool:
+        valid_after = self._valid_after.get(subject)
+        return valid_after is not None and issued_at < valid_after
+
+    def _apply(self, subject: str, valid_after: int) -> None:
+        if valid_after > self._valid_after.get(subject, 0):
+            self._valid_after[subject] = valid_after
+
+    async def load(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        async with session_factory() as session:
+            result = await session.execute(
+                select(WebSiteUser.email, WebSiteUser.tokens_valid_after)
+                .where(WebSiteUser.tokens_valid_after > date_now() - self.horizon)
+            )
+            valid_after = {email: int(moment.timestamp()) for email, moment in result}
+        # Отзывы, полученные по шине во время чтения, не теряются
+        for subject, moment in self._valid_after.items():
+            if moment > valid_after.get(subject, 0):
+                valid_after[subject] = moment
+        self._valid_after = valid_after
+        self.ready = True
+
+    async def ensure_loaded(self, session_factory: async_sessionmaker) -> None:
+        """
+        Загрузка перед первой проверкой, если прогрев её не выполнил:
+        одновременные запросы ждут одну загрузку. Ошибка загрузки - исключение.
+        """
+        if self.ready:
+            return
+        async with self._loading:
+            if not self.ready:
+                await self.load(session_factory)
+
+    async def revoke(self, session: AsyncSession, email: str) -> Optional[int]:
+        """
+        Отзыв всех выпущенных токенов пользователя в транзакции session.
+        После commit нужен publish с возвращённым моментом отзыва.
+        """
+        valid_after = int(time.time())
+        updated = await session.scalar(
+            update(WebSiteUser).where(WebSiteUser.email == email)
+            .values(tokens_valid_after=datetime.fromtimestamp(valid_after, timezone.utc))
+            .returning(WebSiteUser.id)
+        )
+        if updated is None:
+            return None
+        await self.bus.notify(session, self.NAMESPACE, f'{valid_after}:{email}')
+        return valid_after
+
+    async def publish(self, email: str, valid_after: int) -> None:
+        self._apply(email, valid_after)
+        if not self.bus.transactional:
+            await self.bus.publish(self.NAMESPACE, f'{valid_after}:{email}')
+
+    def _on_message(self, namespace: str, key: str) -> None:
+        if namespace == self.NAMESPACE:
+            valid_after, subject = key.split(':', 1)
+            self._apply(subject, int(valid_after))
+
+    def _on_gap(self) -> None:
+        if self._session_factory is None or (self._reload is not None and not self._reload.done()):
+            return
+        self._reload = asyncio.get_running_loop().create_task(self._reload_safe())
+
+    async def _reload_safe(self) -> None:
+        try:
+            await self.load(self._session_factory)
+        except Exception as e:
+            logger.error('Справочник отзыва токенов не перечитан: %s', e)
+
+
+token_revocations = TokenRevocations(cache_manager.bus, settings.auth_jwt.refresh_token_expire_minutes)
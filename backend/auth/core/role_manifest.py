@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.catalog import RoleInfo
+from core.models import Role, RoleGroup, role_group_role_association
+from core.models.role.role import RoleEnum
+from core.models.role.role_group import RoleGroupEnum
+
+
+@dataclass(frozen=True)
+class RoleGroupSpec:
+    name: RoleGroupEnum
+    title_ru: str
+    description_ru: str
+    title_en: str
+    description_en: str
+
+
+@dataclass(frozen=True)
+class RoleSpec:
+    name: RoleEnum
+    group: RoleGroupEnum
+    title_ru: str
+    description_ru: str
+    title_en: str
+    description_en: str
+
+
+# Описание групп и ролей. Источник истины: seed_roles приводит таблицы к нему
+ROLE_GROUPS: Tuple[RoleGroupSpec, ...] = (
+    RoleGroupSpec(
+        RoleGroupEnum.ADMINISTRATORS,
+        'Администраторы', 'Группа администраторов платформы.',
+        'Administrators', 'Group of platform administrators.',
+    ),
+    RoleGroupSpec(
+        RoleGroupEnum.USERS,
+        'Пользователи', 'Группа зарегистрированных пользователей',
+        'Users', 'Group of registered users',
+    ),
+    RoleGroupSpec(
+        RoleGroupEnum.GUESTS,
+        'Гости', 'Группа незарегистрированных пользователей',
+        'Guests', 'Group of unregistered users',
+    ),
+    RoleGroupSpec(
+        RoleGroupEnum.CHATS,
+        'Чаты', 'Группа ролей для чатов в Телеграм',
+        'Chats', 'Group of Telegram chat roles',
+    ),
+    RoleGroupSpec(
+        RoleGroupEnum.SERVICES,
+        'Сервисы', 'Группа внутренних сервисов',
+        'Services', 'Group of internal services',
+    ),
+)
+
+ROLES: Tuple[RoleSpec, ...] = (
+    RoleSpec(
+        RoleEnum.GLOBAL_ADMIN, RoleGroupEnum.ADMINISTRATORS,
+        'Глобальный администратор', 'Глобальный администратор с полными правами',
+        'Global Administrator', 'Global administrator with full rights',
+    ),
+    RoleSpec(
+        RoleEnum.CONTENT_ADMIN, RoleGroupEnum.ADMINISTRATORS,
+        'Контент администратор', 'Администратор контента',
+        'Content Administrator', 'Content administrator',
+    ),
+    RoleSpec(
+        RoleEnum.OWNER, RoleGroupEnum.USERS,
+        'Владелец компании', 'Владелец компании с расширенными правами',
+        'Company Owner', 'Company owner with extended rights',
+    ),
+    RoleSpec(
+        RoleEnum.USER, RoleGroupEnum.USERS,
+        'Пользователь', 'Обычный пользователь с базовыми правами',
+        'User', 'Regular user with basic rights',
+    ),
+    RoleSpec(
+        RoleEnum.GUEST, RoleGroupEnum.GUESTS,
+        'Гость', 'Незарегистрированный пользователь',
+        'Guest', 'Unregistered user',
+    ),
+    RoleSpec(
+        RoleEnum.CHAT, RoleGroupEnum.CHATS,
+        'Чат', 'Чат в Telegram',
+        'Chat', 'Telegram chat',
+    ),
+    RoleSpec(
+        RoleEnum.SERVICE, RoleGroupEnum.SERVICES,
+        'Сервис', 'Внутренний сервис, вход по client credentials',
+        'Service', 'Internal service authenticated with client credentials',
+    ),
+)
+
+# Ключ pg_advisory_xact_lock: воркеры, стартующие одновременно, применяют манифест по очереди
+SEED_LOCK_KEY = 0x726F6C65
+
+TEXT_FIELDS = ('title_ru', 'description_ru', 'title_en', 'description_en')
+
+
+async def seed_roles(session: AsyncSession) -> List[RoleInfo]:
+    """
+    Приведение групп, ролей и их связей к ROLE_GROUPS и ROLES тремя upsert
+    (INSERT ... ON CONFLICT) и удалением устаревших связей ролей манифеста.
+    Выполняется в транзакции session, commit - за вызывающим.
+    Возвращает роли с id для заполнения role_catalog без отдельного запроса.
+    """
+    await session.execute(select(func.pg_advisory_xact_lock(SEED_LOCK_KEY)))
+    upsert_groups = insert(RoleGroup).values([
+        {'name': group.name, **{field: getattr(group, field) for field in TEXT_FIELDS}}
+        for group in ROLE_GROUPS
+    ])
+    result = await session.execute(
+        upsert_groups.on_conflict_do_update(
+            index_elements=[RoleGroup.name],
+            set_={field: upsert_groups.excluded[field] for field in TEXT_FIELDS},
+        ).returning(RoleGroup.name, RoleGroup.id)
+    )
+    group_ids = dict(result.all())
+
+    upsert_roles = insert(Role).values([
+        {'name': role.name, **{field: getattr(role, field) for field in TEXT_FIELDS}}
+        for role in ROLES
+    ])
+    result = await session.execute(
+        upsert_roles.on_conflict_do_update(
+            index_elements=[Role.name],
+            set_={field: upsert_roles.excluded[field] for field in TEXT_FIELDS},
+        ).returning(Role.name, Role.id)
+    )
+    role_ids = dict(result.all())
+
+    links = [(role_ids[role.name], group_ids[role.group]) for role in ROLES]
+    association = role_group_role_association.c
+    await session.execute(
+        delete(role_group_role_association)
+        .where(association.role_id.in_(role_ids.values()))
+        .where(tuple_(association.role_id, association.role_group_id).not_in(links))
+    )
+    await session.execute(
+        insert(role_group_role_association)
+        .values([{'role_id': role_id, 'role_group_id': group_id} for role_id, group_id in links])
+        .on_conflict_do_nothing(constraint='idx_unique_roles_groups')
+    )
+    return [RoleInfo(id=role_ids[role.name], name=role.name, group=role.group) for role in ROLES]
@@ -1,14 +1,19 @@
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional, Union
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 from core.config import settings
-import bcrypt, jwt, pytz
+import bcrypt, hashlib, jwt, pytz
 
 
 # Определяем тип для заголовков JWT
 JWTHeaders = Dict[str, Any]
 JWTPayload = Dict[str, Any]
 
+# bcrypt-хеш случайного пароля с той же стоимостью, что и у реальных хешей.
+# Проверка по нему выравнивает время ответа, когда пользователь не найден.
+DUMMY_PASSWORD_HASH = '$2b$12$OwxQSrLg3cFXGxDhbw4nI.t1X1383OUwvaFa/m8SCGr3JZK.ixJDG'
+
 
 class SiteAuthManager:
     def __init__(self) -> None:
@@ -16,8 +21,60 @@ class SiteAuthManager:
         self.tz: timezone = pytz.timezone(settings.location_timezone)
         self.access_token_expire_minutes: int = settings.auth_jwt.access_token_expire_minutes
         self.refresh_token_expire_minutes: int = settings.auth_jwt.refresh_token_expire_minutes
-        self.private_key: str = settings.auth_jwt.private_key_path.read_text()
-        self.public_key: str = settings.auth_jwt.public_key_path.read_text()
+        self._private_key: Any = None
+        self._public_key: Any = None
+        self._key_ring: Dict[str, Any] = {}
+        self.kid: Optional[str] = None
+
+    def load_keys(self) -> None:
+        """
+        Чтение и разбор ключей. Выполняется один раз на этапе запуска (core/startup.py);
+        если ключи ещё не загружены, их загрузит первое обращение. PyJWT принимает
+        готовые объекты ключей: разбор PEM (десятки мс для закрытого RSA-ключа)
+        не повторяется при каждом создании токена.
+        """
+        if self._private_key is None:
+            algorithm = jwt.get_algorithm_by_name(self.algorithm)
+            self._public_key = algorithm.prepare_key(settings.auth_jwt.public_key_path.read_text())
+            self.kid = self.key_id(self._public_key)
+            # Связка открытых ключей по kid: текущий и прежние (после ротации)
+            key_ring = {self.kid: self._public_key}
+            for path in settings.auth_jwt.extra_public_key_paths:
+                key = algorithm.prepare_key(path.read_text())
+                key_ring[self.key_id(key)] = key
+            self._key_ring = key_ring
+            self._private_key = algorithm.prepare_key(settings.auth_jwt.private_key_path.read_text())
+
+    @staticmethod
+    def key_id(public_key: Any) -> str:
+        """kid ключа: начало SHA-256 от DER открытого ключа."""
+        der = public_key.public_bytes(Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
+        return hashlib.sha256(der).hexdigest()[:16]
+
+    @property
+    def private_key(self) -> Any:
+        self.load_keys()
+        return self._private_key
+
+    @property
+    def public_key(self) -> Any:
+        self.load_keys()
+        return self._public_key
+
+    @property
+    def key_ring(self) -> Dict[str, Any]:
+        self.load_keys()
+        return self._key_ring
+
+    def _verification_key(self, header: JWTHeaders) -> Any:
+        """Ключ проверки по kid заголовка; токены без kid - текущим ключом."""
+        kid = header.get('kid')
+        if kid is None:
+            return self.public_key
+        key = self.key_ring.get(kid)
+        if key is None:
+            raise jwt.DecodeError(f'Неизвестный kid {kid}')
+        return key
 
     def _encode_token(
         self,
@@ -36,7 +93,7 @@ class SiteAuthManager:
         encoded = jwt.encode(
             to_encode,
             self.private_key,
-            headers=head,
+            headers={'kid': self.kid, **head},
             algorithm=self.algorithm,
         )
         return encoded
@@ -65,7 +122,7 @@ class SiteAuthManager:
         try:
             decoded_jwt: Dict[str, Any] = jwt.decode(
                 token,
-                self.public_key,
+                self._verification_key(jwt.get_unverified_header(token)),
                 algorithms=[self.algorithm],
             )
         except jwt.ExpiredSignatureError:
@@ -75,6 +132,18 @@ class SiteAuthManager:
             decoded_jwt = None
         return decoded_jwt
 
+    def verify(self, token: Union[str, bytes]) -> Optional[JWTHeaders]:
+        """
+        Строгая проверка: подпись ключом связки по kid и срок действия.
+        Возвращает заголовок токена с payload в 'claims', None - токен недействителен.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+            claims = jwt.decode(token, self._verification_key(header), algorithms=[self.algorithm])
+        except jwt.InvalidTokenError:
+            return None
+        return dict(header, claims=claims)
+
     @staticmethod
     def hash_password(password: str) -> str:
         salt = bcrypt.gensalt()
@@ -87,3 +156,15 @@ class SiteAuthManager:
         pwd_bytes = password.encode('utf-8')
         hashed_bytes = hashed_password.encode('utf-8')
         return bcrypt.checkpw(pwd_bytes, hashed_bytes)
+
+    @classmethod
+    def dummy_validate_password(cls, password: str) -> bool:
+        """
+        Проверка пароля по фиктивному хешу: тратит столько же времени,
+        сколько настоящая проверка, и всегда возвращает False.
+        """
+        cls.validate_password(password, DUMMY_PASSWORD_HASH)
+        return False
+
+
+site_auth_manager = SiteAuthManager()
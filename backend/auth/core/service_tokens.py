@@ -0,0 +1,49 @@
+import hashlib, secrets, time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from core.config import settings
+
+
+@dataclass(frozen=True)
+class ServiceToken:
+    access_token: str
+    expires_at: float
+
+
+class ServiceTokenCache:
+    """
+    Выданные токены сервисов (client credentials) в памяти процесса по
+    (client_id, хеш секрета). Пока до истечения токена больше refresh_seconds,
+    повторный запрос получает тот же токен: поиск в словаре вместо запроса
+    в БД и подписи. Неверный секрет в кеш не попадает.
+    """
+
+    def __init__(self, refresh_seconds: float) -> None:
+        self.refresh_seconds = refresh_seconds
+        self._tokens: Dict[Tuple[str, str], ServiceToken] = {}
+
+    @staticmethod
+    def new_secret() -> str:
+        return secrets.token_urlsafe(32)
+
+    @staticmethod
+    def hash_secret(secret: str) -> str:
+        return hashlib.sha256(secret.encode('utf-8')).hexdigest()
+
+    def get(self, client_id: str, secret_hash: str) -> Optional[ServiceToken]:
+        token = self._tokens.get((client_id, secret_hash))
+        if token is None or token.expires_at - self.refresh_seconds <= time.time():
+            return None
+        return token
+
+    def put(self, client_id: str, secret_hash: str, access_token: str, expires_at: float) -> ServiceToken:
+        # Одна запись на клиента: токен по прежнему секрету вытесняется
+        for key in [key for key in self._tokens if key[0] == client_id]:
+            del self._tokens[key]
+        token = ServiceToken(access_token, expires_at)
+        self._tokens[(client_id, secret_hash)] = token
+        return token
+
+
+service_tokens = ServiceTokenCache(settings.auth_jwt.service_token_refresh_seconds)
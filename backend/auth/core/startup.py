@@ -0,0 +1,173 @@
+import asyncio, time
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.logger import setup_logging
+from core.security import site_auth_manager, SiteAuthManager
+from core.watchdog import loop_watchdog
+from core.email_filter import email_filter
+from core.catalog import role_catalog
+from core.revocation import token_revocations
+from core.models import db_fastapi_connect
+from core.cache import cache_manager
+from core.maintenance import guest_profile_pruner
+
+import logging
+
+logger = logging.getLogger('site_auth_repository_logger')
+
+HotStatements = Callable[[AsyncSession], Awaitable[None]]
+
+
+class Lifecycle:
+    """
+    Состояние воркера для проб: ready - прогрев завершён, draining - получен
+    сигнал остановки, новые запросы лучше направлять в другие поды.
+    """
+
+    def __init__(self) -> None:
+        self.ready: bool = False
+        self.draining: bool = False
+        self.warmup_seconds: Optional[float] = None
+        self._hot_statements: List[HotStatements] = []
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def hot_statements(self, func: HotStatements) -> HotStatements:
+        """
+        Регистрация запросов для прогрева: выполняются на каждом открытом
+        при прогреве соединении, чтобы скомпилировать их в SQLAlchemy
+        и подготовить в asyncpg до первого запроса пользователя.
+        """
+        self._hot_statements.append(func)
+        return func
+
+    async def _warm_connection(self, opened: asyncio.Barrier) -> None:
+        async with db_fastapi_connect.session_factory() as session:
+            await session.connection()
+            # Все соединения открыты одновременно, иначе пул выдаст одно и то же
+            await opened.wait()
+            for statements in self._hot_statements:
+                await statements(session)
+            await session.rollback()
+
+    async def warmup(self) -> None:
+        """
+        Прогрев: соединения пула, горячие запросы, справочники, криптография.
+        Ошибка прогрева не оставляет воркер неготовым навсегда: он начнёт
+        принимать трафик холодным.
+        """
+        started = time.perf_counter()
+        warmup = settings.warmup
+        try:
+            # Криптография: первый bcrypt и подпись токена (ключи разобраны в prepare)
+            await asyncio.to_thread(SiteAuthManager.dummy_validate_password, 'warmup')
+            token = site_auth_manager.create_access_token(head={}, payload={'sub': 'warmup'})
+            site_auth_manager.decode_token(token)
+            # Справочники могли быть загружены до fork (server.py)
+            if not role_catalog.ready:
+                async with db_fastapi_connect.session_factory() as session:
+                    if warmup.seed_roles:
+                        await role_catalog.seed(session)
+                    else:
+                        await role_catalog.load(session)
+            if settings.email_filter.enabled and not email_filter.built:
+                await email_filter.load(db_fastapi_connect.session_factory)
+            if not token_revocations.ready:
+                await token_revocations.load(db_fastapi_connect.session_factory)
+            connections = min(warmup.connections, settings.db.pool_size)
+            if connections > 0:
+                opened = asyncio.Barrier(connections)
+                await asyncio.wait_for(
+                    asyncio.gather(*(self._warm_connection(opened) for _ in range(connections))),
+                    warmup.timeout_seconds,
+                )
+        except Exception as e:
+            logger.error('Прогрев не завершён: %s', e)
+        self.warmup_seconds = time.perf_counter() - started
+        self.ready = True
+        logger.info('Воркер готов, прогрев %.2f с', self.warmup_seconds)
+
+    def start_warmup(self) -> None:
+        self.ready = False
+        self.draining = False
+        if settings.warmup.enabled:
+            self._warmup_task = asyncio.create_task(self.warmup())
+        else:
+            self.ready = True
+
+    async def wait_ready(self) -> None:
+        if self._warmup_task is not None:
+            await asyncio.shield(self._warmup_task)
+
+    async def stop_warmup(self) -> None:
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+
+
+lifecycle = Lifecycle()
+
+
+def check_settings() -> None:
+    """
+    Настройки, несовместимые с многопроцессным запуском: состояние в памяти
+    процесса (отзыв токенов, сброс L1, непрозрачные токены) не дойдёт до других воркеров.
+    """
+    if settings.server.workers <= 1:
+        return
+    if settings.cache.bus == 'local':
+        raise RuntimeError(
+            f'CACHE_BUS=local при WEB_WORKERS={settings.server.workers}: '
+            'нужна шина redis или postgres'
+        )
+    if settings.auth_jwt.opaque_store == 'memory':
+        raise RuntimeError(
+            f'OPAQUE_TOKEN_STORE=memory при WEB_WORKERS={settings.server.workers}: '
+            'токен, выданный одним воркером, другие не найдут, нужно хранилище redis'
+        )
+
+
+def prepare() -> None:
+    """
+    Синхронная часть запуска: логирование и JWT-ключи.
+    В многопроцессном режиме выполняется в мастере до fork (server.py),
+    при обычном запуске - из lifespan. Повторный вызов ничего не делает.
+    Сетевые соединения здесь не открываются: обработчики Loki подключаются
+    при первой записи, пул БД - при прогреве.
+    Несовместимые настройки останавливают запуск (check_settings).
+    """
+    check_settings()
+    setup_logging()
+    site_auth_manager.load_keys()
+
+
+async def on_startup() -> None:
+    prepare()
+    # Детектор блокировок event loop (только для разработки и canary)
+    if settings.watchdog.enabled:
+        loop_watchdog.start()
+    # Подписка на сброс кеша - в каждом воркере
+    await cache_manager.start()
+    if settings.email_filter.enabled:
+        email_filter.start(db_fastapi_connect.session_factory)
+    # Прогрев в фоне: /healthz отвечает сразу, /readyz - после прогрева
+    lifecycle.start_warmup()
+    # Очистка гостевых профилей: проход выполняет один воркер (advisory lock)
+    if settings.maintenance.prune_enabled:
+        guest_profile_pruner.start()
+
+
+async def on_shutdown() -> None:
+    lifecycle.draining = True
+    await lifecycle.stop_warmup()
+    await guest_profile_pruner.stop()
+    await email_filter.stop()
+    if loop_watchdog.running:
+        await loop_watchdog.stop()
+    await cache_manager.stop()
+    # Соединения пула привязаны к event loop, который сейчас завершится
+    await db_fastapi_connect.engine.dispose()
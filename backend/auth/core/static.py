@@ -0,0 +1,148 @@
+import gzip, hashlib, json, mimetypes, os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from fastapi import FastAPI, Request, Response
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+
+STATIC_DIR = Path(__file__).parent.parent / 'static'
+# Результат scripts/build_static.py
+DIST_DIR = STATIC_DIR / 'dist'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Порядок предпочтения сжатых вариантов
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """
+    Кодировки из Accept-Encoding, кроме явно запрещённых (q=0).
+    """
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> Dict[str, str]:
+    try:
+        return json.loads((DIST_DIR / 'manifest.json').read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def static_url(name: str) -> str:
+    """
+    URL статического файла: собранный вариант с хешем в имени, если
+    scripts/build_static.py выполнялся, иначе исходный файл.
+    """
+    hashed = load_manifest().get(name)
+    return f'/static/dist/{hashed}' if hashed else f'/static/{name}'
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Отдача собранных файлов static/dist. Если клиент принимает br или gzip
+    и рядом с файлом лежит сжатый вариант (.br, .gz), отдаётся он
+    с Content-Encoding. Имена файлов содержат хеш содержимого, поэтому
+    ответы кешируются клиентом без повторной проверки (immutable).
+    """
+
+    def __init__(self, *, directory: os.PathLike, check_dir: bool = True,
+                 cache_control: str = IMMUTABLE_CACHE_CONTROL) -> None:
+        super().__init__(directory=directory, check_dir=check_dir)
+        self.cache_control = cache_control
+        # Собранные файлы не меняются, поэтому наличие вариантов проверяется один раз
+        self._variants: Dict[str, Dict[str, Tuple[str, os.stat_result]]] = {}
+
+    def _variants_for(self, full_path: str) -> Dict[str, Tuple[str, os.stat_result]]:
+        variants = self._variants.get(full_path)
+        if variants is None:
+            variants = {}
+            for encoding, suffix in ENCODINGS:
+                try:
+                    variants[encoding] = (full_path + suffix, os.stat(full_path + suffix))
+                except FileNotFoundError:
+                    pass
+            self._variants[full_path] = variants
+        return variants
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        variants = self._variants_for(full_path)
+        accepted = accepted_encodings(request_headers.get('accept-encoding', '')) if variants else set()
+        encoding = next((name for name, _ in ENCODINGS if name in variants and name in accepted), None)
+        if encoding:
+            path, variant_stat = variants[encoding]
+            response = FileResponse(
+                path,
+                status_code=status_code,
+                stat_result=variant_stat,
+                media_type=mimetypes.guess_type(full_path)[0] or 'text/plain',
+            )
+            response.headers['content-encoding'] = encoding
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if variants:
+            response.headers['vary'] = 'Accept-Encoding'
+        response.headers['cache-control'] = self.cache_control
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class OpenAPIDocument:
+    """
+    OpenAPI-схема, сериализованная и сжатая один раз при запуске,
+    а не при первом запросе /openapi.json.
+    """
+
+    def __init__(self) -> None:
+        self.body: Optional[bytes] = None
+        self.gzip_body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.body is not None
+
+    def build(self, app: FastAPI) -> None:
+        body = json.dumps(app.openapi(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        self.body = body
+
+    def response(self, request: Request) -> Response:
+        if not self.ready:
+            self.build(request.app)
+        # URL схемы постоянный: клиент кеширует, но перепроверяет по ETag
+        headers = {'ETag': self.etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+        if request.headers.get('if-none-match') == self.etag:
+            return Response(status_code=304, headers=headers)
+        if 'gzip' in accepted_encodings(request.headers.get('accept-encoding', '')):
+            headers['Content-Encoding'] = 'gzip'
+            return Response(self.gzip_body, media_type='application/json', headers=headers)
+        return Response(self.body, media_type='application/json', headers=headers)
+
+
+openapi_document = OpenAPIDocument()
@@ -0,0 +1,88 @@
+import hashlib, hmac, json, time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import parse_qsl
+
+from core.config import settings
+
+# Субъект токенов пользователя WebApp: telegram:<id>
+SUBJECT_PREFIX = 'telegram:'
+
+
+def _text(value, max_len: int) -> Optional[str]:
+    # Поля профиля Telegram по длине столбцов webapp_users
+    return str(value)[:max_len] if value else None
+
+
+@dataclass(frozen=True, slots=True)
+class TelegramUser:
+    """Пользователь из поля user подписанных initData."""
+    id: int
+    first_name: str
+    last_name: Optional[str]
+    username: Optional[str]
+    language_code: Optional[str]
+    auth_date: int
+
+
+class InitDataVerifier:
+    """
+    Проверка initData Telegram WebApp: HMAC-SHA256 строки проверки данных
+    на ключе HMAC-SHA256('WebAppData', токен бота).
+
+    Ключ выводится из токена один раз при создании, проверка - один HMAC
+    и сравнение за постоянное время, без БД и сети.
+    """
+
+    def __init__(self, bot_token: str, max_age_seconds: int) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._secret_key = (
+            hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest() if bot_token else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._secret_key is not None
+
+    def sign(self, fields: dict) -> str:
+        """Подпись полей initData (hex), как её вычисляет Telegram."""
+        data_check_string = '\n'.join(f'{key}={fields[key]}' for key in sorted(fields))
+        return hmac.new(self._secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, init_data: str, now: Optional[float] = None) -> Optional[TelegramUser]:
+        """Пользователь из initData или None: подпись неверна, данные устарели или без user."""
+        if self._secret_key is None:
+            return None
+        try:
+            fields = dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+        except ValueError:
+            return None
+        received = fields.pop('hash', '')
+        if not hmac.compare_digest(self.sign(fields), received):
+            return None
+        try:
+            auth_date = int(fields['auth_date'])
+            user = json.loads(fields['user'])
+            if (now or time.time()) - auth_date > self.max_age_seconds:
+                return None
+            return TelegramUser(
+                id=int(user['id']),
+                first_name=_text(user.get('first_name'), 64) or '',
+                last_name=_text(user.get('last_name'), 64),
+                username=_text(user.get('username'), 32),
+                language_code=_text(user.get('language_code'), 16),
+                auth_date=auth_date,
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def profile_key(self, telegram_id: int) -> str:
+        """
+        Ключ профиля (cookie-сессии) пользователя WebApp: постоянный для одного
+        telegram_id, поэтому профиль создаётся upsert по ключу, и неугадываемый
+        без токена бота.
+        """
+        return hmac.new(self._secret_key, f'profile:{telegram_id}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+init_data_verifier = InitDataVerifier(settings.telegram.bot_token, settings.telegram.init_data_max_age_seconds)
@@ -0,0 +1,197 @@
+import asyncio, sys, threading, time, traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional
+
+import logging
+from core.config import settings, BASE_DIR
+
+logger = logging.getLogger('loop_watchdog_logger')
+
+
+@dataclass
+class BlockingSite:
+    """
+    Агрегированная статистика блокировок по одному месту вызова.
+    """
+    site: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    stack: List[str] = field(default_factory=list)
+    reported: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'site': self.site,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 1),
+            'max_ms': round(self.max_ms, 1),
+            'stack': self.stack,
+        }
+
+
+class LoopWatchdog:
+    """
+    Детектор блокировок event loop.
+
+    Корутина-heartbeat раз в interval_ms обновляет отметку времени, а отдельный
+    поток проверяет её свежесть. Если loop не отвечает дольше threshold_ms,
+    поток снимает стек потока loop'а через sys._current_frames() и относит
+    блокировку к ближайшему кадру из кода проекта. Отчёт, агрегированный по
+    месту вызова, периодически пишется в лог.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: int,
+        interval_ms: int,
+        report_interval_seconds: int,
+        stack_limit: int,
+        project_root: Path = BASE_DIR,
+    ) -> None:
+        self.threshold: float = threshold_ms / 1000
+        self.interval: float = interval_ms / 1000
+        self.report_interval: float = report_interval_seconds
+        self.stack_limit: int = stack_limit
+        self.project_root: str = str(project_root.resolve())
+
+        self._sites: Dict[str, BlockingSite] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: float = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self.max_lag_ms: float = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Запуск из корутины работающего loop'а (lifespan приложения).
+        """
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._thread = threading.Thread(target=self._monitor, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        logger.info('Watchdog event loop запущен, порог: %s мс', int(self.threshold * 1000))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.report()
+
+    async def _beat(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = (now - started - self.interval) * 1000
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            self._heartbeat = now
+
+    def _monitor(self) -> None:
+        check_every = min(self.interval, self.threshold / 2)
+        next_report = time.monotonic() + self.report_interval
+        stalled_beat: Optional[float] = None
+        stalled_site: Optional[str] = None
+        while not self._stop.wait(check_every):
+            now = time.monotonic()
+            beat = self._heartbeat
+            if stalled_beat is not None and beat != stalled_beat:
+                # Loop снова ожил: фиксируем полную длительность блокировки
+                self._record(stalled_site, (beat - stalled_beat - self.interval) * 1000)
+                stalled_beat = stalled_site = None
+            if stalled_beat is None and now - beat - self.interval > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    stalled_beat = beat
+                    stalled_site = self._capture(frame)
+            if now >= next_report:
+                self.report()
+                next_report = now + self.report_interval
+
+    def _is_project_frame(self, frame: FrameType) -> bool:
+        filename = frame.f_code.co_filename
+        return filename.startswith(self.project_root) and 'site-packages' not in filename
+
+    def _capture(self, frame: FrameType) -> str:
+        """
+        Определяет место вызова: самый внутренний кадр из кода проекта,
+        а если такого нет - самый внутренний кадр вообще.
+        """
+        culprit = frame
+        current: Optional[FrameType] = frame
+        while current is not None:
+            if self._is_project_frame(current) and current.f_code.co_filename != __file__:
+                culprit = current
+                break
+            current = current.f_back
+        code = culprit.f_code
+        filename = code.co_filename
+        if filename.startswith(self.project_root):
+            filename = filename[len(self.project_root) + 1:]
+        site = f'{filename}:{culprit.f_lineno} in {code.co_name}'
+        with self._lock:
+            if site not in self._sites:
+                stack = traceback.format_stack(frame, limit=self.stack_limit)
+                self._sites[site] = BlockingSite(site=site, stack=[line.strip() for line in stack])
+        return site
+
+    def _record(self, site: str, blocked_ms: float) -> None:
+        with self._lock:
+            stats = self._sites[site]
+            stats.count += 1
+            stats.total_ms += blocked_ms
+            stats.max_ms = max(stats.max_ms, blocked_ms)
+
+    def snapshot(self) -> List[dict]:
+        """
+        Места блокировок, отсортированные по суммарному времени.
+        """
+        with self._lock:
+            sites = [s.as_dict() for s in self._sites.values() if s.count]
+        return sorted(sites, key=lambda s: s['total_ms'], reverse=True)
+
+    def report(self) -> None:
+        """
+        Пишет в лог места вызова, по которым были новые блокировки с прошлого отчёта.
+        """
+        with self._lock:
+            fresh = [s for s in self._sites.values() if s.count > s.reported]
+            for stats in fresh:
+                stats.reported = stats.count
+            sites = [s.as_dict() for s in fresh]
+        for site in sorted(sites, key=lambda s: s['total_ms'], reverse=True):
+            logger.warning(
+                'Блокировка event loop: %s, раз: %s, всего: %s мс, максимум: %s мс\n%s',
+                site['site'], site['count'], site['total_ms'], site['max_ms'],
+                '\n'.join(site['stack']),
+                extra={'tags': {'object_id': site['site']}},
+            )
+
+
+loop_watchdog = LoopWatchdog(
+    threshold_ms=settings.watchdog.threshold_ms,
+    interval_ms=settings.watchdog.interval_ms,
+    report_interval_seconds=settings.watchdog.report_interval_seconds,
+    stack_limit=settings.watchdog.stack_limit,
+)
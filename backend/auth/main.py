@@ -1,33 +1,72 @@
 import uvicorn, pathlib
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 
 from core.config import settings
+from core.startup import on_startup, on_shutdown, lifecycle
+from core.static import STATIC_DIR, DIST_DIR, PrecompressedStaticFiles, openapi_document, static_url
 from app.api_site_v1 import router as router_site_v1
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await on_startup()
+    # Схема могла быть построена до fork (server.py)
+    if not openapi_document.ready:
+        openapi_document.build(app)
+    yield
+    await on_shutdown()
+
 
 app = FastAPI(
     title='IngibControl Auth API',
     description='IngibControl Auth API service.',
     version='1.1.1',
+    lifespan=lifespan,
+    # Схема и документация отдаются маршрутами ниже
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
-# app = FastAPI(docs_url=None, redoc_url=None)
 
-# Подключаем статические файлы
-app.mount('/static', StaticFiles(directory='static'), name='static')
+# Подключаем статические файлы: собранные (scripts/build_static.py) и исходные
+app.mount('/static/dist', PrecompressedStaticFiles(directory=DIST_DIR, check_dir=False), name='static_dist')
+app.mount('/static', StaticFiles(directory=STATIC_DIR), name='static')
+
+OPENAPI_URL = '/openapi.json'
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_json(request: Request):
+    return openapi_document.response(request)
 
 @app.get('/docs/', include_in_schema=False)
 async def custom_swagger_ui_html():
     return get_swagger_ui_html(
-        openapi_url=app.openapi_url,
+        openapi_url=OPENAPI_URL,
         title=app.title + ' - Swagger UI',
-        swagger_css_url='/static/swagger-custom-ui.css',
+        swagger_css_url=static_url('swagger-custom-ui.css'),
     )
 
+@app.get('/redoc', include_in_schema=False)
+async def redoc_html():
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=app.title + ' - ReDoc')
+
+# Пробы: liveness не обращается ни к БД, ни к кешу, readiness - только к состоянию воркера
+@app.get('/healthz', include_in_schema=False)
+async def healthz():
+    return Response(b'ok', media_type='text/plain')
+
+@app.get('/readyz', include_in_schema=False)
+async def readyz():
+    if lifecycle.ready and not lifecycle.draining:
+        return Response(b'ready', media_type='text/plain')
+    body = b'draining' if lifecycle.draining else b'warming up'
+    return Response(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, media_type='text/plain')
+
 origins = settings.cors.frontend_urls
 
 app.add_middleware(
@@ -56,11 +56,28 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+# alembic -x dry_run=true upgrade head - оценка без изменений (см. migrations/online.py)
+dry_run = context.get_x_argument(as_dictionary=True).get("dry_run", "").lower() in ("1", "true", "yes")
+
+
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata, process_revision_directives=process_revision_directives)
+    if dry_run:
+        # Внешняя транзакция: DDL и отметка версии откатываются в конце
+        transaction = connection.begin()
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        process_revision_directives=process_revision_directives,
+        # Миграции с autocommit_block (CREATE INDEX CONCURRENTLY, backfill)
+        # фиксируют предыдущие шаги: каждая миграция - своя транзакция
+        transaction_per_migration=True,
+        dry_run=dry_run,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
+    if dry_run:
+        transaction.rollback()
 
 
 async def run_async_migrations() -> None:
@@ -0,0 +1,274 @@
+"""
+Помощники для миграций без долгих блокировок больших таблиц
+(profiles, users_associations, website_users).
+
+Соглашения по использованию - migrations/README.
+"""
+
+import logging, time
+from typing import Any, Callable, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger("alembic.online")
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def is_dry_run() -> bool:
+    """
+    Режим оценки: alembic -x dry_run=true upgrade head.
+    Помощники только оценивают число строк, изменения не выполняются.
+    """
+    return bool(op.get_context().opts.get("dry_run"))
+
+
+def _quote(name: str) -> str:
+    return op.get_bind().dialect.identifier_preparer.quote(name)
+
+
+def estimate_rows(table_name: str, where: Optional[str] = None) -> int:
+    """
+    Оценка числа строк по статистике планировщика (EXPLAIN без выполнения):
+    не читает таблицу, поэтому годится и для таблиц в сотни миллионов строк.
+    """
+    query = f"SELECT 1 FROM {_quote(table_name)}"
+    if where:
+        query += f" WHERE {where}"
+    plan = op.get_bind().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}").scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def guarded(
+    operation: Callable[[], Any],
+    lock_timeout: str = "2s",
+    statement_timeout: str = "60s",
+    attempts: int = 5,
+    backoff: float = 1.0,
+    table_name: Optional[str] = None,
+) -> None:
+    """
+    Выполнение DDL (ALTER TABLE и т.п.) с ограничением ожидания блокировки.
+
+    Пока ALTER ждёт блокировку, за ним в очереди встают все запросы к таблице.
+    С lock_timeout ожидание ограничено: операция откатывается до точки
+    сохранения и повторяется после паузы (backoff, 2 * backoff, ...).
+    statement_timeout ограничивает саму операцию. Прежние значения
+    восстанавливаются после выполнения.
+    """
+    if is_dry_run():
+        estimate = f", строк ~{estimate_rows(table_name)}" if table_name else ""
+        logger.info("dry-run: пропуск DDL%s", estimate)
+        return
+    bind = op.get_bind()
+    previous = bind.execute(
+        sa.text("SELECT current_setting('lock_timeout'), current_setting('statement_timeout')")
+    ).one()
+    set_timeouts = sa.text(
+        "SELECT set_config('lock_timeout', :lock, true), set_config('statement_timeout', :statement, true)"
+    )
+    for attempt in range(1, attempts + 1):
+        try:
+            with bind.begin_nested():
+                bind.execute(set_timeouts, {"lock": lock_timeout, "statement": statement_timeout})
+                operation()
+                bind.execute(set_timeouts, {"lock": previous[0], "statement": previous[1]})
+            return
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            pause = backoff * 2 ** (attempt - 1)
+            logger.warning(
+                "Блокировка не получена за %s (попытка %s из %s), повтор через %.1f с",
+                lock_timeout, attempt, attempts, pause,
+            )
+            time.sleep(pause)
+
+
+def add_enum_value(enum_name: str, value: str) -> None:
+    """
+    ALTER TYPE ... ADD VALUE IF NOT EXISTS. Новое значение можно использовать
+    только после commit: миграции, которые его используют, идут после этой
+    (transaction_per_migration). В dry-run все миграции выполняются в одной
+    транзакции, поэтому значение не добавляется, а execute_dml его не использует.
+    """
+    if is_dry_run():
+        logger.info("dry-run: пропуск значения %s перечисления %s", value, enum_name)
+        return
+    literal = value.replace("'", "''")
+    op.execute(f"ALTER TYPE {_quote(enum_name)} ADD VALUE IF NOT EXISTS '{literal}'")
+
+
+def execute_dml(statement: str) -> None:
+    """
+    Изменение данных миграции (INSERT, UPDATE небольших таблиц-справочников).
+    В dry-run не выполняется: запрос может ссылаться на значения перечислений,
+    не зафиксированные в общей транзакции dry-run. Большие таблицы - через backfill.
+    """
+    if is_dry_run():
+        logger.info("dry-run: пропуск изменения данных: %s", " ".join(statement.split())[:80])
+        return
+    op.execute(statement)
+
+
+def _drop_invalid_index(index_name: str) -> None:
+    """
+    Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс,
+    который обновляется при записи, но не используется. Удаляем его перед повтором.
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name},
+    ).scalar()
+    if invalid:
+        logger.warning("Удаление невалидного индекса %s", index_name)
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(index_name)}")
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[Union[str, sa.TextClause]],
+    unique: bool = False,
+    where: Optional[str] = None,
+    using: Optional[str] = None,
+) -> None:
+    """
+    CREATE INDEX CONCURRENTLY вне транзакции миграции: таблица доступна
+    на запись всё время построения. Выполненное до вызова фиксируется
+    (autocommit_block). Повторный запуск после сбоя безопасен.
+    using - метод доступа (gin, gist), по умолчанию btree.
+    """
+    if is_dry_run():
+        logger.info("dry-run: индекс %s по %s, строк ~%s", index_name, table_name, estimate_rows(table_name))
+        return
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(index_name)
+        op.create_index(
+            index_name,
+            table_name,
+            list(columns),
+            unique=unique,
+            postgresql_where=sa.text(where) if where else None,
+            postgresql_using=using,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    if is_dry_run():
+        logger.info("dry-run: удаление индекса %s", index_name)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(
+    table_name: str,
+    set_clause: str,
+    where: str,
+    batch_size: int = 1000,
+    pause: float = 0.05,
+    key: str = "id",
+    report_seconds: float = 5.0,
+) -> int:
+    """
+    Пакетное заполнение: UPDATE по batch_size строк в порядке key, каждая пачка
+    в своей транзакции (autocommit_block). Пачка блокирует только свои строки,
+    между пачками пауза pause, чтобы не загружать реплики и WAL.
+    Прогресс пишется в лог не чаще раза в report_seconds.
+    Возвращает число обновлённых строк (в dry-run - оценку).
+    """
+    total = estimate_rows(table_name, where)
+    if is_dry_run():
+        logger.info("dry-run: %s, строк к обновлению ~%s", table_name, total)
+        return total
+    table, column = _quote(table_name), _quote(key)
+
+    def batch(after: str) -> sa.TextClause:
+        return sa.text(
+            f"UPDATE {table} SET {set_clause} WHERE {column} IN ("
+            f"SELECT {column} FROM {table} WHERE ({where}){after} "
+            f"ORDER BY {column} LIMIT :limit) RETURNING {column}"
+        )
+
+    first, following = batch(""), batch(f" AND {column} > :last")
+    done, last = 0, None
+    started = reported = time.monotonic()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            if last is None:
+                keys = bind.execute(first, {"limit": batch_size}).scalars().all()
+            else:
+                keys = bind.execute(following, {"last": last, "limit": batch_size}).scalars().all()
+            if not keys:
+                break
+            done += len(keys)
+            last = max(keys)
+            now = time.monotonic()
+            if now - reported >= report_seconds:
+                reported = now
+                logger.info(
+                    "%s: обновлено %s из ~%s, %.0f строк/с",
+                    table_name, done, max(total, done), done / (now - started),
+                )
+            time.sleep(pause)
+    logger.info("%s: обновлено %s строк за %.1f с", table_name, done, time.monotonic() - started)
+    return done
+
+
+def backfill_insert(
+    source_table: str,
+    statement: str,
+    batch_size: int = 1000,
+    pause: float = 0.05,
+    key: str = "id",
+    report_seconds: float = 5.0,
+) -> int:
+    """
+    Пакетный перенос данных из source_table запросом statement (INSERT ... SELECT),
+    который читает строки источника с key > :first AND key <= :last.
+    Границы пачек по batch_size строк источника находятся в порядке key,
+    каждая пачка в своей транзакции (autocommit_block), между пачками пауза pause.
+    Прогресс пишется в лог не чаще раза в report_seconds.
+    Возвращает число вставленных или обновлённых строк (в dry-run - оценку строк источника).
+    """
+    total = estimate_rows(source_table)
+    if is_dry_run():
+        logger.info("dry-run: перенос из %s, строк источника ~%s", source_table, total)
+        return total
+    table, column = _quote(source_table), _quote(key)
+    bound = sa.text(
+        f"SELECT max({column}) FROM (SELECT {column} FROM {table} "
+        f"WHERE {column} > :first ORDER BY {column} LIMIT :limit) batch"
+    )
+    copy = sa.text(statement)
+    done = read = 0
+    started = reported = time.monotonic()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        first = bind.execute(sa.text(f"SELECT min({column}) - 1 FROM {table}")).scalar()
+        while first is not None:
+            last = bind.execute(bound, {"first": first, "limit": batch_size}).scalar()
+            if last is None:
+                break
+            done += bind.execute(copy, {"first": first, "last": last}).rowcount
+            read += batch_size
+            first = last
+            now = time.monotonic()
+            if now - reported >= report_seconds:
+                reported = now
+                logger.info(
+                    "%s: прочитано ~%s из ~%s, перенесено %s, %.0f строк/с",
+                    source_table, read, max(total, read), done, read / (now - started),
+                )
+            time.sleep(pause)
+    logger.info("%s: перенесено %s строк за %.1f с", source_table, done, time.monotonic() - started)
+    return done
@@ -0,0 +1,32 @@
+"""website_users.data_version
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "002"
+down_revision: Union[str, Sequence[str], None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Со значением по умолчанию PostgreSQL добавляет столбец без перезаписи таблицы
+    op.add_column(
+        "website_users",
+        sa.Column("data_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("website_users", "data_version")
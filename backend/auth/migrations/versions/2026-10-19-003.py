@@ -0,0 +1,56 @@
+"""index audit: users_associations foreign keys, lower(email)
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, Sequence[str], None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Составные уникальные индексы начинаются с role_id и не помогают
+    # поиску связи по пользователю или профилю (join в /login, /me, cookie)
+    create_index_concurrently(
+        "ix_users_associations_user_website_id",
+        "users_associations",
+        ["user_website_id"],
+        where="user_website_id IS NOT NULL",
+    )
+    create_index_concurrently(
+        "ix_users_associations_user_webapp_id",
+        "users_associations",
+        ["user_webapp_id"],
+        where="user_webapp_id IS NOT NULL",
+    )
+    create_index_concurrently(
+        "ix_users_associations_profile_id",
+        "users_associations",
+        ["profile_id"],
+    )
+    # Проверка занятости email при регистрации - без учёта регистра
+    create_index_concurrently(
+        "ix_website_users_email_lower",
+        "website_users",
+        [sa.text("lower(email)")],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_website_users_email_lower", "website_users")
+    drop_index_concurrently("ix_users_associations_profile_id", "users_associations")
+    drop_index_concurrently("ix_users_associations_user_webapp_id", "users_associations")
+    drop_index_concurrently("ix_users_associations_user_website_id", "users_associations")
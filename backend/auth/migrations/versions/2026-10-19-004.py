@@ -0,0 +1,32 @@
+"""profiles (visit_date, id) index for guest profile pruning
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: Union[str, Sequence[str], None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Пачки очистки читают профили в порядке (visit_date, id) от самых старых
+    create_index_concurrently(
+        "ix_profiles_visit_date_id",
+        "profiles",
+        ["visit_date", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_profiles_visit_date_id", "profiles")
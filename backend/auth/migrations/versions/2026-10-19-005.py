@@ -0,0 +1,50 @@
+"""website_users.tokens_valid_after for token revocation
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently, guarded
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, Sequence[str], None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Столбец без значения по умолчанию: только изменение каталога
+    guarded(
+        lambda: op.add_column(
+            "website_users",
+            sa.Column(
+                "tokens_valid_after", sa.TIMESTAMP(timezone=True), nullable=True
+            ),
+        ),
+        table_name="website_users",
+    )
+    # Воркеры при старте читают только пользователей с отзывом токенов
+    create_index_concurrently(
+        "ix_website_users_tokens_valid_after",
+        "website_users",
+        ["tokens_valid_after"],
+        where="tokens_valid_after IS NOT NULL",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_website_users_tokens_valid_after", "website_users")
+    guarded(
+        lambda: op.drop_column("website_users", "tokens_valid_after"),
+        table_name="website_users",
+    )
@@ -0,0 +1,52 @@
+"""service_clients and the SERVICE role for client credentials
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from migrations.online import add_enum_value
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, Sequence[str], None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Новые значения перечислений; сами роль и группа создаются манифестом ролей
+    # (scripts/init_roles.py), значения нельзя использовать в этой же транзакции
+    add_enum_value("role_enum", "SERVICE")
+    add_enum_value("role_group_enum", "SERVICES")
+    op.create_table(
+        "service_clients",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("client_id", sa.String(length=64), nullable=False),
+        sa.Column("secret_hash", sa.String(length=64), nullable=False),
+        sa.Column("title", sa.String(length=150), nullable=False),
+        sa.Column("active", sa.Boolean(), server_default="true", nullable=False),
+        sa.Column(
+            "created_date",
+            sa.DateTime().with_variant(
+                postgresql.TIMESTAMP(timezone=True), "postgresql"
+            ),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("client_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Значения перечислений PostgreSQL не удаляет: SERVICE и SERVICES остаются
+    op.drop_table("service_clients")
@@ -0,0 +1,76 @@
+"""webapp_users Telegram fields and unique webapp user association
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently, guarded
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, Sequence[str], None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    ("telegram_id", sa.BigInteger()),
+    ("username", sa.String(length=32)),
+    ("first_name", sa.String(length=64)),
+    ("last_name", sa.String(length=64)),
+    ("language_code", sa.String(length=16)),
+    ("register_date", sa.TIMESTAMP(timezone=True)),
+    ("activity_date", sa.TIMESTAMP(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Столбцы без значения по умолчанию: только изменение каталога
+    for name, type_ in COLUMNS:
+        guarded(
+            lambda name=name, type_=type_: op.add_column(
+                "webapp_users", sa.Column(name, type_, nullable=True)
+            ),
+            table_name="webapp_users",
+        )
+    # Цели ON CONFLICT входа WebApp: пользователь по telegram_id
+    # и единственная связь пользователя WebApp
+    create_index_concurrently(
+        "ix_webapp_users_telegram_id",
+        "webapp_users",
+        ["telegram_id"],
+        unique=True,
+    )
+    create_index_concurrently(
+        "idx_unique_webapp_user_associations",
+        "users_associations",
+        ["user_webapp_id"],
+        unique=True,
+        where="user_webapp_id IS NOT NULL",
+    )
+    # Уникальный индекс покрывает прежний поиск связи по user_webapp_id
+    drop_index_concurrently("ix_users_associations_user_webapp_id", "users_associations")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_index_concurrently(
+        "ix_users_associations_user_webapp_id",
+        "users_associations",
+        ["user_webapp_id"],
+        where="user_webapp_id IS NOT NULL",
+    )
+    drop_index_concurrently("idx_unique_webapp_user_associations", "users_associations")
+    drop_index_concurrently("ix_webapp_users_telegram_id", "webapp_users")
+    for name, _ in reversed(COLUMNS):
+        guarded(
+            lambda name=name: op.drop_column("webapp_users", name),
+            table_name="webapp_users",
+        )
@@ -0,0 +1,68 @@
+"""profile_visits: devices and visits with keyset index
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from migrations.online import backfill_insert
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, Sequence[str], None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Перенос посещений из profiles.history пачками профилей по id:
+# строка на устройство с первым и последним посещением из всей истории
+COPY_HISTORY = (
+    "INSERT INTO profile_visits (profile_id, ip, user_agent, first_visit, last_visit) "
+    "SELECT p.id, left(coalesce(h->>'ip', ''), 45), left(coalesce(h->>'user_agent', ''), 255), "
+    "min((h->>'visit_date')::timestamptz), max((h->>'visit_date')::timestamptz) "
+    "FROM profiles p CROSS JOIN LATERAL jsonb_array_elements(p.history) h "
+    "WHERE p.id > :first AND p.id <= :last AND jsonb_typeof(p.history) = 'array' "
+    "AND h->>'visit_date' IS NOT NULL "
+    "GROUP BY 1, 2, 3 "
+    "ON CONFLICT ON CONSTRAINT idx_unique_profile_visits DO UPDATE SET "
+    "first_visit = LEAST(profile_visits.first_visit, excluded.first_visit), "
+    "last_visit = GREATEST(profile_visits.last_visit, excluded.last_visit)"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Новая таблица: индексы строятся сразу, без CONCURRENTLY
+    op.create_table(
+        "profile_visits",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("profile_id", sa.Integer(), nullable=False),
+        sa.Column("ip", sa.String(length=45), nullable=False),
+        sa.Column("user_agent", sa.String(length=255), nullable=False),
+        sa.Column("first_visit", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_visit", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["profile_id"], ["profiles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "profile_id", "ip", "user_agent", name="idx_unique_profile_visits"
+        ),
+    )
+    op.create_index(
+        "ix_profile_visits_profile_last_visit",
+        "profile_visits",
+        ["profile_id", sa.text("last_visit DESC"), sa.text("id DESC")],
+    )
+    # Перенос истории: каждая пачка в своей транзакции, таблица profiles не блокируется
+    backfill_insert("profiles", COPY_HISTORY)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_profile_visits_profile_last_visit", table_name="profile_visits")
+    op.drop_table("profile_visits")
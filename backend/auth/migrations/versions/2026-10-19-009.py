@@ -0,0 +1,39 @@
+"""pg_trgm index for admin email search
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-20 01:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "009"
+down_revision: Union[str, Sequence[str], None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Расширение из contrib (есть в образе postgres): поиск подстроки в email
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Поиск администратора: lower(email) LIKE '%...%' и LIKE '...%'
+    create_index_concurrently(
+        "ix_website_users_email_trgm",
+        "website_users",
+        [sa.text("lower(email) gin_trgm_ops")],
+        using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Расширение остаётся: его могут использовать другие объекты
+    drop_index_concurrently("ix_website_users_email_trgm", "website_users")
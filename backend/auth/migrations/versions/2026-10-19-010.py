@@ -0,0 +1,56 @@
+"""unique lower(email) on website_users
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-20 02:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, Sequence[str], None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Адреса, различающиеся только регистром, не дадут построить индекс:
+    # их нужно объединить вручную до миграции (проверка и при dry_run)
+    duplicates = op.get_bind().execute(
+        sa.text(
+            "SELECT lower(email) FROM website_users"
+            " GROUP BY lower(email) HAVING count(*) > 1 LIMIT 10"
+        )
+    ).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"email, различающиеся только регистром: {', '.join(duplicates)}"
+        )
+    # Одновременные регистрации User@x и user@x: вторая получает нарушение
+    # уникальности вместо второй учётной записи
+    create_index_concurrently(
+        "idx_unique_website_users_email_lower",
+        "website_users",
+        [sa.text("lower(email)")],
+        unique=True,
+    )
+    # Уникальный индекс обслуживает тот же поиск
+    drop_index_concurrently("ix_website_users_email_lower", "website_users")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_index_concurrently(
+        "ix_website_users_email_lower",
+        "website_users",
+        [sa.text("lower(email)")],
+    )
+    drop_index_concurrently("idx_unique_website_users_email_lower", "website_users")
@@ -0,0 +1,58 @@
+"""profiles.prune_pending marker for deferred guest profile deletion
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-20 03:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import backfill, create_index_concurrently, drop_index_concurrently, guarded
+
+# revision identifiers, used by Alembic.
+revision: str = "011"
+down_revision: Union[str, Sequence[str], None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Постоянный DEFAULT: только изменение каталога, без перезаписи таблицы
+    guarded(
+        lambda: op.add_column(
+            "profiles",
+            sa.Column(
+                "prune_pending",
+                sa.Boolean(),
+                server_default=sa.text("false"),
+                nullable=False,
+            ),
+        ),
+        table_name="profiles",
+    )
+    # Прежняя отметка отложенного удаления - visit_date = 1970-01-01
+    backfill(
+        "profiles",
+        "prune_pending = true",
+        "visit_date = '1970-01-01 00:00:00+00' AND NOT prune_pending",
+    )
+    create_index_concurrently(
+        "ix_profiles_prune_pending",
+        "profiles",
+        ["id"],
+        where="prune_pending",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_profiles_prune_pending", "profiles")
+    guarded(
+        lambda: op.drop_column("profiles", "prune_pending"),
+        table_name="profiles",
+    )
@@ -0,0 +1,55 @@
+"""SERVICE role and SERVICES group rows
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-20 04:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from migrations.online import execute_dml
+
+# revision identifiers, used by Alembic.
+revision: str = "012"
+down_revision: Union[str, Sequence[str], None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Выдача токенов сервисам (POST /auth/token) не должна зависеть от запуска
+    # манифеста ролей: строки создаются здесь, манифест (core/role_manifest.py)
+    # при следующем применении лишь обновит тексты. Значения перечислений
+    # добавлены миграцией 006 и уже зафиксированы (в dry-run шаги пропускаются)
+    execute_dml(
+        """
+        INSERT INTO roles_groups (name, title_ru, description_ru, title_en, description_en)
+        VALUES ('SERVICES', 'Сервисы', 'Группа внутренних сервисов',
+                'Services', 'Group of internal services')
+        ON CONFLICT (name) DO NOTHING
+        """
+    )
+    execute_dml(
+        """
+        INSERT INTO roles (name, title_ru, description_ru, title_en, description_en)
+        VALUES ('SERVICE', 'Сервис', 'Внутренний сервис, вход по client credentials',
+                'Service', 'Internal service authenticated with client credentials')
+        ON CONFLICT (name) DO NOTHING
+        """
+    )
+    execute_dml(
+        """
+        INSERT INTO roles_groups_associations (role_id, role_group_id)
+        SELECT r.id, g.id FROM roles r, roles_groups g
+        WHERE r.name = 'SERVICE' AND g.name = 'SERVICES'
+        ON CONFLICT ON CONSTRAINT idx_unique_roles_groups DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Строки остаются: на роль могут ссылаться связи пользователей
+    pass
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Сборка статических файлов.
+
+Копирует файлы static/ в static/dist/ с хешем содержимого в имени
+(swagger-custom-ui.css -> swagger-custom-ui.<hash>.css), рядом кладёт сжатые
+варианты .gz и .br (если установлен пакет brotli) для текстовых файлов и пишет
+static/dist/manifest.json: исходное имя -> имя с хешем.
+
+    python scripts/build_static.py
+"""
+import gzip, hashlib, json, shutil, sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).parent.parent
+SOURCE = ROOT / 'static'
+DIST = SOURCE / 'dist'
+# Уже сжатые форматы (png, jpg, woff2) повторно не сжимаем
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.html', '.txt', '.map'}
+
+
+def build() -> dict[str, str]:
+    shutil.rmtree(DIST, ignore_errors=True)
+    DIST.mkdir()
+    manifest = {}
+    for path in sorted(SOURCE.rglob('*')):
+        if not path.is_file() or DIST in path.parents:
+            continue
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        relative = path.relative_to(SOURCE)
+        hashed = relative.with_name(f'{path.stem}.{digest}{path.suffix}')
+        target = DIST / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        sizes = [f'{len(data)} B']
+        if path.suffix in COMPRESSIBLE:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            target.with_name(target.name + '.gz').write_bytes(compressed)
+            sizes.append(f'gzip {len(compressed)} B')
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                target.with_name(target.name + '.br').write_bytes(compressed)
+                sizes.append(f'br {len(compressed)} B')
+        manifest[relative.as_posix()] = hashed.as_posix()
+        print(f'{relative} -> {hashed} ({", ".join(sizes)})')
+    (DIST / 'manifest.json').write_text(json.dumps(manifest, indent=2, ensure_ascii=False))
+    return manifest
+
+
+if __name__ == '__main__':
+    if brotli is None:
+        print('Пакет brotli не установлен, варианты .br не создаются', file=sys.stderr)
+    build()
@@ -21,9 +21,7 @@ echo "Выполнение миграций..."
 cd /app
 export PYTHONPATH=/app
 
-# Удаляем старые миграции и создаем новые
-rm -rf /app/migrations/versions/*
-poetry run alembic revision --autogenerate -m 'Initial'
+# Миграции из migrations/versions - единственный источник схемы, не пересоздаются
 poetry run alembic upgrade head
 
 # Инициализируем роли
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Клиенты внутренних сервисов (client credentials).
+
+    python scripts/service_clients.py create billing --title "Биллинг"
+    python scripts/service_clients.py rotate billing
+    python scripts/service_clients.py deactivate billing
+
+create и rotate печатают секрет: он показывается один раз, в БД хранится
+только его хеш. Токен сервиса - POST /api_site/v1/auth/token с
+grant_type=client_credentials. Выданные токены действуют до истечения
+(SERVICE_TOKEN_EXPIRE_MINUTES), в том числе после rotate и deactivate.
+"""
+import argparse, asyncio, sys
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from core.config import settings
+from core.models import ServiceClient
+from core.models.base import date_now
+from core.service_tokens import ServiceTokenCache
+
+
+async def run(command: str, client_id: str, title: str) -> None:
+    engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+    secret = ServiceTokenCache.new_secret()
+    try:
+        async with async_sessionmaker(bind=engine)() as session:
+            if command == 'create':
+                await session.execute(insert(ServiceClient).values(
+                    client_id=client_id, title=title or client_id, created_date=date_now(),
+                    secret_hash=ServiceTokenCache.hash_secret(secret),
+                ))
+            else:
+                values = (
+                    {'secret_hash': ServiceTokenCache.hash_secret(secret), 'active': True}
+                    if command == 'rotate' else {'active': False}
+                )
+                updated = await session.scalar(
+                    update(ServiceClient).where(ServiceClient.client_id == client_id)
+                    .values(**values).returning(ServiceClient.id)
+                )
+                if updated is None:
+                    raise SystemExit(f'Клиент {client_id} не найден')
+            await session.commit()
+    finally:
+        await engine.dispose()
+    if command != 'deactivate':
+        print(secret)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Клиенты внутренних сервисов')
+    parser.add_argument('command', choices=('create', 'rotate', 'deactivate'))
+    parser.add_argument('client_id')
+    parser.add_argument('--title', default='')
+    args = parser.parse_args()
+    asyncio.run(run(args.command, args.client_id, args.title))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Массовый импорт и экспорт пользователей сайта через COPY.
+
+Импорт читает NDJSON или CSV (одна запись на строку) с уже захешированными
+паролями (bcrypt), пачками копирует записи во временную таблицу (COPY)
+и переносит их в website_users, profiles и users_associations тремя
+запросами на пачку. Email, который уже есть (без учёта регистра),
+пропускается. В памяти только одна пачка; после каждой зафиксированной
+пачки смещение в файле пишется в файл контрольной точки (<файл>.checkpoint),
+и повторный запуск продолжает с него.
+
+    python scripts/users_copy.py import users.ndjson
+    python scripts/users_copy.py import users.csv --format csv --batch-size 20000
+    python scripts/users_copy.py export users.ndjson
+    python scripts/users_copy.py export - --format csv > users.csv
+
+Поля записи: email, password (хеш bcrypt) - обязательные; email_confirm,
+register_date, activity_date (ISO 8601), role, ip, user_agent - необязательные.
+Экспорт пишет те же поля, его результат можно импортировать.
+
+Работающие воркеры не знают о новых email (фильтр email строится при старте),
+поэтому после импорта воркеры нужно перезапустить.
+"""
+import argparse, asyncio, csv, json, os, sys, time, uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import asyncpg
+from pydantic import BaseModel, EmailStr, Field, ValidationError, field_validator
+
+from core.cache.resp import RESPClient
+from core.config import settings
+from core.email_filter import EmailFilter
+from core.models.role.role import RoleEnum
+
+FIELDS = ('email', 'password', 'email_confirm', 'register_date', 'activity_date', 'role', 'ip', 'user_agent')
+BCRYPT_HASH = r'^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$'
+
+STAGING = '''
+CREATE TEMP TABLE IF NOT EXISTS import_users (
+    line bigint, email text, password text, email_confirm boolean,
+    register_date timestamptz, activity_date timestamptz,
+    role text, ip text, user_agent text, key text
+) ON COMMIT DELETE ROWS
+'''
+STAGING_COLUMNS = ('line',) + FIELDS + ('key',)
+
+# Дубликаты внутри пачки (остаётся первая запись) и email, которые уже
+# зарегистрированы (без учёта регистра, индекс idx_unique_website_users_email_lower)
+DEDUPLICATE = (
+    '''
+    DELETE FROM import_users s
+    USING (SELECT line, row_number() OVER (PARTITION BY lower(email) ORDER BY line) AS n FROM import_users) d
+    WHERE d.line = s.line AND d.n > 1
+    ''',
+    '''
+    DELETE FROM import_users s
+    USING website_users w
+    WHERE lower(w.email) = lower(s.email)
+    ''',
+)
+
+MERGE = '''
+WITH new_users AS (
+    INSERT INTO website_users (email, password, register_date, activity_date, email_confirm, data_version)
+    SELECT email, password, coalesce(register_date, now()), coalesce(activity_date, register_date, now()),
+           coalesce(email_confirm, false), 0
+    FROM import_users
+    ORDER BY line
+    -- Любой уникальный индекс: email и lower(email) (регистрация во время импорта)
+    ON CONFLICT DO NOTHING
+    RETURNING id, email
+), new_profiles AS (
+    INSERT INTO profiles (key, created_date, visit_date, ip, user_agent, cookie_data, locations, history)
+    SELECT s.key, coalesce(s.register_date, now()), coalesce(s.activity_date, s.register_date, now()),
+           coalesce(s.ip, ''), left(coalesce(s.user_agent, ''), 255), '[]', '[]', '[]'
+    FROM new_users u JOIN import_users s ON s.email = u.email
+    RETURNING id, key
+)
+INSERT INTO users_associations (role_id, profile_id, user_website_id)
+SELECT coalesce(r.id, $1), p.id, u.id
+FROM new_users u
+JOIN import_users s ON s.email = u.email
+JOIN new_profiles p ON p.key = s.key
+LEFT JOIN roles r ON r.name::text = s.role
+'''
+
+EXPORT = '''
+SELECT json_build_object(
+    'email', w.email, 'password', w.password, 'email_confirm', w.email_confirm,
+    'register_date', w.register_date, 'activity_date', w.activity_date,
+    'role', r.name, 'ip', p.ip, 'user_agent', p.user_agent
+)
+FROM website_users w
+JOIN users_associations ua ON ua.user_website_id = w.id
+JOIN profiles p ON p.id = ua.profile_id
+JOIN roles r ON r.id = ua.role_id
+ORDER BY w.id
+'''
+
+
+class ImportUser(BaseModel):
+    email: EmailStr = Field(max_length=settings.email_max_len)
+    password: str = Field(pattern=BCRYPT_HASH)
+    email_confirm: Optional[bool] = None
+    register_date: Optional[datetime] = None
+    activity_date: Optional[datetime] = None
+    role: Optional[str] = None
+    ip: Optional[str] = Field(None, max_length=45)
+    user_agent: Optional[str] = None
+
+    @field_validator('role')
+    @classmethod
+    def role_name(cls, value: Optional[str]) -> Optional[str]:
+        """Роль в БД хранится по имени (USER), допускается и значение (user)."""
+        if value is None:
+            return None
+        try:
+            return RoleEnum[value.upper()].name
+        except KeyError:
+            raise ValueError(f'неизвестная роль {value}')
+
+
+def read_lines(path: Path, offset: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Строки файла, начиная со смещения offset, со смещением конца каждой строки.
+    """
+    with (sys.stdin.buffer if str(path) == '-' else open(path, 'rb')) as stream:
+        if offset:
+            stream.seek(offset)
+        position = offset
+        for raw in stream:
+            position += len(raw)
+            yield position, raw
+
+
+def parse(lines: Iterator[Tuple[int, bytes]], fmt: str, header: Optional[List[str]]):
+    """
+    Разбор записей: (номер строки, смещение, запись или текст ошибки).
+    """
+    for number, (position, raw) in enumerate(lines, start=1):
+        text = raw.decode('utf-8').rstrip('\r\n')
+        if not text.strip():
+            continue
+        try:
+            if fmt == 'csv':
+                values = next(csv.reader([text]))
+                data = {key: value or None for key, value in zip(header, values)}
+            else:
+                data = json.loads(text)
+            yield number, position, ImportUser.model_validate(data)
+        except (ValueError, ValidationError) as e:
+            yield number, position, str(e).splitlines()[0]
+
+
+def csv_header(path: Path) -> Tuple[List[str], int]:
+    """Заголовок CSV и его длина в байтах."""
+    with open(path, 'rb') as stream:
+        raw = stream.readline()
+    return next(csv.reader([raw.decode('utf-8')])), len(raw)
+
+
+class Checkpoint:
+    """
+    Смещение в исходном файле после последней зафиксированной пачки.
+    Запись атомарная (временный файл и rename).
+    """
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+
+    def load(self) -> int:
+        if self.path is None or not self.path.exists():
+            return 0
+        return int(self.path.read_text())
+
+    def save(self, offset: int) -> None:
+        if self.path is None:
+            return
+        temporary = self.path.with_suffix('.tmp')
+        temporary.write_text(str(offset))
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+async def import_batch(connection: asyncpg.Connection, batch: list, default_role_id: int) -> int:
+    async with connection.transaction():
+        await connection.copy_records_to_table('import_users', records=batch, columns=STAGING_COLUMNS)
+        await connection.execute('ANALYZE import_users')
+        for statement in DEDUPLICATE:
+            await connection.execute(statement)
+        status = await connection.execute(MERGE, default_role_id)
+    return int(status.split()[-1])
+
+
+async def reload_email_filter(connection: asyncpg.Connection) -> None:
+    """
+    Импортированные адреса не проходили регистрацию: процессы приложения
+    получают по шине сброса кеша просьбу перечитать фильтр email.
+    """
+    message = EmailFilter.reload_message()
+    try:
+        if settings.cache.bus == 'postgres':
+            await connection.execute('SELECT pg_notify($1, $2)', settings.cache.channel, message)
+            return
+        if settings.cache.bus == 'redis':
+            client = RESPClient(settings.cache.redis_url)
+            try:
+                await client.publish(settings.cache.channel, message.encode('utf-8'))
+            finally:
+                await client.close()
+            return
+    except Exception as e:
+        print(f'Сообщение шины не отправлено: {e}', file=sys.stderr)
+    print('Перезапустите воркеры, чтобы фильтр email увидел импорт', file=sys.stderr)
+
+
+async def import_users(
+    path: Path,
+    fmt: str = 'ndjson',
+    batch_size: int = 10_000,
+    role: RoleEnum = RoleEnum.USER,
+    dsn: str = settings.db.dsn,
+    resume: bool = True,
+) -> Tuple[int, int, int]:
+    """
+    Импорт пользователей. Возвращает (импортировано, пропущено, ошибок).
+    """
+    stdin = str(path) == '-'
+    checkpoint = Checkpoint(None if stdin else Path(f'{path}.checkpoint'))
+    header, offset = None, checkpoint.load() if resume else 0
+    if fmt == 'csv':
+        if stdin:
+            header = next(csv.reader([sys.stdin.buffer.readline().decode('utf-8')]))
+        else:
+            header, header_length = csv_header(path)
+            offset = max(offset, header_length)
+    imported = skipped = errors = 0
+    started = time.monotonic()
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute(STAGING)
+        default_role_id = await connection.fetchval('SELECT id FROM roles WHERE name::text = $1', role.name)
+        if default_role_id is None:
+            raise RuntimeError(f'Роль {role.name} не найдена, выполните scripts/init_roles.py')
+        batch, position = [], offset
+        for number, position, record in parse(read_lines(path, offset), fmt, header):
+            if isinstance(record, str):
+                errors += 1
+                print(f'Строка {number} пропущена: {record}', file=sys.stderr)
+                continue
+            batch.append((
+                number, record.email, record.password, record.email_confirm,
+                record.register_date, record.activity_date,
+                record.role,
+                record.ip, record.user_agent, uuid.uuid4().hex,
+            ))
+            if len(batch) >= batch_size:
+                count = await import_batch(connection, batch, default_role_id)
+                imported, skipped = imported + count, skipped + len(batch) - count
+                checkpoint.save(position)
+                batch = []
+                print(f'Импортировано {imported}, пропущено {skipped}, '
+                      f'{imported / (time.monotonic() - started):.0f} записей/с', file=sys.stderr)
+        if batch:
+            count = await import_batch(connection, batch, default_role_id)
+            imported, skipped = imported + count, skipped + len(batch) - count
+        checkpoint.clear()
+        if imported:
+            await reload_email_filter(connection)
+    finally:
+        await connection.close()
+    print(f'Готово: импортировано {imported}, пропущено {skipped}, ошибок {errors}', file=sys.stderr)
+    return imported, skipped, errors
+
+
+async def export_users(path: Path, fmt: str = 'ndjson', dsn: str = settings.db.dsn) -> None:
+    """
+    Потоковый экспорт через COPY TO STDOUT: строки пишутся по мере получения.
+    NDJSON формирует PostgreSQL (json_build_object); разделитель и кавычки CSV
+    заданы символами, которых нет в JSON, поэтому строки JSON выводятся как есть.
+    """
+    if fmt == 'csv':
+        query = f'SELECT {", ".join(f"e->>{name!r}" for name in FIELDS)} FROM ({EXPORT}) AS export(e)'
+        options = dict(format='csv')
+    else:
+        query = EXPORT
+        options = dict(format='csv', delimiter='\x02', quote='\x01')
+    stdout = str(path) == '-'
+    stream = sys.stdout.buffer if stdout else open(path, 'wb')
+    connection = await asyncpg.connect(dsn)
+    try:
+        if fmt == 'csv':
+            # Заголовок - имена полей записи, а не выражений запроса
+            stream.write((','.join(FIELDS) + '\n').encode('utf-8'))
+
+        async def write(chunk: bytes) -> None:
+            stream.write(chunk)
+
+        await connection.copy_from_query(query, output=write, **options)
+    finally:
+        await connection.close()
+        if not stdout:
+            stream.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Импорт и экспорт пользователей через COPY')
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('path', type=Path, help='Файл или - для stdin/stdout')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--role', type=lambda name: RoleEnum[name.upper()], default=RoleEnum.USER, help='Роль, если в записи не указана')
+    parser.add_argument('--restart', action='store_true', help='Начать импорт заново, игнорируя контрольную точку')
+    args = parser.parse_args()
+    if args.command == 'import':
+        asyncio.run(import_users(args.path, args.format, args.batch_size, args.role, resume=not args.restart))
+    else:
+        asyncio.run(export_users(args.path, args.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Многопроцессный запуск сервиса.
+
+Мастер-процесс предзагружает приложение (модули, JWT-ключи), справочник ролей
+и фильтр email, замораживает объекты сборщика мусора (gc.freeze) и форкает
+воркеры, которые делят один слушающий сокет. Предзагруженные страницы памяти
+остаются общими (copy-on-write), пока воркеры их не изменяют.
+
+    python server.py --workers 4
+
+Параметры по умолчанию - ConfigurationServer в core/config.py (WEB_WORKERS, WEB_MAX_REQUESTS,
+WEB_GRACEFUL_TIMEOUT, WEB_DRAIN_DELAY, WEB_LOOP, WEB_HTTP). Пул соединений на воркер вычисляется
+из общего бюджета DB_CONNECTION_BUDGET.
+"""
+import argparse, asyncio, gc, os, random, signal, sys, threading, time
+from pathlib import Path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='IngibControl Auth API prefork server')
+    parser.add_argument('--workers', type=int, default=None, help='Число воркеров (WEB_WORKERS)')
+    parser.add_argument('--host', default=None)
+    parser.add_argument('--port', type=int, default=None)
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.workers is not None:
+    # До импорта настроек: от числа воркеров зависит размер пула соединений
+    os.environ['WEB_WORKERS'] = str(max(1, args.workers))
+
+# Отключаем сборку мусора до предзагрузки, чтобы не перемешивать страницы памяти перед fork
+gc.disable()
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import uvicorn
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from core.config import settings
+
+
+async def preload() -> None:
+    """
+    Загрузка справочников до fork. Отдельный движок без пула,
+    чтобы ни одно соединение не досталось воркерам по наследству.
+    """
+    from core.catalog import role_catalog
+    from core.email_filter import email_filter
+
+    engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    try:
+        async with session_factory() as session:
+            if settings.warmup.seed_roles:
+                await role_catalog.seed(session)
+            else:
+                await role_catalog.load(session)
+    except Exception as e:
+        print(f'Справочник ролей не загружен до fork: {e}', file=sys.stderr)
+    if settings.email_filter.enabled:
+        await email_filter.load(session_factory, shared=True)
+    await engine.dispose()
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    Мягкая остановка воркера. Первый SIGTERM только переводит воркер
+    в состояние draining (/readyz отвечает 503), и ещё drain_delay секунд
+    он принимает запросы, пока балансировщик не исключит его. Затем обычная
+    остановка uvicorn: новые соединения не принимаются, начатые запросы
+    дорабатываются в пределах timeout_graceful_shutdown. Повторный сигнал
+    начинает остановку без ожидания.
+    """
+
+    draining_since: float | None = None
+
+    def handle_exit(self, sig, frame) -> None:
+        from core.startup import lifecycle
+        delay = settings.server.drain_delay
+        if self.draining_since is not None or delay <= 0:
+            super().handle_exit(sig, frame)
+            return
+        self.draining_since = time.monotonic()
+        lifecycle.draining = True
+        threading.Timer(delay, super().handle_exit, args=(sig, frame)).start()
+
+
+class PreforkSupervisor:
+    """
+    Поддерживает заданное число воркеров: перезапускает завершившиеся
+    (в том числе после WEB_MAX_REQUESTS запросов) и по SIGTERM/SIGINT
+    дожидается мягкого завершения, а по истечении graceful_timeout убивает.
+    """
+
+    def __init__(self, config: uvicorn.Config, sock, workers: int) -> None:
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.children: set[int] = set()
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+        # Воркер
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        gc.enable()
+        from core.models import db_fastapi_connect
+        # Пул движка создан в мастере: соединения родителя воркеру не принадлежат
+        db_fastapi_connect.engine.sync_engine.dispose(close=False)
+        server_conf = settings.server
+        if server_conf.max_requests:
+            # Разброс, чтобы воркеры не перезапускались одновременно
+            self.config.limit_max_requests = server_conf.max_requests + random.randint(0, server_conf.max_requests_jitter)
+        try:
+            DrainingServer(self.config).run(sockets=[self.sock])
+        finally:
+            os._exit(0)
+
+    def handle_stop(self, sig, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.discard(pid)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        for _ in range(self.workers):
+            self.spawn()
+        print(f'Мастер [{os.getpid()}]: запущено воркеров {self.workers} на {self.config.host}:{self.config.port}')
+        while self.children and not self.stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            self.children.discard(pid)
+            if not self.stopping:
+                print(f'Воркер [{pid}] завершился (код {os.waitstatus_to_exitcode(status)}), перезапуск')
+                self.spawn()
+        self.drain()
+
+    def drain(self) -> None:
+        deadline = time.monotonic() + settings.server.drain_delay + settings.server.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.children.discard(pid)
+            else:
+                time.sleep(0.1)
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+
+def main() -> None:
+    server_conf = settings.server
+    config = uvicorn.Config(
+        'main:app',
+        host=args.host or server_conf.host,
+        port=args.port or server_conf.port,
+        loop=server_conf.loop,
+        http=server_conf.http,
+        log_config=str(server_conf.log_config),
+        timeout_graceful_shutdown=server_conf.graceful_timeout,
+    )
+    # Предзагрузка: импорт приложения (модели, маршруты), логирование, ключи и справочники
+    config.load()
+    from core.startup import prepare
+    from core.static import openapi_document
+    from main import app
+    prepare()
+    openapi_document.build(app)
+    asyncio.run(preload())
+    sock = config.bind_socket()
+    sock.set_inheritable(True)
+    # Всё загруженное - в постоянное поколение, сборщик больше не трогает эти страницы
+    gc.freeze()
+    PreforkSupervisor(config, sock, server_conf.workers).run()
+
+
+if __name__ == '__main__':
+    main()
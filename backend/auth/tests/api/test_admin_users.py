@@ -0,0 +1,99 @@
+import csv, io, json, uuid
+import pytest
+from fastapi import status
+from app.api_site_v1.depends import AuthService
+from app.api_site_v1.schemas import UserRegistered
+from core.catalog import role_catalog
+from core.models import Profile, UserAssociation, WebSiteUser
+from core.models.base import date_now
+from core.models.role.role import RoleEnum
+
+ADMIN_URL = "/api_site/v1/admin"
+
+
+async def bearer(session, role: RoleEnum) -> dict:
+    role_id = await role_catalog.role_id(session, role)
+    tokens = json.loads(AuthService.generate_tokens(UserRegistered(email=f"{role.value}@example.com", role_id=role_id)))
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class TestAdminUsersAPI:
+    """Тесты поиска и выгрузки пользователей администратором."""
+
+    @pytest.mark.asyncio
+    async def test_search_and_export(self, async_client, async_session):
+        tag = uuid.uuid4().hex[:10]
+        users = []
+        for n in range(5):
+            user = WebSiteUser(
+                email=f"Admin_Search_{tag}_{n}@example.com", password="x",
+                register_date=date_now(), activity_date=date_now(), email_confirm=n % 2 == 0,
+            )
+            async_session.add(user)
+            users.append(user)
+        await async_session.flush()
+        profile = Profile(key=uuid.uuid4().hex, ip="127.0.0.1", user_agent="test", created_date=date_now(), visit_date=date_now())
+        async_session.add(profile)
+        await async_session.flush()
+        async_session.add(UserAssociation(
+            role_id=await role_catalog.role_id(async_session, RoleEnum.USER), profile_id=profile.id, user_website_id=users[0].id,
+        ))
+        await async_session.commit()
+        headers = await bearer(async_session, RoleEnum.GLOBAL_ADMIN)
+
+        # Подстрока без учёта регистра, страницы по 2 от новых к старым
+        seen, cursor = [], None
+        while True:
+            params = {"q": f"search_{tag}", "limit": 2}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await async_client.get(f"{ADMIN_URL}/users", params=params, headers=headers)
+            assert response.status_code == status.HTTP_200_OK, response.text
+            page = response.json()
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == sorted((user.id for user in users), reverse=True)
+
+        params = {"q": f"admin_search_{tag}", "prefix": "true", "email_confirm": "true"}
+        items = (await async_client.get(f"{ADMIN_URL}/users", params=params, headers=headers)).json()["items"]
+        assert {item["id"] for item in items} == {users[0].id, users[2].id, users[4].id}
+        params = {"q": tag, "role": RoleEnum.USER.value}
+        items = (await async_client.get(f"{ADMIN_URL}/users", params=params, headers=headers)).json()["items"]
+        assert [(item["id"], item["role"]) for item in items] == [(users[0].id, RoleEnum.USER.value)]
+        # Символы LIKE в образце ищутся буквально
+        params = {"q": f"{tag}%_"}
+        assert (await async_client.get(f"{ADMIN_URL}/users", params=params, headers=headers)).json()["items"] == []
+
+        response = await async_client.get(f"{ADMIN_URL}/users/export", params={"q": tag}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == seen
+
+        response = await async_client.get(f"{ADMIN_URL}/users/export", params={"q": tag, "format": "csv"}, headers=headers)
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [int(row["id"]) for row in rows] == seen and rows[-1]["role"] == RoleEnum.USER.value
+
+    @pytest.mark.asyncio
+    async def test_admin_only(self, async_client, async_session):
+        response = await async_client.get(f"{ADMIN_URL}/users", headers=await bearer(async_session, RoleEnum.USER))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        response = await async_client.get(
+            f"{ADMIN_URL}/users", params={"q": "ab"}, headers=await bearer(async_session, RoleEnum.GLOBAL_ADMIN)
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.asyncio
+    async def test_unknown_role(self, async_client, async_session, monkeypatch):
+        """Роль без строки в БД - 422 без перечитывания справочника, а не 500."""
+        headers = await bearer(async_session, RoleEnum.GLOBAL_ADMIN)
+        by_name = {name: role for name, role in role_catalog._by_name.items() if name != RoleEnum.SERVICE}
+        monkeypatch.setattr(role_catalog, "_by_name", by_name)
+
+        async def load(session):
+            raise AssertionError("справочник не должен перечитываться")
+        monkeypatch.setattr(role_catalog, "load", load)
+        response = await async_client.get(f"{ADMIN_URL}/users", params={"role": RoleEnum.SERVICE.value}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, response.text
+        assert response.json()["detail"] == "Role is not configured"
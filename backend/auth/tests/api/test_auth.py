@@ -1,19 +1,25 @@
+import asyncio
 import pytest
-import time
+import uuid
 from fastapi import status
+from sqlalchemy import select
+from core.me_cache import me_cache
+from core.email_filter import email_filter
+from core.models import Profile
+from app.api_site_v1.depends import AuthService
 
 class TestAuthAPI:
     """Тесты для API аутентификации."""
 
     @pytest.mark.asyncio
-    async def test_api(self, client):
+    async def test_api(self, async_client):
         """
         Тест регистрации и аутентификации зарегистрированных
         и не зарегистрированных пользователей.
         """
 
         """Тест аутентификации не зарегистрированного пользователя."""
-        response_cookie = client.get("/api_site/v1/auth/cookies-session")
+        response_cookie = await async_client.get("/api_site/v1/auth/cookies-session")
         data_response_cookie = response_cookie.json()
         print(data_response_cookie)
         assert response_cookie.status_code == status.HTTP_200_OK, "Cookie недоступен"
@@ -23,11 +29,11 @@ class TestAuthAPI:
         session_id = data_response_cookie["new_session_id"]
     
         # Обновляем клиент с установленными cookies
-        client.cookies.set("session_id", session_id)
+        async_client.cookies.set("session_id", session_id)
     
         # Делаем запросы с тем же клиентом, чтобы сохранялись cookies
-        response_cookie_update_1 = client.get("/api_site/v1/auth/cookies-session")
-        response_cookie_update_2 = client.get("/api_site/v1/auth/cookies-session")
+        response_cookie_update_1 = await async_client.get("/api_site/v1/auth/cookies-session")
+        response_cookie_update_2 = await async_client.get("/api_site/v1/auth/cookies-session")
         
         data_response_cookie_update = response_cookie_update_2.json()
         print(data_response_cookie_update)
@@ -39,11 +45,11 @@ class TestAuthAPI:
 
         """Тест регистрации и аутентификации зарегистрированного пользователя."""
         # Подготовка тестовых данных
-        test_email = f"test_register_{int(time.time())}@example.com"
+        test_email = f"test_register_{uuid.uuid4().hex}@example.com"
         test_password = "TestPass123!"
         
         # Регистрируем нового пользователя
-        response = client.post(
+        response = await async_client.post(
             "/api_site/v1/auth/register",
             data={
                 "email": test_email,
@@ -68,7 +74,7 @@ class TestAuthAPI:
         assert data["token_type"] == "Bearer", "Неверный тип токена"
         
         # Проверяем, что повторная регистрация с тем же email невозможна
-        response = client.post(
+        response = await async_client.post(
             "/api_site/v1/auth/register",
             data={
                 "email": test_email,
@@ -82,7 +88,7 @@ class TestAuthAPI:
         assert response.status_code == status.HTTP_409_CONFLICT, \
             "Повторная регистрация с тем же email должна быть запрещена"
         
-        response_login = client.post(
+        response_login = await async_client.post(
             "/api_site/v1/auth/login",
             data={
                 "email": test_email,
@@ -104,7 +110,7 @@ class TestAuthAPI:
         assert "token_type" in data_login, "В ответе отсутствует token_type"
         assert data_login["token_type"] == "Bearer", "Неверный тип токена"
         
-        response_me = client.get(
+        response_me = await async_client.get(
             "/api_site/v1/auth/me",
             headers={
                 "Authorization": f"Bearer {data_login['access_token']}",
@@ -119,7 +125,7 @@ class TestAuthAPI:
         assert "email" in data_me, "В ответе отсутствует email"
         assert "role" in data_me, "В ответе отсутствует role"
 
-        response_refresh = client.post(
+        response_refresh = await async_client.post(
             "/api_site/v1/auth/refresh",
             headers={
                 "Authorization": f"Bearer {data_login['refresh_token']}",
@@ -136,4 +142,140 @@ class TestAuthAPI:
         assert "token_type" in data_refresh, "В ответе отсутствует token_type"
         assert data_refresh["token_type"] == "Bearer", "Неверный тип токена"
         
-        
\ No newline at end of file
+        
+    @pytest.mark.asyncio
+    async def test_me_etag(self, async_client):
+        """Тест ETag и 304 для /me и сброса кеша при смене пароля."""
+        test_email = f"test_me_{uuid.uuid4().hex}@example.com"
+        response = await async_client.post(
+            "/api_site/v1/auth/register",
+            data={"email": test_email, "password": "TestPass123!"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        response_me = await async_client.get("/api_site/v1/auth/me", headers=headers)
+        assert response_me.status_code == status.HTTP_200_OK
+        etag = response_me.headers["etag"]
+        version = me_cache.cache.l1.get(test_email).version
+
+        response_cached = await async_client.get("/api_site/v1/auth/me", headers=headers)
+        assert response_cached.headers["etag"] == etag, "Повторный ответ должен быть из кеша"
+
+        response_not_modified = await async_client.get("/api_site/v1/auth/me", headers={**headers, "If-None-Match": etag})
+        assert response_not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response_not_modified.content == b""
+
+        response_login = await async_client.post(
+            "/api_site/v1/auth/login",
+            data={"email": test_email, "password": "TestPass123!"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        assert response_login.status_code == status.HTTP_200_OK, response_login.text
+        assert me_cache.cache.l1.get(test_email).body is None, "Вход меняет activity_date и должен сбросить кеш /me"
+
+        response_password = await async_client.post(
+            "/api_site/v1/auth/change_password",
+            data={"current_password": "TestPass123!", "new_password": "NewPass123!"},
+            headers=headers
+        )
+        assert response_password.status_code == status.HTTP_200_OK, response_password.text
+
+        assert me_cache.cache.l1.get(test_email).body is None, "Смена пароля должна сбросить кеш /me"
+
+        response_login = await async_client.post(
+            "/api_site/v1/auth/login",
+            data={"email": test_email, "password": "NewPass123!"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        assert response_login.status_code == status.HTTP_200_OK, response_login.text
+        headers = {"Authorization": f"Bearer {response_login.json()['access_token']}"}
+        response_changed = await async_client.get("/api_site/v1/auth/me", headers=headers)
+        assert response_changed.status_code == status.HTTP_200_OK
+        assert me_cache.cache.l1.get(test_email).version > version, "Ответ должен быть перечитан с новой версией"
+
+    @pytest.mark.asyncio
+    async def test_password_change_revokes_tokens(self, async_client):
+        """После смены пароля старые токены не принимают ни /refresh, ни /me, ни /change_password."""
+        test_email = f"test_revoke_{uuid.uuid4().hex}@example.com"
+        form = {"Content-Type": "application/x-www-form-urlencoded"}
+        response = await async_client.post(
+            "/api_site/v1/auth/register", data={"email": test_email, "password": "TestPass123!"}, headers=form
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        tokens = response.json()
+        access = {"Authorization": f"Bearer {tokens['access_token']}"}
+        refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+        response = await async_client.post("/api_site/v1/auth/refresh", headers=access)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, "Access-токен не обменивается на новую пару"
+
+        # Токены той же секунды, что и отзыв, действительны
+        await asyncio.sleep(1.1)
+        response = await async_client.post(
+            "/api_site/v1/auth/change_password",
+            data={"current_password": "TestPass123!", "new_password": "NewPass123!"},
+            headers={**access, **form},
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+
+        response = await async_client.post("/api_site/v1/auth/refresh", headers=refresh)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
+        response = await async_client.get("/api_site/v1/auth/me", headers=access)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
+        response = await async_client.post(
+            "/api_site/v1/auth/change_password",
+            data={"current_password": "NewPass123!", "new_password": "OtherPass123!"},
+            headers={**access, **form},
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
+
+    @pytest.mark.asyncio
+    async def test_register_case_race(self, async_client, monkeypatch):
+        """Адрес в другом регистре, прошедший предварительную проверку (гонка), отклоняется уникальным индексом."""
+        test_email = f"test_case_{uuid.uuid4().hex}@example.com"
+        form = {"Content-Type": "application/x-www-form-urlencoded"}
+        response = await async_client.post(
+            "/api_site/v1/auth/register", data={"email": test_email, "password": "TestPass123!"}, headers=form
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+
+        async def not_found(session, email):
+            return False
+        monkeypatch.setattr(AuthService, "email_exists", not_found)
+        monkeypatch.setattr(email_filter, "might_exist", lambda email: False)
+        response = await async_client.post(
+            "/api_site/v1/auth/register", data={"email": test_email.upper(), "password": "TestPass123!"}, headers=form
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT, response.text
+
+    @pytest.mark.asyncio
+    async def test_login_defers_guest_profile_delete(self, async_client, async_session):
+        """Гостевой профиль, слитый при входе, помечается для фоновой очистки, а не удаляется."""
+        test_email = f"test_merge_{uuid.uuid4().hex}@example.com"
+        response = await async_client.post(
+            "/api_site/v1/auth/register",
+            data={"email": test_email, "password": "TestPass123!"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        guest_key = (await async_client.get("/api_site/v1/auth/cookies-session")).json()["new_session_id"]
+
+        response = await async_client.post(
+            "/api_site/v1/auth/login",
+            data={"email": test_email, "password": "TestPass123!"},
+            headers={"Content-Type": "application/x-www-form-urlencoded", "Cookie-Session": guest_key}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+
+        pending = await async_session.scalar(select(Profile.prune_pending).where(Profile.key == guest_key))
+        assert pending, "Гостевой профиль должен ждать фоновой очистки"
+
+        async_client.cookies.set("session_id", guest_key)
+        response = await async_client.get("/api_site/v1/auth/cookies-session")
+        async_client.cookies.clear()
+        assert response.status_code == status.HTTP_200_OK, response.text
+        async_session.expire_all()
+        pending = await async_session.scalar(select(Profile.prune_pending).where(Profile.key == guest_key))
+        assert pending, "Обновление cookie-сессии не должно отменять отложенное удаление"
@@ -0,0 +1,19 @@
+from fastapi import status
+
+
+class TestDocsAPI:
+    """Тесты документации API."""
+
+    def test_openapi_precompressed(self, client):
+        response = client.get('/openapi.json', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.json()['info']['title'] == 'IngibControl Auth API'
+
+        response = client.get('/openapi.json', headers={'If-None-Match': response.headers['etag']})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_docs(self, client):
+        response = client.get('/docs/')
+        assert response.status_code == status.HTTP_200_OK
+        assert '/openapi.json' in response.text
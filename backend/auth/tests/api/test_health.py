@@ -0,0 +1,32 @@
+import time
+from fastapi import status
+
+from core.startup import lifecycle
+
+
+class TestHealthAPI:
+    """Тесты проб liveness и readiness."""
+
+    def test_healthz(self, client):
+        response = client.get('/healthz')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text == 'ok'
+
+    def test_readyz_after_warmup(self, client):
+        deadline = time.monotonic() + 30
+        response = client.get('/readyz')
+        while response.status_code != status.HTTP_200_OK and time.monotonic() < deadline:
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            time.sleep(0.05)
+            response = client.get('/readyz')
+        assert response.status_code == status.HTTP_200_OK
+        assert lifecycle.warmup_seconds is not None
+
+    def test_readyz_draining(self, client):
+        lifecycle.draining = True
+        try:
+            response = client.get('/readyz')
+        finally:
+            lifecycle.draining = False
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.text == 'draining'
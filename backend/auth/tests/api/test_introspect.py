@@ -0,0 +1,98 @@
+import pytest
+import time
+import uuid
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import status
+from core.config import settings
+from core.revocation import token_revocations
+from core.security import SiteAuthManager, site_auth_manager
+
+INTROSPECT = "/api_site/v1/auth/introspect"
+
+
+async def register(async_client) -> dict:
+    response = await async_client.post(
+        "/api_site/v1/auth/register",
+        data={"email": f"test_introspect_{uuid.uuid4().hex}@example.com", "password": "TestPass123!"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+class TestIntrospectAPI:
+    """Тесты пакетной проверки токенов для шлюза."""
+
+    @pytest.mark.asyncio
+    async def test_batch(self, async_client):
+        """Ответы в порядке запроса; действителен только подписанный access-токен."""
+        tokens = await register(async_client)
+        access, refresh = tokens["access_token"], tokens["refresh_token"]
+        response = await async_client.post(INTROSPECT, json={"tokens": [access, refresh, access, "garbage"]})
+        assert response.status_code == status.HTTP_200_OK, response.text
+        results = response.json()["results"]
+        assert [result["active"] for result in results] == [True, False, True, False]
+        assert results[0]["sub"].startswith("test_introspect_")
+        assert results[0]["prm"] is not None and results[0]["exp"] > results[0]["iat"]
+
+        response = await async_client.post(
+            INTROSPECT, json={"tokens": [access] * (settings.auth_jwt.introspect_max_tokens + 1)}
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.asyncio
+    async def test_revocations_not_loaded(self, async_client, monkeypatch):
+        """Без справочника отзыва пачка не проверяется: 503, а не неактивные токены."""
+        tokens = await register(async_client)
+
+        async def failing(session_factory):
+            raise ConnectionError("db is down")
+        monkeypatch.setattr(token_revocations, "ready", False)
+        monkeypatch.setattr(token_revocations, "ensure_loaded", failing)
+        response = await async_client.post(INTROSPECT, json={"tokens": [tokens["access_token"]]})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    @pytest.mark.asyncio
+    async def test_revoked_after_password_change(self, async_client):
+        """После смены пароля прежние токены недействительны, новые - действительны."""
+        tokens = await register(async_client)
+        access = tokens["access_token"]
+        email = (await async_client.post(INTROSPECT, json={"tokens": [access]})).json()["results"][0]["sub"]
+        # Отзыв с точностью до секунды: токен "старше" на минуту подписан вручную
+        now = int(time.time())
+        old = jwt.encode(
+            {"sub": email, "rol": 1, "iat": now - 60, "exp": now + 600}, site_auth_manager.private_key,
+            algorithm=settings.auth_jwt.algorithm, headers={"iss": "accessToken", "kid": site_auth_manager.kid},
+        )
+        response = await async_client.post(
+            "/api_site/v1/auth/change_password",
+            data={"current_password": "TestPass123!", "new_password": "NewPass123!"},
+            headers={"Authorization": f"Bearer {access}"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+
+        response = await async_client.post(
+            "/api_site/v1/auth/login", data={"email": email, "password": "NewPass123!"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        fresh = response.json()["access_token"]
+
+        results = (await async_client.post(INTROSPECT, json={"tokens": [old, fresh]})).json()["results"]
+        assert [result["active"] for result in results] == [False, True]
+
+    @pytest.mark.asyncio
+    async def test_key_ring(self, async_client, monkeypatch):
+        """Токен прежнего ключа из связки принимается, ключа вне связки - нет."""
+        previous = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        kid = SiteAuthManager.key_id(previous.public_key())
+        now = int(time.time())
+        claims = {"sub": "rotated@example.com", "rol": 1, "iat": now, "exp": now + 600}
+        token = jwt.encode(claims, previous, algorithm="RS256", headers={"iss": "accessToken", "kid": kid})
+
+        results = (await async_client.post(INTROSPECT, json={"tokens": [token]})).json()["results"]
+        assert results[0]["active"] is False
+
+        monkeypatch.setitem(site_auth_manager.key_ring, kid, previous.public_key())
+        results = (await async_client.post(INTROSPECT, json={"tokens": [token]})).json()["results"]
+        assert results[0]["active"] is True and results[0]["sub"] == "rotated@example.com"
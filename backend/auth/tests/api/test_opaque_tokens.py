@@ -0,0 +1,66 @@
+import pytest
+import uuid
+from fastapi import status
+from core.config import settings
+
+CLIENT = {"X-Client-Id": "first-party"}
+
+
+class TestOpaqueTokensAPI:
+    """Тесты режима непрозрачных токенов для выбранных клиентов."""
+
+    @pytest.mark.asyncio
+    async def test_opaque_flow(self, async_client, monkeypatch):
+        monkeypatch.setattr(settings.auth_jwt, "opaque_clients", ["first-party"])
+        email = f"test_opaque_{uuid.uuid4().hex}@example.com"
+        response = await async_client.post(
+            "/api_site/v1/auth/register", data={"email": email, "password": "TestPass123!"}, headers=CLIENT
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        tokens = response.json()
+        access, refresh = tokens["access_token"], tokens["refresh_token"]
+        assert "." not in access and "." not in refresh
+
+        # Клиент без X-Client-Id получает JWT
+        response = await async_client.post("/api_site/v1/auth/login", data={"email": email, "password": "TestPass123!"})
+        assert response.json()["access_token"].count(".") == 2
+
+        bearer = {"Authorization": f"Bearer {access}"}
+        assert (await async_client.get("/api_site/v1/auth/me", headers=bearer)).status_code == status.HTTP_200_OK
+        response = await async_client.get("/api_site/v1/auth/verify", headers=bearer)
+        assert response.status_code == status.HTTP_204_NO_CONTENT and response.headers["x-user-email"] == email
+        results = (await async_client.post("/api_site/v1/auth/introspect", json={"tokens": [access, refresh]})).json()["results"]
+        assert [result["active"] for result in results] == [True, False]
+
+        # Вид токена проверяется так же, как iss у JWT
+        response = await async_client.post("/api_site/v1/auth/refresh", headers={**bearer, **CLIENT})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, "Access-токен не обменивается на новую пару"
+        response = await async_client.get("/api_site/v1/auth/me", headers={"Authorization": f"Bearer {refresh}"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        # Обмен refresh-токена: старый отзывается
+        response = await async_client.post("/api_site/v1/auth/refresh", headers={"Authorization": f"Bearer {refresh}", **CLIENT})
+        assert response.status_code == status.HTTP_200_OK, response.text
+        response = await async_client.post("/api_site/v1/auth/refresh", headers={"Authorization": f"Bearer {refresh}", **CLIENT})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        # Отзыв действует сразу, в том числе для /verify
+        response = await async_client.post("/api_site/v1/auth/revoke", data={"token": access})
+        assert response.json() == {"revoked": True}
+        assert (await async_client.get("/api_site/v1/auth/verify", headers=bearer)).status_code == status.HTTP_401_UNAUTHORIZED
+        assert (await async_client.get("/api_site/v1/auth/me", headers=bearer)).status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.asyncio
+    async def test_password_change_revokes_opaque(self, async_client, monkeypatch):
+        monkeypatch.setattr(settings.auth_jwt, "opaque_clients", ["first-party"])
+        email = f"test_opaque_{uuid.uuid4().hex}@example.com"
+        response = await async_client.post(
+            "/api_site/v1/auth/register", data={"email": email, "password": "TestPass123!"}, headers=CLIENT
+        )
+        bearer = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await async_client.post(
+            "/api_site/v1/auth/change_password",
+            data={"current_password": "TestPass123!", "new_password": "NewPass123!"}, headers=bearer,
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        assert (await async_client.get("/api_site/v1/auth/verify", headers=bearer)).status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,88 @@
+import base64, uuid
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+# Таблицы, которые растут с числом пользователей и гостей
+LARGE_TABLES = {'website_users', 'webapp_users', 'profiles', 'users_associations', 'profile_visits'}
+AUTH_URL = '/api_site/v1/auth'
+
+
+def seq_scans(plan: dict):
+    """Последовательные чтения больших таблиц в плане запроса."""
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in LARGE_TABLES:
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from seq_scans(child)
+
+
+class TestQueryPlans:
+    """Тесты планов запросов AuthService."""
+
+    @pytest.mark.asyncio
+    async def test_no_seq_scans(self, async_client, db_connection):
+        """
+        Проходит все сценарии API, записывает запросы к БД и проверяет их EXPLAIN.
+        enable_seqscan = off: если индекс есть, планировщик выберет его
+        даже на маленькой тестовой базе, и Seq Scan означает, что индекса нет.
+        """
+        statements = {}
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+                statements.setdefault(statement, parameters)
+
+        event.listen(db_connection.sync_connection, 'before_cursor_execute', record)
+        try:
+            response = await async_client.get(f'{AUTH_URL}/cookies-session')
+            key = response.json()['new_session_id']
+            async_client.cookies.set('session_id', key)
+            assert (await async_client.get(f'{AUTH_URL}/cookies-session')).status_code == status.HTTP_200_OK
+            async_client.cookies.clear()
+            guest_key = (await async_client.get(f'{AUTH_URL}/cookies-session')).json()['new_session_id']
+
+            email = f'test_plans_{uuid.uuid4().hex}@example.com'
+            form = {'Content-Type': 'application/x-www-form-urlencoded'}
+            response = await async_client.post(
+                f'{AUTH_URL}/register', data={'email': email, 'password': 'TestPass123!'},
+                headers={**form, 'Cookie-Session': key},
+            )
+            assert response.status_code == status.HTTP_200_OK, response.text
+            response = await async_client.post(
+                f'{AUTH_URL}/login', data={'email': email, 'password': 'TestPass123!'},
+                headers={**form, 'Cookie-Session': guest_key},
+            )
+            assert response.status_code == status.HTTP_200_OK, response.text
+            tokens = response.json()
+            bearer = {'Authorization': f"Bearer {tokens['access_token']}"}
+            assert (await async_client.get(f'{AUTH_URL}/me', headers=bearer)).status_code == status.HTTP_200_OK
+            response = await async_client.get(f'{AUTH_URL}/visits', params={'limit': 1}, headers=bearer)
+            assert response.status_code == status.HTTP_200_OK, response.text
+            # Следующая страница - запрос с курсором (last_visit, id)
+            cursor = base64.urlsafe_b64encode(b'2100-01-01T00:00:00+00:00|1').decode()
+            response = await async_client.get(f'{AUTH_URL}/visits', params={'cursor': cursor}, headers=bearer)
+            assert response.status_code == status.HTTP_200_OK, response.text
+            response = await async_client.post(
+                f'{AUTH_URL}/refresh', headers={'Authorization': f"Bearer {tokens['refresh_token']}"},
+            )
+            assert response.status_code == status.HTTP_200_OK, response.text
+            response = await async_client.post(f'{AUTH_URL}/confirm_email/{key}/', headers=bearer)
+            assert response.status_code == status.HTTP_200_OK, response.text
+            response = await async_client.post(
+                f'{AUTH_URL}/change_password',
+                data={'current_password': 'TestPass123!', 'new_password': 'NewPass123!'},
+                headers={**form, **bearer},
+            )
+            assert response.status_code == status.HTTP_200_OK, response.text
+        finally:
+            event.remove(db_connection.sync_connection, 'before_cursor_execute', record)
+
+        assert statements
+        await db_connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        failures = []
+        for statement, parameters in statements.items():
+            result = await db_connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+            tables = sorted(set(seq_scans(result.scalar()[0]['Plan'])))
+            if tables:
+                failures.append(f'{tables}: {statement}')
+        assert not failures, 'Последовательное чтение больших таблиц:\n' + '\n\n'.join(failures)
@@ -0,0 +1,76 @@
+import base64
+import time
+import pytest
+import uuid
+from fastapi import status
+from sqlalchemy import insert
+from core.catalog import role_catalog
+from core.models import ServiceClient
+from core.models.base import date_now
+from core.permissions import Permission
+from core.service_tokens import ServiceTokenCache
+
+TOKEN = "/api_site/v1/auth/token"
+
+
+class TestServiceTokenAPI:
+    """Тесты client credentials для внутренних сервисов."""
+
+    @pytest.mark.asyncio
+    async def test_client_credentials(self, async_client, async_session):
+        client_id, secret = f"svc-{uuid.uuid4().hex[:12]}", ServiceTokenCache.new_secret()
+        await async_session.execute(insert(ServiceClient).values(
+            client_id=client_id, title="test", created_date=date_now(),
+            secret_hash=ServiceTokenCache.hash_secret(secret),
+        ))
+        await async_session.commit()
+
+        form = {"grant_type": "client_credentials", "client_id": client_id, "client_secret": secret}
+        response = await async_client.post(TOKEN, data=form)
+        assert response.status_code == status.HTTP_200_OK, response.text
+        token = response.json()
+        assert token["token_type"] == "Bearer" and token["expires_in"] > 0
+
+        # Повторный запрос (в том числе через Basic) получает тот же токен из кеша
+        basic = base64.b64encode(f"{client_id}:{secret}".encode()).decode()
+        response = await async_client.post(
+            TOKEN, data={"grant_type": "client_credentials"}, headers={"Authorization": f"Basic {basic}"}
+        )
+        assert response.json()["access_token"] == token["access_token"]
+
+        claims = (await async_client.post(
+            "/api_site/v1/auth/introspect", json={"tokens": [token["access_token"]]}
+        )).json()["results"][0]
+        assert claims["active"] and claims["sub"] == f"service:{client_id}"
+        assert Permission(claims["prm"]) & Permission.USERS_READ
+
+        response = await async_client.post(TOKEN, data=dict(form, client_secret="wrong"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        response = await async_client.post(TOKEN, data=dict(form, grant_type="password"))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio
+    async def test_missing_service_role(self, async_client, async_session, monkeypatch):
+        """Без строки роли SERVICE в БД - понятный 503, а не 500."""
+        client_id, secret = f"svc-{uuid.uuid4().hex[:12]}", ServiceTokenCache.new_secret()
+        await async_session.execute(insert(ServiceClient).values(
+            client_id=client_id, title="test", created_date=date_now(),
+            secret_hash=ServiceTokenCache.hash_secret(secret),
+        ))
+        await async_session.commit()
+
+        async def missing(session, name):
+            raise KeyError(name)
+        monkeypatch.setattr(role_catalog, "role_id", missing)
+        form = {"grant_type": "client_credentials", "client_id": client_id, "client_secret": secret}
+        response = await async_client.post(TOKEN, data=form)
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE, response.text
+
+    def test_cache_refresh_margin(self):
+        """Токен, близкий к истечению, из кеша не выдаётся."""
+        cache = ServiceTokenCache(refresh_seconds=60)
+        cache.put("svc", "hash", "token", expires_at=time.time() + 30)
+        assert cache.get("svc", "hash") is None
+        cache.put("svc", "hash2", "token2", expires_at=time.time() + 600)
+        assert cache.get("svc", "hash2").access_token == "token2"
+        assert cache.get("svc", "hash") is None and len(cache._tokens) == 1
@@ -0,0 +1,119 @@
+import random, time
+import pytest
+from fastapi import status
+from sqlalchemy import func, insert, select
+from core.catalog import role_catalog
+from core.models import Profile, ProfileVisit, UserAssociation, WebAppUser
+from core.models.base import date_now
+from core.models.role.role import RoleEnum
+from core.telegram import InitDataVerifier, init_data_verifier
+from tests.unit.test_telegram import init_data
+
+LOGIN = "/api_site/v1/auth/telegram"
+
+
+def use_verifier(monkeypatch) -> InitDataVerifier:
+    verifier = InitDataVerifier("123456:TEST", max_age_seconds=60)
+    monkeypatch.setattr(init_data_verifier, "_secret_key", verifier._secret_key)
+    return verifier
+
+
+class TestTelegramLoginAPI:
+    """Тесты входа пользователей Telegram WebApp."""
+
+    @pytest.mark.asyncio
+    async def test_login_upsert(self, async_client, async_session, monkeypatch):
+        verifier = InitDataVerifier("123456:TEST", max_age_seconds=60)
+        monkeypatch.setattr(init_data_verifier, "_secret_key", verifier._secret_key)
+        telegram_id = random.randint(10**9, 10**10)
+
+        tokens = []
+        for username in ("ivan", "ivan_new"):
+            data = init_data(verifier, int(time.time()), id=telegram_id, username=username)
+            response = await async_client.post(LOGIN, data={"init_data": data})
+            assert response.status_code == status.HTTP_200_OK, response.text
+            tokens.append(response.json()["access_token"])
+
+        # Повторный вход обновляет пользователя, не создавая профиль и связь заново
+        user = await async_session.scalar(select(WebAppUser).where(WebAppUser.telegram_id == telegram_id))
+        assert user.username == "ivan_new"
+        associations = await async_session.scalar(
+            select(func.count()).select_from(UserAssociation).where(UserAssociation.user_webapp_id == user.id)
+        )
+        assert associations == 1
+
+        claims = (await async_client.post(
+            "/api_site/v1/auth/introspect", json={"tokens": tokens}
+        )).json()["results"]
+        assert all(claim["active"] and claim["sub"] == f"telegram:{telegram_id}" for claim in claims)
+
+    @pytest.mark.asyncio
+    async def test_invalid_init_data(self, async_client, monkeypatch):
+        verifier = InitDataVerifier("123456:TEST", max_age_seconds=60)
+        monkeypatch.setattr(init_data_verifier, "_secret_key", verifier._secret_key)
+        forged = init_data(InitDataVerifier("654321:OTHER", 60), int(time.time()))
+        response = await async_client.post(LOGIN, data={"init_data": forged})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio
+    async def test_refresh_and_me(self, async_client, monkeypatch):
+        verifier = use_verifier(monkeypatch)
+        telegram_id = random.randint(10**9, 10**10)
+        data = init_data(verifier, int(time.time()), id=telegram_id)
+        tokens = (await async_client.post(LOGIN, data={"init_data": data})).json()
+
+        # Субъект telegram:<id> находится через связь, а не как email
+        response = await async_client.post(
+            "/api_site/v1/auth/refresh", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        response = await async_client.get(
+            "/api_site/v1/auth/me", headers={"Authorization": f"Bearer {response.json()['access_token']}"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        assert response.json()["email"] == f"telegram:{telegram_id}"
+        assert response.headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_login_keeps_associated_profile(self, async_client, async_session, monkeypatch):
+        verifier = use_verifier(monkeypatch)
+        telegram_id = random.randint(10**9, 10**10)
+        now = date_now()
+        # Связь с профилем, созданным не по ключу telegram_id (например, перенесённая)
+        profile_id = await async_session.scalar(insert(Profile).values(
+            key=f"legacy-{telegram_id}", cookie_data=[], locations=[], history=[],
+            ip="127.0.0.1", user_agent="legacy", created_date=now, visit_date=now,
+        ).returning(Profile.id))
+        webapp_user_id = await async_session.scalar(insert(WebAppUser).values(
+            telegram_id=telegram_id, register_date=now, activity_date=now,
+        ).returning(WebAppUser.id))
+        await async_session.execute(insert(UserAssociation).values(
+            role_id=await role_catalog.role_id(async_session, RoleEnum.USER),
+            profile_id=profile_id, user_webapp_id=webapp_user_id,
+        ))
+        await async_session.commit()
+
+        data = init_data(verifier, int(time.time()), id=telegram_id)
+        response = await async_client.post(LOGIN, data={"init_data": data})
+        assert response.status_code == status.HTTP_200_OK, response.text
+
+        orphan = await async_session.scalar(
+            select(Profile.id).where(Profile.key == init_data_verifier.profile_key(telegram_id))
+        )
+        assert orphan is None
+        visits = await async_session.scalar(
+            select(func.count()).select_from(ProfileVisit).where(ProfileVisit.profile_id == profile_id)
+        )
+        assert visits == 1
+
+    @pytest.mark.asyncio
+    async def test_login_error(self, async_client, monkeypatch):
+        verifier = use_verifier(monkeypatch)
+
+        async def failing(session, name):
+            raise KeyError(name)
+        monkeypatch.setattr(role_catalog, "role_id", failing)
+        data = init_data(verifier, int(time.time()), id=random.randint(10**9, 10**10))
+        response = await async_client.post(LOGIN, data={"init_data": data})
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.json()["detail"] == "Telegram login error"
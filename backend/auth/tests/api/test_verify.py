@@ -0,0 +1,77 @@
+import logging
+import time
+import pytest
+import uuid
+from fastapi import status
+from app.api_site_v1.auth.verify import token_verifier
+from core.logger import VerifySuccessFilter
+from core.revocation import token_revocations
+
+VERIFY = "/api_site/v1/auth/verify"
+
+
+class TestVerifyAPI:
+    """Тесты эндпоинта подзапроса nginx auth_request."""
+
+    @pytest.mark.asyncio
+    async def test_verify(self, async_client):
+        """204 с заголовками личности для access-токена, 401 без тела в остальных случаях."""
+        response = await async_client.get(VERIFY)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.content == b"" and response.headers["www-authenticate"] == "Bearer"
+
+        email = f"test_verify_{uuid.uuid4().hex}@example.com"
+        response = await async_client.post(
+            "/api_site/v1/auth/register",
+            data={"email": email, "password": "TestPass123!"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        tokens = response.json()
+
+        hits = token_verifier.stats.hits
+        for _ in range(2):
+            response = await async_client.get(VERIFY, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+            assert response.status_code == status.HTTP_204_NO_CONTENT
+            assert response.content == b""
+            assert response.headers["x-user-email"] == email
+            assert response.headers["x-user-role"] == "user"
+        assert token_verifier.stats.hits == hits + 1, "Повторная проверка должна попасть в кеш"
+
+        response = await async_client.get(VERIFY, headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        # Отзыв действует и на токен из кеша
+        await token_revocations.publish(email, int(time.time()) + 1)
+        response = await async_client.get(VERIFY, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio
+    async def test_revocations_not_loaded(self, async_client, monkeypatch):
+        """Без справочника отзыва JWT не пропускается: 503, а не 204."""
+        email = f"test_verify_{uuid.uuid4().hex}@example.com"
+        response = await async_client.post("/api_site/v1/auth/register", data={"email": email, "password": "TestPass123!"})
+        assert response.status_code == status.HTTP_200_OK, response.text
+        access_token = response.json()["access_token"]
+
+        async def failing(session_factory):
+            raise ConnectionError("db is down")
+        monkeypatch.setattr(token_revocations, "ready", False)
+        monkeypatch.setattr(token_revocations, "ensure_loaded", failing)
+        response = await async_client.get(VERIFY, headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.content == b""
+
+    def test_access_log_filter(self):
+        """Успешные подзапросы не попадают в журнал доступа, отказы и остальные пути - попадают."""
+        log_filter = VerifySuccessFilter()
+
+        def record(path, status_code):
+            return logging.LogRecord(
+                "uvicorn.access", logging.INFO, __file__, 0, '%s - "%s %s HTTP/%s" %d',
+                ("127.0.0.1:1", "GET", path, "1.1", status_code), None,
+            )
+
+        assert not log_filter.filter(record(VERIFY, 204))
+        assert log_filter.filter(record(VERIFY, 401))
+        assert log_filter.filter(record("/api_site/v1/auth/me", 200))
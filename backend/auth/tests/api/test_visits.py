@@ -0,0 +1,44 @@
+import uuid
+import pytest
+from fastapi import status
+
+AUTH_URL = "/api_site/v1/auth"
+
+
+class TestVisitsAPI:
+    """Тесты списка устройств пользователя."""
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages(self, async_client):
+        email = f"test_visits_{uuid.uuid4().hex}@example.com"
+        form = {"email": email, "password": "TestPass123!"}
+        response = await async_client.post(f"{AUTH_URL}/register", data=form, headers={"User-Agent": "device-0"})
+        assert response.status_code == status.HTTP_200_OK, response.text
+        for device in range(1, 5):
+            response = await async_client.post(f"{AUTH_URL}/login", data=form, headers={"User-Agent": f"device-{device}"})
+            assert response.status_code == status.HTTP_200_OK, response.text
+        bearer = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        refresh = {"Authorization": f"Bearer {response.json()['refresh_token']}"}
+        response = await async_client.get(f"{AUTH_URL}/visits", headers=refresh)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, "Refresh-токен не даёт прав access-токена"
+
+        # Страницы по 2 без пропусков и повторов, от последнего входа
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+            page = (await async_client.get(f"{AUTH_URL}/visits", params=params, headers=bearer)).json()
+            assert len(page["items"]) <= 2
+            seen.extend(item["user_agent"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert sorted(seen) == [f"device-{device}" for device in range(5)]
+        assert seen[0] == "device-4"
+
+        response = await async_client.get(f"{AUTH_URL}/visits", params={"cursor": "broken"}, headers=bearer)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = await async_client.get(f"{AUTH_URL}/visits", params={"limit": 1000}, headers=bearer)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert (await async_client.get(f"{AUTH_URL}/visits")).status_code in (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN
+        )
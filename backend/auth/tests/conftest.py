@@ -1,30 +1,93 @@
-import asyncio, pytest
+import pytest, pytest_asyncio
 from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from core.config import settings
+from core.email_filter import email_filter
+from core.me_cache import me_cache
 from core.models.db_connect import db_fastapi_connect
+from core.opaque import MemoryTokenStore, opaque_store
+from core.rate_limit import _create_backend, login_limiter, register_limiter
+from core.revocation import token_revocations
+from core.startup import lifecycle
 from main import app
 
-# Фикстура для синхронного клиента
+# Состояние процесса (лимиты, кеш /me, непрозрачные токены, отзыв токенов,
+# фильтр email) у каждого теста своё: результат не зависит от порядка тестов
+# и одинаков при последовательном запуске и с pytest -n
+@pytest.fixture(autouse=True)
+def process_state(monkeypatch):
+    limits = settings.rate_limit
+    monkeypatch.setattr(login_limiter, 'limiter', _create_backend(limits.login_capacity, limits.login_refill_per_minute).limiter)
+    monkeypatch.setattr(register_limiter, 'limiter', _create_backend(limits.register_capacity, limits.register_refill_per_minute).limiter)
+    if isinstance(opaque_store, MemoryTokenStore):
+        for name, value in vars(MemoryTokenStore()).items():
+            monkeypatch.setattr(opaque_store, name, value)
+    monkeypatch.setattr(token_revocations, '_valid_after', {})
+    monkeypatch.setattr(token_revocations, 'ready', False)
+    monkeypatch.setattr(token_revocations, '_session_factory', None)
+    monkeypatch.setattr(email_filter, '_bloom', None)
+    me_cache.cache.clear_local()
+    yield
+    me_cache.cache.clear_local()
+
+# Фикстура для синхронного клиента: полный lifespan (прогрев, кеш) на реальной БД.
+# Только для тестов, которые не пишут в БД (документация, пробы)
 @pytest.fixture
 def client():
     with TestClient(app) as test_client:
         yield test_client
 
-@pytest.fixture(scope='session')
-def event_loop():
-    """Создание event_loop с уровнем сессии (session) вместо function."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+# Соединение с внешней транзакцией, которая откатывается после теста.
+# Тесты не оставляют строк в БД и не видят строк друг друга,
+# поэтому безопасны для параллельного запуска (pytest -n auto)
+@pytest_asyncio.fixture
+async def db_connection():
+    engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                yield connection
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+# Фабрика сессий внутри внешней транзакции: commit и rollback приложения
+# работают с точкой сохранения (SAVEPOINT), а не с самой транзакцией
+@pytest_asyncio.fixture
+async def session_factory(db_connection):
+    return async_sessionmaker(
+        bind=db_connection,
+        autoflush=False,
+        expire_on_commit=False,
+        join_transaction_mode='create_savepoint',
+    )
 
 # Фикстура для получения сессионного объекта
-@pytest.fixture
-async def async_session():
-    # Можно использовать ваш scoped_session_dependency
-    generator = db_fastapi_connect.scoped_session_dependency()
-    session = await generator.__anext__()
-    try:
+@pytest_asyncio.fixture
+async def async_session(session_factory):
+    async with session_factory() as session:
         yield session
-    finally:
-        await session.close()
 
+# Асинхронный клиент: приложение в event loop теста, каждый запрос
+# получает свою сессию внутри внешней транзакции теста
+@pytest_asyncio.fixture
+async def async_client(session_factory):
+    async def session_dependency():
+        async with session_factory() as session:
+            yield session
 
+    app.dependency_overrides[db_fastapi_connect.scoped_session_dependency] = session_dependency
+    app.dependency_overrides[db_fastapi_connect.session_factory_dependency] = lambda: session_factory
+    try:
+        async with app.router.lifespan_context(app):
+            # Фильтр email строится при прогреве: дожидаемся, чтобы он не разошёлся с данными теста
+            await lifecycle.wait_ready()
+            async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as test_client:
+                yield test_client
+    finally:
+        app.dependency_overrides.pop(db_fastapi_connect.scoped_session_dependency, None)
+        app.dependency_overrides.pop(db_fastapi_connect.session_factory_dependency, None)
@@ -0,0 +1,229 @@
+import asyncio, time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from core.config import settings
+from core.cache import CacheManager, CacheStats, LRUCache, RedisBus, RESPClient, RESPError
+from core.cache.lru import MISSING
+from core.me_cache import MeEntry
+
+
+class StandInRedis:
+    """
+    Локальный заменитель Redis для тестов: GET/SET/DEL/PUBLISH/SUBSCRIBE/PING по RESP.
+    """
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.subscribers = {}
+        self.writers = set()
+        # Зависший сервер: соединения открыты, но PING без ответа
+        self.silent = False
+
+    @staticmethod
+    def reply(value) -> bytes:
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        if isinstance(value, list):
+            return b'*%d\r\n' % len(value) + b''.join(StandInRedis.reply(item) for item in value)
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return f'redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/0'
+
+    async def handle(self, reader, writer) -> None:
+        self.writers.add(writer)
+        try:
+            while True:
+                command, *args = await RESPClient.read_reply(reader)
+                command = command.upper()
+                if command == b'GET':
+                    writer.write(self.reply(self.data.get(args[0])))
+                elif command == b'SET':
+                    self.data[args[0]] = args[1]
+                    writer.write(b'+OK\r\n')
+                elif command == b'DEL':
+                    writer.write(self.reply(int(self.data.pop(args[0], None) is not None)))
+                elif command == b'PUBLISH':
+                    receivers = self.subscribers.get(args[0], set())
+                    for receiver in receivers:
+                        receiver.write(self.reply([b'message', args[0], args[1]]))
+                    writer.write(self.reply(len(receivers)))
+                elif command == b'PING':
+                    if self.silent:
+                        continue
+                    writer.write(self.reply([b'pong', b'']))
+                elif command == b'SUBSCRIBE':
+                    self.subscribers.setdefault(args[0], set()).add(writer)
+                    writer.write(self.reply([b'subscribe', args[0], 1]))
+                else:
+                    writer.write(b'-ERR unknown command\r\n')
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for receivers in self.subscribers.values():
+                receivers.discard(writer)
+            self.writers.discard(writer)
+            writer.close()
+
+    async def stop(self) -> None:
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'Условие не выполнено'
+        await asyncio.sleep(0.01)
+
+
+class TestCache:
+    """Тесты двухуровневого кеша."""
+
+    def test_lru_stats(self):
+        stats = CacheStats()
+        cache = LRUCache(max_entries=2, ttl_seconds=60, stats=stats)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is MISSING
+        assert cache.get('a') == 1
+        assert stats.evictions == 1
+        cache.ttl_seconds = 0
+        cache.set('d', 4)
+        assert cache.get('d') is MISSING
+        assert stats.expirations == 1
+
+    @pytest.mark.asyncio
+    async def test_resp_client(self):
+        server = StandInRedis()
+        client = RESPClient(await server.start())
+        try:
+            await client.set('key', b'value', ttl_ms=1000)
+            assert await client.get('key') == b'value'
+            assert await client.delete('key') == 1
+            assert await client.get('key') is None
+            with pytest.raises(RESPError):
+                await client.execute('FLUSHALL')
+        finally:
+            await client.close()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_two_workers(self):
+        """L2 общий для воркеров, сброс ключа доходит до L1 другого воркера."""
+        server = StandInRedis()
+        url = await server.start()
+        workers = [CacheManager(url, 'cache:invalidate', timeout_ms=500, reconnect_seconds=0.05, bus='redis') for _ in range(2)]
+        first, second = [worker.namespace('me', MeEntry, max_entries=10, ttl_seconds=60) for worker in workers]
+        try:
+            for worker in workers:
+                await worker.start()
+            await wait_for(lambda: all(worker.bus.healthy for worker in workers))
+
+            await first.set('user@example.com', MeEntry(1, b'{}', '"etag"'))
+            assert await second.get('user@example.com') == MeEntry(1, b'{}', '"etag"')
+            assert await second.get('user@example.com') is not None
+            assert second.stats.l2_hits == 1 and second.stats.hits == 1
+
+            await first.invalidate('user@example.com')
+            await wait_for(lambda: second.l1.get('user@example.com') is MISSING)
+            assert await second.get('user@example.com') is None
+            assert workers[1].stats()['me']['misses'] == 1
+        finally:
+            for worker in workers:
+                await worker.stop()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_bus_keepalive(self):
+        """Подписка без ответа на PING считается потерянной и переоткрывается."""
+        server = StandInRedis()
+        bus = RedisBus(RESPClient(await server.start()), 'cache:invalidate', reconnect_seconds=0.05, keepalive_seconds=0.1)
+        gaps = []
+        bus.listen(lambda namespace, key: None, lambda: gaps.append(bus.healthy))
+        try:
+            await bus.start()
+            await wait_for(lambda: bus.healthy)
+            await asyncio.sleep(0.3)
+            assert bus.healthy, 'Отвечающий на PING сервер не должен рвать подписку'
+            server.silent = True
+            await wait_for(lambda: not bus.healthy)
+            server.silent = False
+            await wait_for(lambda: bus.healthy)
+            assert len(gaps) >= 3
+        finally:
+            await bus.stop()
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_backend_down(self):
+        """Без L2 и шины кеш не падает, а L1 не используется до подписки."""
+        server = StandInRedis()
+        url = await server.start()
+        await server.stop()
+        manager = CacheManager(url, 'cache:invalidate', timeout_ms=100, reconnect_seconds=0.05, bus='redis')
+        cache = manager.namespace('me', MeEntry, max_entries=10, ttl_seconds=60)
+        await manager.start()
+        try:
+            await cache.set('user@example.com', MeEntry(1, b'{}', '"etag"'))
+            assert await cache.get('user@example.com') is None
+            assert cache.stats.l2_errors == 2
+            assert not manager.bus.healthy
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_postgres_bus(self):
+        """NOTIFY в транзакции доходит до другого воркера только после commit."""
+        workers = [
+            CacheManager(None, 'cache:invalidate:test', timeout_ms=100, reconnect_seconds=0.05,
+                         bus='postgres', dsn=settings.db.dsn)
+            for _ in range(2)
+        ]
+        first, second = [worker.namespace('me', MeEntry, max_entries=10, ttl_seconds=60) for worker in workers]
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            for worker in workers:
+                await worker.start()
+            await wait_for(lambda: all(worker.bus.healthy for worker in workers))
+            await second.set('user@example.com', MeEntry(1, b'{}', '"etag"'))
+            epoch = second.epoch
+
+            async with async_sessionmaker(engine)() as session:
+                await first.notify(session, 'user@example.com')
+                await session.rollback()
+                await first.notify(session, 'user@example.com')
+                await asyncio.sleep(0.1)
+                assert second.l1.get('user@example.com') is not MISSING, 'До commit сообщение не доставляется'
+                await session.commit()
+            await wait_for(lambda: second.l1.get('user@example.com') is MISSING)
+            assert second.epoch == epoch + 1
+
+            await first.invalidate('user@example.com')
+            await second.set('other@example.com', MeEntry(1, b'{}', '"etag"'))
+            await first.bus.publish('me', 'other@example.com')
+            await wait_for(lambda: second.l1.get('other@example.com') is MISSING)
+
+            # Обрыв соединения LISTEN: L1 очищается, соединение восстанавливается
+            await second.set('gap@example.com', MeEntry(1, b'{}', '"etag"'))
+            async with engine.connect() as connection:
+                await connection.execute(
+                    text('SELECT pg_terminate_backend(:pid)'),
+                    {'pid': workers[1].bus._connection.get_server_pid()},
+                )
+            await wait_for(lambda: second.l1.get('gap@example.com') is MISSING)
+            await wait_for(lambda: workers[1].bus.healthy)
+        finally:
+            for worker in workers:
+                await worker.stop()
+            await engine.dispose()
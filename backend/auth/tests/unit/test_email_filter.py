@@ -0,0 +1,117 @@
+import pytest
+
+from core.cache import InvalidationBus
+from core.email_filter import BloomFilter, EmailFilter
+
+
+class StreamSession:
+    """Сессия для build: count и потоковое чтение email; on_row вызывается после каждой строки."""
+
+    def __init__(self, emails, on_row=None) -> None:
+        self.emails = emails
+        self.on_row = on_row
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        emails = self.emails
+
+        class Result:
+            def scalar_one(self):
+                return len(emails)
+        return Result()
+
+    async def stream_scalars(self, statement):
+        async def rows():
+            for email in self.emails:
+                yield email
+                if self.on_row is not None:
+                    self.on_row()
+        return rows()
+
+
+class TestEmailFilter:
+    """Тесты вероятностного фильтра email."""
+
+    def test_bloom_no_false_negatives(self):
+        bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+        emails = [f'user{i}@example.com' for i in range(10_000)]
+        for email in emails:
+            bloom.add(email)
+        assert all(email in bloom for email in emails)
+        false_positives = sum(f'other{i}@example.com' in bloom for i in range(10_000))
+        assert false_positives < 300, false_positives
+
+    def test_not_ready_passes_through(self):
+        """Пока фильтр не построен, любой email считается возможно существующим."""
+        email_filter = EmailFilter(InvalidationBus(), capacity=100, error_rate=0.01, stream_batch=10)
+        assert email_filter.might_exist('nobody@example.com')
+        email_filter.add('nobody@example.com')
+        assert not email_filter.ready
+
+    def test_normalized(self):
+        email_filter = EmailFilter(InvalidationBus(), capacity=100, error_rate=0.001, stream_batch=10, single_pod=True)
+        email_filter._bloom = BloomFilter(100, 0.001)
+        email_filter.add('User@Example.com')
+        assert email_filter.might_exist('user@example.com')
+        assert email_filter.might_exist('USER@EXAMPLE.COM')
+        assert not email_filter.might_exist('nobody@example.com')
+
+    @pytest.mark.asyncio
+    async def test_add_during_build(self):
+        """Регистрация во время построения не теряется."""
+        email_filter = EmailFilter(InvalidationBus(), capacity=100, error_rate=0.001, stream_batch=10, single_pod=True)
+        session = StreamSession(['old@example.com'], on_row=lambda: email_filter.add('New@Example.com'))
+        await email_filter.build(session)
+        assert email_filter.ready
+        assert email_filter.might_exist('old@example.com')
+        assert email_filter.might_exist('new@example.com')
+
+    @pytest.mark.asyncio
+    async def test_rebuild_keeps_filter(self):
+        """Перечитывание дополняет текущий фильтр: импорт в обход регистрации попадает в него."""
+        email_filter = EmailFilter(InvalidationBus(), capacity=100, error_rate=0.001, stream_batch=10)
+        await email_filter.build(StreamSession(['a@example.com']))
+        bloom = email_filter._bloom
+        await email_filter.build(StreamSession(['a@example.com', 'imported@example.com']))
+        assert email_filter._bloom is bloom and bloom.count == 2
+        assert email_filter.might_exist('imported@example.com')
+
+    def test_bus_message(self):
+        """Регистрация в другом процессе приходит сообщением шины."""
+        bus = InvalidationBus()
+        email_filter = EmailFilter(bus, capacity=100, error_rate=0.001, stream_batch=10)
+        email_filter._bloom = BloomFilter(100, 0.001)
+        bus._dispatch(bus.SEPARATOR.join(('other', EmailFilter.NAMESPACE, 'remote@example.com')))
+        assert email_filter.might_exist('remote@example.com')
+
+    def test_local_bus_not_ready(self):
+        """С локальной шиной регистрации других подов не доходят: фильтр пропускает всё в БД."""
+        email_filter = EmailFilter(InvalidationBus(), capacity=100, error_rate=0.001, stream_batch=10)
+        email_filter._bloom = BloomFilter(100, 0.001)
+        assert not email_filter.ready
+        assert email_filter.might_exist('nobody@example.com')
+
+    @pytest.mark.asyncio
+    async def test_reload_message(self):
+        """Импорт в обход регистрации просит перечитать фильтр."""
+        bus = InvalidationBus()
+        email_filter = EmailFilter(bus, capacity=100, error_rate=0.001, stream_batch=10, single_pod=True)
+        await email_filter.build(StreamSession(['a@example.com']))
+        email_filter._session_factory = lambda: StreamSession(['a@example.com', 'imported@example.com'])
+        bus._dispatch(EmailFilter.reload_message())
+        await email_filter._reload
+        assert email_filter.might_exist('imported@example.com')
+
+    def test_private_filter_not_ready_with_workers(self):
+        """В многопроцессном режиме без общей шины годится только общий фильтр."""
+        email_filter = EmailFilter(InvalidationBus(), capacity=100, error_rate=0.001, stream_batch=10, workers=4, single_pod=True)
+        email_filter._bloom = BloomFilter(100, 0.001)
+        assert not email_filter.ready
+        assert email_filter.might_exist('nobody@example.com')
+        email_filter._bloom = BloomFilter(100, 0.001, shared=True)
+        assert email_filter.ready
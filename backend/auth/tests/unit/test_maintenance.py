@@ -0,0 +1,74 @@
+import uuid
+from datetime import timedelta
+import pytest
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from core.config import settings
+from core.catalog import role_catalog
+from core.maintenance import GuestProfilePruner, PRUNE_LOCK_KEY
+from core.models import Profile, UserAssociation
+from core.models.user.user import WebAppUser
+from core.models.base import date_now
+from core.models.role.role import RoleEnum
+
+
+async def add_profile(connection, role_id: int, days_idle: int, webapp_user_id=None, prune_pending=False) -> int:
+    visit_date = date_now() - timedelta(days=days_idle)
+    profile_id = await connection.scalar(insert(Profile).values(
+        key=uuid.uuid4().hex, cookie_data=[], locations=[], history=[], ip='127.0.0.1',
+        user_agent='test', created_date=visit_date, visit_date=visit_date, prune_pending=prune_pending,
+    ).returning(Profile.id))
+    await connection.execute(insert(UserAssociation).values(
+        role_id=role_id, profile_id=profile_id, user_webapp_id=webapp_user_id,
+    ))
+    return profile_id
+
+
+class TestGuestProfilePruner:
+    """Тесты фоновой очистки гостевых профилей."""
+
+    @pytest.mark.asyncio
+    async def test_prune(self):
+        """Удаляются только устаревшие гостевые профили и профили с отложенным удалением, пачками."""
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as connection:
+                role_id = await role_catalog.role_id(connection, RoleEnum.GUEST)
+                stale = [await add_profile(connection, role_id, days_idle=3) for _ in range(5)]
+                stale += [await add_profile(connection, role_id, days_idle=0, prune_pending=True) for _ in range(3)]
+                fresh = await add_profile(connection, role_id, days_idle=0)
+                webapp_user_id = await connection.scalar(insert(WebAppUser).values().returning(WebAppUser.id))
+                owned = await add_profile(connection, role_id, days_idle=3, webapp_user_id=webapp_user_id)
+                await connection.commit()
+
+            pruner = GuestProfilePruner(ttl_days=1, interval_seconds=60, batch_size=2, batch_pause=0)
+            assert await pruner.prune(engine) >= len(stale)
+
+            async with engine.connect() as connection:
+                left = set(await connection.scalars(
+                    select(Profile.id).where(Profile.id.in_([*stale, fresh, owned]))
+                ))
+                assert left == {fresh, owned}
+                assert not await connection.scalar(
+                    select(func.count(UserAssociation.id)).where(UserAssociation.profile_id.in_(stale))
+                )
+                await connection.execute(delete(Profile).where(Profile.id.in_(left)))
+                await connection.execute(delete(WebAppUser).where(WebAppUser.id == webapp_user_id))
+                await connection.commit()
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_prune_skipped_when_locked(self):
+        """Пока блокировку держит другой процесс, проход пропускается."""
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as holder:
+                assert await holder.scalar(select(func.pg_try_advisory_lock(PRUNE_LOCK_KEY)))
+                pruner = GuestProfilePruner(ttl_days=1, interval_seconds=60, batch_size=2, batch_pause=0)
+                assert await pruner.prune(engine) is None
+                await holder.scalar(select(func.pg_advisory_unlock(PRUNE_LOCK_KEY)))
+            assert await pruner.prune(engine) is not None
+        finally:
+            await engine.dispose()
@@ -0,0 +1,30 @@
+import pytest
+from core.cache import InvalidationBus, TieredCache
+from core.me_cache import MeCache, MeEntry
+
+
+def make_cache() -> MeCache:
+    return MeCache(TieredCache('me', MeEntry, max_entries=10, ttl_seconds=60, bus=InvalidationBus()))
+
+
+class TestMeCache:
+    """Тесты кеша ответа /me."""
+
+    @pytest.mark.asyncio
+    async def test_put_get(self):
+        cache = make_cache()
+        entry = await cache.put('user@example.com', 1, b'{"id":1}')
+        assert await cache.get('user@example.com') == entry
+        assert entry.etag == MeCache.make_etag(b'{"id":1}')
+
+    @pytest.mark.asyncio
+    async def test_stale_put_after_invalidate(self):
+        """Ответ, прочитанный до изменения, не заменяет более новую версию."""
+        cache = make_cache()
+        await cache.put('user@example.com', 1, b'old')
+        await cache.invalidate('user@example.com', 2)
+        assert await cache.get('user@example.com') is None
+        await cache.put('user@example.com', 1, b'old')
+        assert await cache.get('user@example.com') is None
+        await cache.put('user@example.com', 2, b'new')
+        assert (await cache.get('user@example.com')).body == b'new'
@@ -0,0 +1,170 @@
+import asyncio, uuid
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from core.config import settings
+from migrations import online
+
+
+def run_ops(connection, func, **opts):
+    """Выполнение помощников миграций на синхронном соединении вне alembic."""
+    context = MigrationContext.configure(connection, opts=opts)
+    with Operations.context(context), context.begin_transaction():
+        return func()
+
+
+class TestOnlineMigrations:
+    """Тесты помощников миграций без долгих блокировок."""
+
+    @pytest.mark.asyncio
+    async def test_backfill_batches(self):
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql(
+                    'CREATE TEMP TABLE backfill_test (id serial PRIMARY KEY, value int)'
+                )
+                await connection.exec_driver_sql('INSERT INTO backfill_test (value) SELECT NULL FROM generate_series(1, 250)')
+                await connection.exec_driver_sql('ANALYZE backfill_test')
+                await connection.commit()
+
+                estimate = await connection.run_sync(
+                    run_ops, lambda: online.backfill('backfill_test', 'value = 1', 'value IS NULL'), dry_run=True,
+                )
+                assert estimate == 250
+                assert await connection.scalar(sa.text('SELECT count(*) FROM backfill_test WHERE value IS NULL')) == 250
+                await connection.commit()
+
+                updated = await connection.run_sync(
+                    run_ops, lambda: online.backfill('backfill_test', 'value = 1', 'value IS NULL', batch_size=100, pause=0),
+                )
+                assert updated == 250
+                assert await connection.scalar(sa.text('SELECT count(*) FROM backfill_test WHERE value IS NULL')) == 0
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_backfill_insert_batches(self):
+        """Перенос пачками источника: агрегаты по ключу не зависят от границ пачек."""
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql('CREATE TEMP TABLE insert_source (id serial PRIMARY KEY, device int, seen int)')
+                await connection.exec_driver_sql(
+                    'CREATE TEMP TABLE insert_target (device int PRIMARY KEY, first_seen int, last_seen int)'
+                )
+                await connection.exec_driver_sql(
+                    'INSERT INTO insert_source (device, seen) SELECT n % 7, n FROM generate_series(1, 250) n'
+                )
+                await connection.exec_driver_sql('ANALYZE insert_source')
+                await connection.commit()
+                statement = (
+                    'INSERT INTO insert_target SELECT device, min(seen), max(seen) FROM insert_source '
+                    'WHERE id > :first AND id <= :last GROUP BY device '
+                    'ON CONFLICT (device) DO UPDATE SET '
+                    'first_seen = LEAST(insert_target.first_seen, excluded.first_seen), '
+                    'last_seen = GREATEST(insert_target.last_seen, excluded.last_seen)'
+                )
+
+                estimate = await connection.run_sync(
+                    run_ops, lambda: online.backfill_insert('insert_source', statement), dry_run=True,
+                )
+                assert estimate == 250
+                assert await connection.scalar(sa.text('SELECT count(*) FROM insert_target')) == 0
+                await connection.commit()
+
+                await connection.run_sync(
+                    run_ops, lambda: online.backfill_insert('insert_source', statement, batch_size=100, pause=0),
+                )
+                rows = (await connection.execute(sa.text(
+                    'SELECT device, first_seen, last_seen FROM insert_target ORDER BY device'
+                ))).all()
+                assert rows == [
+                    (device, device or 7, max(n for n in range(1, 251) if n % 7 == device)) for device in range(7)
+                ]
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_enum_value_dry_run(self):
+        """dry-run в одной транзакции: новое значение перечисления не используется до commit."""
+        name = f'enum_test_{uuid.uuid4().hex[:12]}'
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        insert = f"INSERT INTO {name}_rows VALUES ('b')"
+
+        def migrate():
+            online.add_enum_value(name, 'b')
+            online.execute_dml(insert)
+
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql(f"CREATE TYPE {name} AS ENUM ('a')")
+                await connection.exec_driver_sql(f'CREATE TABLE {name}_rows (value {name})')
+                await connection.commit()
+
+                await connection.run_sync(run_ops, migrate, dry_run=True)
+                await connection.rollback()
+                assert await connection.scalar(sa.text(f'SELECT count(*) FROM {name}_rows')) == 0
+
+                # Без dry-run значение фиксируется отдельной транзакцией (миграцией) до использования
+                await connection.run_sync(run_ops, lambda: online.add_enum_value(name, 'b'))
+                await connection.commit()
+                await connection.run_sync(run_ops, lambda: online.execute_dml(insert))
+                await connection.commit()
+                assert await connection.scalar(sa.text(f'SELECT count(*) FROM {name}_rows')) == 1
+        finally:
+            async with engine.begin() as connection:
+                await connection.exec_driver_sql(f'DROP TABLE IF EXISTS {name}_rows')
+                await connection.exec_driver_sql(f'DROP TYPE IF EXISTS {name}')
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_guarded_retries_on_lock_timeout(self):
+        """ALTER TABLE ждёт не дольше lock_timeout и повторяется, пока блокировку держит другая транзакция."""
+        table = f'guarded_test_{uuid.uuid4().hex[:12]}'
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as holder, engine.connect() as migrator:
+                await holder.exec_driver_sql(f'CREATE TABLE {table} (id int)')
+                await holder.commit()
+                await holder.exec_driver_sql(f'LOCK TABLE {table} IN ACCESS SHARE MODE')
+
+                async def release():
+                    await asyncio.sleep(0.3)
+                    await holder.rollback()
+
+                def migrate():
+                    online.guarded(
+                        lambda: online.op.add_column(table, sa.Column('value', sa.Integer())),
+                        lock_timeout='100ms', attempts=10, backoff=0.05,
+                    )
+                    return online.op.get_bind().scalar(sa.text("SELECT current_setting('lock_timeout')"))
+
+                releasing = asyncio.create_task(release())
+                lock_timeout = await migrator.run_sync(run_ops, migrate)
+                await releasing
+                assert lock_timeout == '0', 'lock_timeout должен быть восстановлен'
+                columns = await holder.scalars(sa.text(
+                    'SELECT column_name FROM information_schema.columns WHERE table_name = :table'
+                ), {'table': table})
+                assert 'value' in columns.all()
+        finally:
+            async with engine.begin() as connection:
+                await connection.exec_driver_sql(f'DROP TABLE IF EXISTS {table}')
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_guarded_does_not_retry_other_errors(self):
+        engine = create_async_engine(settings.db.async_url, poolclass=NullPool)
+        try:
+            async with engine.connect() as connection:
+                with pytest.raises(sa.exc.ProgrammingError):
+                    await connection.run_sync(run_ops, lambda: online.guarded(
+                        lambda: online.op.add_column('missing_table', sa.Column('value', sa.Integer())),
+                        attempts=3, backoff=10,
+                    ))
+        finally:
+            await engine.dispose()
@@ -0,0 +1,49 @@
+import time
+import pytest
+from core.opaque import ACCESS, MemoryTokenStore, OpaqueSession, TimingWheel
+
+
+def session(subject: str, ttl: float) -> OpaqueSession:
+    now = int(time.time())
+    return OpaqueSession(sub=subject, rol=1, prm=3, iat=now, exp=now + ttl, kind=ACCESS)
+
+
+class TestTimingWheel:
+    """Тесты колеса таймеров."""
+
+    def test_advance(self):
+        """Истекают только ключи прошедших тиков, в том числе через оборот колеса."""
+        now = 1_000_000.0
+        wheel = TimingWheel(slots=10)
+        wheel._tick = int(now)
+        wheel.schedule('soon', now + 2)
+        wheel.schedule('next_turn', now + 12)
+        wheel.schedule('cancelled', now + 3)
+        wheel.cancel('cancelled', now + 3)
+        assert wheel.advance(now + 1) == []
+        assert wheel.advance(now + 5) == ['soon']
+        assert wheel.advance(now + 11) == []
+        assert wheel.advance(now + 100) == ['next_turn']
+
+
+class TestMemoryTokenStore:
+    """Тесты хранилища непрозрачных токенов в памяти."""
+
+    @pytest.mark.asyncio
+    async def test_issue_revoke_expire(self):
+        store = MemoryTokenStore(wheel_slots=60)
+        token = await store.issue(session('a@example.com', 600))
+        other = await store.issue(session('a@example.com', 600))
+        assert '.' not in token and len(token) == 32
+        assert (await store.get(token)).sub == 'a@example.com'
+
+        assert await store.revoke(token)
+        assert await store.get(token) is None
+        assert not await store.revoke(token)
+
+        assert await store.revoke_subject('a@example.com') == 1
+        assert await store.get(other) is None and len(store) == 0
+
+        expired = await store.issue(session('b@example.com', -1))
+        assert await store.get(expired) is None
+        assert len(store) == 0, "Истёкшая запись удаляется колесом при обращении"
@@ -0,0 +1,71 @@
+import json
+import pytest
+from fastapi import Depends, FastAPI, status
+from httpx import ASGITransport, AsyncClient
+from app.api_site_v1.auth.dependencies import require_permissions
+from app.api_site_v1.depends import AuthService
+from app.api_site_v1.schemas import UserRegistered
+from core.catalog import RoleCatalog, RoleInfo, role_catalog
+from core.permissions import ALL_PERMISSIONS, Permission, compile_permissions
+from core.models.role.role import RoleEnum
+from core.models.role.role_group import RoleGroupEnum
+from core.revocation import token_revocations
+from core.security import site_auth_manager
+
+
+def make_token(iss: str = AuthService.JWTKeys.ACCESS, **payload) -> str:
+    return site_auth_manager.create_access_token(head={'iss': iss}, payload={'sub': 'user@example.com', **payload})
+
+
+class TestPermissions:
+    """Тесты компиляции прав и их проверки по токену."""
+
+    def test_compile(self):
+        """Права роли объединяются с правами группы, справочник компилирует их при заполнении."""
+        assert compile_permissions(RoleEnum.GLOBAL_ADMIN, RoleGroupEnum.ADMINISTRATORS) == ALL_PERMISSIONS
+        owner = compile_permissions(RoleEnum.OWNER, RoleGroupEnum.USERS)
+        assert owner == Permission.COMPANY_MANAGE | Permission.PROFILE_READ | Permission.PROFILE_WRITE
+        assert not compile_permissions(RoleEnum.GUEST, RoleGroupEnum.GUESTS)
+
+        catalog = RoleCatalog()
+        catalog.fill([RoleInfo(id=7, name=RoleEnum.OWNER, group=RoleGroupEnum.USERS)])
+        assert catalog.permissions(7) == owner
+        assert catalog.permissions(8) is None
+
+    @pytest.mark.asyncio
+    async def test_require_permissions(self):
+        """Зависимость пропускает токен со всеми требуемыми битами, остальным отвечает 403."""
+        app = FastAPI()
+
+        @app.get('/users')
+        async def users(payload: dict = Depends(require_permissions(Permission.USERS_READ, Permission.PROFILE_READ))):
+            return {'sub': payload['sub']}
+
+        reader = Permission.USERS_READ | Permission.PROFILE_READ
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.get('/users', headers={'Authorization': f'Bearer {make_token(prm=int(reader))}'})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == {'sub': 'user@example.com'}
+
+            token = make_token(prm=int(Permission.USERS_READ))
+            response = await client.get('/users', headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+
+            response = await client.get('/users', headers={'Authorization': 'Bearer invalid'})
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+
+            # Refresh-токен с теми же правами не проходит проверку прав
+            token = make_token(iss=AuthService.JWTKeys.REFRESH, prm=int(reader))
+            response = await client.get('/users', headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio
+    async def test_token_claim(self, async_session, session_factory):
+        """Токен содержит права роли из справочника; без claim права берутся по роли."""
+        # Справочник отзыва загружает прогрев, здесь его нет
+        await token_revocations.load(session_factory)
+        role_id = await role_catalog.role_id(async_session, RoleEnum.GLOBAL_ADMIN)
+        body = AuthService.generate_tokens(UserRegistered(email='admin@example.com', role_id=role_id))
+        token = AuthService.api_auth.decode_token(json.loads(body)['access_token'])
+        assert Permission(token['prm']) == ALL_PERMISSIONS
+        assert await AuthService.check_permissions(make_token(rol=role_id), Permission.USERS_MANAGE)
@@ -0,0 +1,60 @@
+from core.rate_limit import ShardedRateLimiter, SlidingWindow, throttle_keys
+
+
+def make_limiter(**kwargs) -> ShardedRateLimiter:
+    params = dict(
+        capacity=3,
+        refill_per_second=1,
+        failure_threshold=2,
+        failure_window_seconds=60,
+        backoff_base_seconds=1,
+        backoff_max_seconds=30,
+        shards=4,
+        max_keys_per_shard=2,
+        overflow_limit=2,
+    )
+    params.update(kwargs)
+    return ShardedRateLimiter(**params)
+
+
+class TestRateLimit:
+    """Тесты шардированного ограничителя попыток."""
+
+    def test_token_bucket(self):
+        """Серия попыток исчерпывает токены, затем они восполняются."""
+        limiter = make_limiter()
+        assert [limiter.acquire('ip:1', now=0) for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire('ip:1', now=0) == 1
+        assert limiter.acquire('ip:1', now=1) == 0
+
+    def test_exponential_backoff(self):
+        """После порога неудач ключ блокируется с удвоением задержки."""
+        limiter = make_limiter(capacity=100)
+        limiter.failure('email:a', now=0)
+        assert limiter.acquire('email:a', now=0) == 0
+        limiter.failure('email:a', now=0)
+        assert limiter.acquire('email:a', now=0) == 1
+        limiter.failure('email:a', now=1)
+        assert limiter.acquire('email:a', now=1) == 2
+        limiter.success('email:a')
+        assert limiter.acquire('email:a', now=1) == 0
+
+    def test_overflow_fallback(self):
+        """Переполненный активными ключами шард переходит на общее скользящее окно."""
+        limiter = make_limiter(shards=1, capacity=1)
+        limiter.acquire('a', now=0)
+        limiter.acquire('b', now=0)
+        assert limiter.acquire('c', now=0) == 0
+        assert limiter.acquire('d', now=0) == 0
+        assert limiter.acquire('e', now=0) > 0
+
+    def test_sliding_window(self):
+        window = SlidingWindow(now=0)
+        for _ in range(4):
+            window.add(now=10, window=60)
+        assert window.estimate(now=60, window=60) == 4
+        assert window.estimate(now=90, window=60) == 2
+        assert window.estimate(now=200, window=60) == 0
+
+    def test_keys(self):
+        assert throttle_keys('10.0.0.1', ' User@Example.com ') == ['ip:10.0.0.1', 'email:user@example.com']
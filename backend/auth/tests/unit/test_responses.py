@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core.responses import RawJSONResponse, dump_json
+from app.api_site_v1.schemas import AuthInfo, PingAuthInfo
+
+
+class TestResponses:
+    """Тесты прямой сериализации ответов."""
+
+    def test_same_body_as_json_response(self):
+        """Прямой путь отдаёт те же байты, что и jsonable_encoder + JSONResponse."""
+        models = [
+            AuthInfo(access_token='access', refresh_token='refresh', token_type='Bearer'),
+            PingAuthInfo(
+                id=1, email='пользователь@example.com', email_confirm=False, role='user', g_roles='site',
+                avatar=None, activity_date=datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc),
+            ),
+        ]
+        for model in models:
+            expected = JSONResponse(content=jsonable_encoder(model))
+            response = RawJSONResponse(dump_json(model))
+            assert response.body == expected.body
+            assert response.headers['content-type'] == expected.headers['content-type']
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import select, func, update
+from core.catalog import RoleCatalog
+from core.models import Role, role_group_role_association
+from core.role_manifest import ROLES, seed_roles
+
+
+class TestRoleManifest:
+    """Тесты применения манифеста ролей."""
+
+    @pytest.mark.asyncio
+    async def test_seed_idempotent(self, async_session):
+        """Повторное применение не создаёт дублей и возвращает те же id."""
+        first = await seed_roles(async_session)
+        second = await seed_roles(async_session)
+        assert first == second
+        assert [role.name for role in first] == [spec.name for spec in ROLES]
+        links = await async_session.scalar(select(func.count()).select_from(role_group_role_association))
+        assert links == len(ROLES)
+
+    @pytest.mark.asyncio
+    async def test_seed_restores_texts_and_fills_catalog(self, async_session):
+        """Изменённые в БД описания возвращаются к манифесту, справочник заполняется без чтения."""
+        spec = ROLES[0]
+        await async_session.execute(update(Role).where(Role.name == spec.name).values(title_en='changed'))
+        catalog = RoleCatalog()
+        await catalog.seed(async_session)
+        assert await async_session.scalar(select(Role.title_en).where(Role.name == spec.name)) == spec.title_en
+        role = catalog.get(await catalog.role_id(async_session, spec.name))
+        assert (role.name, role.group) == (spec.name, spec.group)
@@ -0,0 +1,27 @@
+import pytest
+from core.config import settings
+from core.startup import check_settings
+
+
+class TestStartup:
+    """Тесты проверки настроек перед запуском."""
+
+    def test_local_bus_with_workers(self, monkeypatch):
+        """Несколько воркеров с шиной только внутри процесса не запускаются."""
+        monkeypatch.setattr(settings.cache, 'bus', 'local')
+        monkeypatch.setattr(settings.server, 'workers', 1)
+        check_settings()
+        monkeypatch.setattr(settings.server, 'workers', 4)
+        with pytest.raises(RuntimeError):
+            check_settings()
+        monkeypatch.setattr(settings.cache, 'bus', 'redis')
+        monkeypatch.setattr(settings.auth_jwt, 'opaque_store', 'redis')
+        check_settings()
+
+    def test_memory_opaque_store_with_workers(self, monkeypatch):
+        """Непрозрачные токены в памяти воркера не годятся для нескольких воркеров."""
+        monkeypatch.setattr(settings.cache, 'bus', 'redis')
+        monkeypatch.setattr(settings.server, 'workers', 4)
+        monkeypatch.setattr(settings.auth_jwt, 'opaque_store', 'memory')
+        with pytest.raises(RuntimeError):
+            check_settings()
@@ -0,0 +1,40 @@
+import gzip
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from core.static import PrecompressedStaticFiles, accepted_encodings
+
+
+class TestStatic:
+    """Тесты отдачи собранных статических файлов."""
+
+    def test_accepted_encodings(self):
+        assert accepted_encodings('gzip, deflate, br') == {'gzip', 'deflate', 'br'}
+        assert accepted_encodings('br;q=0, gzip;q=0.5') == {'gzip'}
+        assert accepted_encodings('') == set()
+
+    def test_precompressed_variant(self, tmp_path):
+        css = b'body { color: red; }\n' * 100
+        (tmp_path / 'app.0123456789ab.css').write_bytes(css)
+        (tmp_path / 'app.0123456789ab.css.gz').write_bytes(gzip.compress(css))
+        app = FastAPI()
+        app.mount('/dist', PrecompressedStaticFiles(directory=tmp_path))
+        client = TestClient(app)
+
+        response = client.get('/dist/app.0123456789ab.css', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.headers['content-type'].startswith('text/css')
+        assert 'immutable' in response.headers['cache-control']
+        assert response.headers['vary'] == 'Accept-Encoding'
+        assert response.content == css
+
+        response = client.get(
+            '/dist/app.0123456789ab.css',
+            headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['etag']},
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = client.get('/dist/app.0123456789ab.css', headers={'Accept-Encoding': 'identity'})
+        assert 'content-encoding' not in response.headers
+        assert response.content == css
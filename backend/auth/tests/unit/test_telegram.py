@@ -0,0 +1,34 @@
+import json, time
+from urllib.parse import urlencode
+from core.telegram import InitDataVerifier
+
+
+def init_data(verifier: InitDataVerifier, auth_date: int, **user) -> str:
+    """initData в формате Telegram WebApp, подписанные ключом verifier."""
+    fields = {"auth_date": str(auth_date), "query_id": "AAH", "user": json.dumps(dict({"id": 42, "first_name": "Иван"}, **user))}
+    return urlencode(dict(fields, hash=verifier.sign(fields)))
+
+
+class TestInitDataVerifier:
+    """Тесты проверки initData Telegram WebApp."""
+
+    def test_verify(self):
+        verifier = InitDataVerifier("123456:TEST", max_age_seconds=60)
+        user = verifier.verify(init_data(verifier, int(time.time()), username="ivan"))
+        assert user.id == 42 and user.first_name == "Иван" and user.username == "ivan"
+
+    def test_rejects_tampered_and_stale(self):
+        verifier = InitDataVerifier("123456:TEST", max_age_seconds=60)
+        data = init_data(verifier, int(time.time()))
+        assert verifier.verify(data.replace("%22id%22%3A+42", "%22id%22%3A+43")) is None
+        assert InitDataVerifier("654321:OTHER", 60).verify(data) is None
+        assert verifier.verify(init_data(verifier, int(time.time()) - 120)) is None
+        assert verifier.verify("not a query") is None
+        assert InitDataVerifier("", 60).verify(data) is None
+
+    def test_profile_key(self):
+        """Ключ профиля постоянный для пользователя и зависит от токена бота."""
+        verifier = InitDataVerifier("123456:TEST", 60)
+        assert verifier.profile_key(42) == verifier.profile_key(42) != verifier.profile_key(43)
+        assert len(verifier.profile_key(42)) == 32
+        assert InitDataVerifier("654321:OTHER", 60).profile_key(42) != verifier.profile_key(42)
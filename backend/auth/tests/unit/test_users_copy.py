@@ -0,0 +1,57 @@
+import json, uuid
+import asyncpg, bcrypt
+import pytest, pytest_asyncio
+from core.config import settings
+from scripts.users_copy import Checkpoint, export_users, import_users
+
+PASSWORD_HASH = bcrypt.hashpw(b'TestPass123!', bcrypt.gensalt(4)).decode()
+
+
+@pytest_asyncio.fixture
+async def domain():
+    """Уникальный домен email теста; импортированные пользователи удаляются после теста."""
+    domain = f'{uuid.uuid4().hex[:12]}.example.com'
+    yield domain
+    connection = await asyncpg.connect(settings.db.dsn)
+    try:
+        pattern = f'%@{domain}'
+        await connection.execute(
+            'DELETE FROM profiles p USING users_associations ua, website_users w '
+            'WHERE ua.profile_id = p.id AND ua.user_website_id = w.id AND w.email ILIKE $1', pattern,
+        )
+        await connection.execute('DELETE FROM website_users WHERE email ILIKE $1', pattern)
+    finally:
+        await connection.close()
+
+
+class TestUsersCopy:
+    """Тесты импорта и экспорта пользователей через COPY."""
+
+    @pytest.mark.asyncio
+    async def test_import_resume_and_export(self, domain, tmp_path):
+        source = tmp_path / 'users.ndjson'
+        with source.open('w') as stream:
+            for i in range(10):
+                stream.write(json.dumps({'email': f'user{i}@{domain}', 'password': PASSWORD_HASH, 'role': 'owner'}) + '\n')
+            stream.write(json.dumps({'email': f'USER5@{domain}', 'password': PASSWORD_HASH}) + '\n')
+            stream.write(json.dumps({'email': f'bad@{domain}', 'password': 'plain'}) + '\n')
+
+        # Прерванный импорт: первые 4 строки уже зафиксированы
+        offset = sum(len(line) for line in source.open('rb').readlines()[:4])
+        Checkpoint(tmp_path / 'users.ndjson.checkpoint').save(offset)
+        imported, skipped, errors = await import_users(source, batch_size=3)
+        assert (imported, skipped, errors) == (6, 1, 1)
+        assert not (tmp_path / 'users.ndjson.checkpoint').exists()
+
+        imported, skipped, errors = await import_users(source, batch_size=3)
+        assert (imported, skipped, errors) == (4, 7, 1)
+
+        target = tmp_path / 'export.csv'
+        await export_users(target, fmt='csv')
+        rows = [line for line in target.read_text().splitlines() if f'@{domain},' in line]
+        assert len(rows) == 10
+        assert all(',OWNER,' in row for row in rows)
+
+        # Экспорт импортируется обратно: все email уже есть
+        imported, skipped, errors = await import_users(target, fmt='csv')
+        assert imported == 0 and errors == 0
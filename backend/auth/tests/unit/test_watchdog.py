@@ -0,0 +1,40 @@
+import asyncio, time
+import pytest
+
+from core.watchdog import LoopWatchdog
+
+
+def blocking_call():
+    time.sleep(0.2)
+
+
+class TestLoopWatchdog:
+    """Тесты детектора блокировок event loop."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_site(self):
+        """Блокирующий вызов агрегируется по месту вызова со стеком."""
+        watchdog = LoopWatchdog(threshold_ms=50, interval_ms=10, report_interval_seconds=60, stack_limit=8)
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        for _ in range(2):
+            blocking_call()
+            await asyncio.sleep(0.05)
+        await watchdog.stop()
+
+        sites = watchdog.snapshot()
+        assert sites, 'Блокировка не обнаружена'
+        top = sites[0]
+        assert 'test_watchdog.py' in top['site'] and 'blocking_call' in top['site'], top
+        assert top['count'] == 2, top
+        assert top['max_ms'] >= 100, top
+        assert any('time.sleep' in line for line in top['stack']), top
+
+    @pytest.mark.asyncio
+    async def test_idle_loop(self):
+        """Свободный loop не порождает отчётов."""
+        watchdog = LoopWatchdog(threshold_ms=100, interval_ms=10, report_interval_seconds=60, stack_limit=8)
+        watchdog.start()
+        await asyncio.sleep(0.2)
+        await watchdog.stop()
+        assert watchdog.snapshot() == []